@@ -0,0 +1,258 @@
+# bench/bench_cleaner.py
+"""
+Benchmark du cleaner par étape, sur des historiques synthétiques (`bench/synth.py`).
+
+Pour chaque taille : temps et pic de mémoire (RSS) de chaque étape de
+`clean_records` et des écritures, dans l'ordre du pipeline :
+
+    read_json_records → DataFrame → coerce_types → add_price_per_m2 → outliers
+    → sanitize_strings → write_csv → write_parquet
+
+    python bench/bench_cleaner.py                         # 10 000 et 100 000 annonces
+    python bench/bench_cleaner.py --rows 1000000 10000000 --stream   # historiques de production, mode --stream
+    python bench/bench_cleaner.py --save-baseline         # fige les résultats courants
+    python bench/bench_cleaner.py --check                 # code retour 1 si régression
+
+Les temps sont comparés à la baseline en unités d'étalon : une charge de référence
+fixe (`calibrate`, JSON + chaînes + tri) mesurée avant et après chaque taille. Une baseline figée sur
+une autre machine reste comparable ; une hausse de --tolerance relative à l'étalon
+est une régression.
+
+Le passage par étapes charge tout l'historique (≈ 5 Go de RAM par million d'annonces) ;
+`--stream` mesure à la place `clean_streaming` de bout en bout, à mémoire bornée.
+Les fichiers générés (~1,3 Ko par annonce) sont gardés dans --workdir et réutilisés.
+"""
+import argparse
+import gc
+import json
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "bench"))
+
+import cleaner                           # noqa: E402
+import synth                             # noqa: E402
+from dataset import write_dataset        # noqa: E402
+from schema import compact_schema        # noqa: E402
+
+BASELINE_PATH = ROOT / "bench" / "results" / "cleaner_baseline.json"
+WORKDIR       = Path(tempfile.gettempdir()) / "immo_bench"
+MIN_SECONDS   = 0.05      # étapes plus courtes : pas de comparaison de temps (bruit)
+CALIB_RECORDS = 20_000    # taille de la charge de référence (~50 ms)
+
+
+# ----------------- Mémoire -----------------
+def _status_kib(field: str) -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak() -> bool:
+    """Remet le pic RSS (VmHWM) au niveau courant ; Linux seulement."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_mib() -> float:
+    kib = _status_kib("VmHWM")
+    if kib is None:   # macOS / sans /proc : pic depuis le lancement (ru_maxrss en octets sur macOS)
+        kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == "darwin" else 1)
+    return kib / 1024
+
+
+# ----------------- Mesures -----------------
+def _stage(results: Dict, name: str, fn: Callable):
+    gc.collect()
+    resettable = _reset_peak()
+    rss0 = (_status_kib("VmRSS") or 0) / 1024
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    peak = _peak_mib()
+    results[name] = {"s": round(elapsed, 3), "peak_mib": round(peak, 1),
+                     "delta_mib": round(peak - rss0, 1) if resettable else None}
+    return out
+
+
+def calibrate(repeat: int = 9) -> float:
+    """Durée (s, meilleur de `repeat`) d'une charge de référence fixe, proche du travail
+    du cleaner (sérialisation JSON, chaînes, tri) : l'unité des comparaisons à la baseline."""
+    recs = [{"ID": i, "title": f"Appartement {i % 7} pièces", "price_eur": i * 1.5, "postal_code": f"750{i % 20:02d}"}
+            for i in range(CALIB_RECORDS)]
+
+    def once() -> float:
+        t0 = time.perf_counter()
+        out = json.loads(json.dumps(recs))
+        sorted(f"{r['postal_code']}|{r['title'].lower()}|{r['ID']}" for r in out)
+        return time.perf_counter() - t0
+
+    return min(once() for _ in range(repeat))
+
+
+def raw_path(workdir: Path, rows: int, seed: int) -> Path:
+    path = workdir / f"raw_{rows}_{seed}.json"
+    if not path.exists():
+        t0 = time.perf_counter()
+        synth.write_json(path, rows, seed)
+        print(f"  (génération de {path.name} : {time.perf_counter() - t0:.1f} s)")
+    return path
+
+
+def run(rows: int, seed: int, workdir: Path) -> Dict:
+    src = raw_path(workdir, rows, seed)
+    out_dir = workdir / f"out_{rows}"
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True)
+    st: Dict[str, Dict] = {}
+
+    records = _stage(st, "read_json_records", lambda: cleaner.read_json_records(src))
+    df = _stage(st, "dataframe", lambda: pd.DataFrame(records))
+    del records
+    df = _stage(st, "coerce_types", lambda: cleaner.coerce_types(df))
+    df = _stage(st, "add_price_per_m2", lambda: cleaner.add_price_per_m2(df))
+    df = _stage(st, "outliers", lambda: cleaner.apply_outliers(df, "flag"))
+    df = df[[c for c in cleaner.ORDERED_COLS if c in df.columns]]
+    df = _stage(st, "sanitize_strings", lambda: cleaner.sanitize_strings(df, sep=";"))
+    _stage(st, "write_csv", lambda: cleaner.write_csv(df, out_dir / "cleaned_data.csv"))
+    _stage(st, "write_parquet", lambda: write_dataset(compact_schema(df, categories=False), out_dir / "parquet"))
+
+    res = {
+        "rows": rows,
+        "raw_mib": round(src.stat().st_size / 2**20, 1),
+        "total_s": round(sum(s["s"] for s in st.values()), 3),
+        "rows_per_sec": round(rows / max(sum(s["s"] for s in st.values()), 1e-9)),
+        "peak_mib": max(s["peak_mib"] for s in st.values()),
+        "stages": st,
+    }
+    del df
+    shutil.rmtree(out_dir, ignore_errors=True)
+    return res
+
+
+def run_stream(rows: int, seed: int, workdir: Path, chunk_rows: int) -> Dict:
+    src = raw_path(workdir, rows, seed)
+    out_dir = workdir / f"out_{rows}"
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True)
+    st: Dict[str, Dict] = {}
+    _stage(st, "clean_streaming", lambda: cleaner.clean_streaming(
+        src, out_dir / "cleaned_data.csv", out_dir / "parquet", chunk_rows, out_dir / "aggregates"))
+    shutil.rmtree(out_dir, ignore_errors=True)
+    total = st["clean_streaming"]["s"]
+    return {"rows": rows, "raw_mib": round(src.stat().st_size / 2**20, 1), "total_s": total,
+            "rows_per_sec": round(rows / max(total, 1e-9)), "peak_mib": st["clean_streaming"]["peak_mib"],
+            "stages": st}
+
+
+def _scale(res: Dict, ref: Dict) -> Optional[float]:
+    """Rapport des étalons (ce run / baseline) : temps de la baseline ramenés à cette machine.
+    None pour une baseline sans étalon (temps non comparables)."""
+    return res["calibration_s"] / ref["calibration_s"] if ref.get("calibration_s") else None
+
+
+def compare(key: str, res: Dict, base: Dict, tolerance: float) -> List[str]:
+    """Régressions par rapport à la baseline (même taille) : temps (en unités d'étalon)
+    et pic mémoire par étape."""
+    problems = []
+    ref = base.get("runs", {}).get(key)
+    if not ref:
+        return problems
+    scale = _scale(res, ref)
+    for name, s in res["stages"].items():
+        b = ref["stages"].get(name)
+        if not b:
+            continue
+        if scale and b["s"] >= MIN_SECONDS and s["s"] > b["s"] * scale * (1 + tolerance):
+            problems.append(f"{key} • {name} : {b['s'] * scale:.3f} → {s['s']:.3f} s "
+                            f"(+{(s['s'] / (b['s'] * scale) - 1) * 100:.0f} % à étalon égal)")
+        if b.get("delta_mib") and s.get("delta_mib") and s["delta_mib"] > b["delta_mib"] * (1 + tolerance) + 16:
+            problems.append(f"{key} • {name} : {b['delta_mib']:.0f} → {s['delta_mib']:.0f} Mio")
+    return problems
+
+
+def _fmt(x: float, sign: bool = False) -> str:
+    return format(x, ("+" if sign else "") + "_.0f").replace("_", " ")
+
+
+def print_report(key: str, res: Dict, base: Optional[Dict]) -> None:
+    run_ref = (base or {}).get("runs", {}).get(key, {})
+    ref, scale = run_ref.get("stages", {}), _scale(res, run_ref)
+    print(f"{_fmt(res['rows'])} annonces ({res['raw_mib']} Mio de JSON) : {res['total_s']:.2f} s  •  "
+          f"{_fmt(res['rows_per_sec'])} annonces/s  •  pic {_fmt(res['peak_mib'])} Mio  •  "
+          f"étalon {res['calibration_s'] * 1e3:.1f} ms")
+    if run_ref and not scale:
+        print("  (baseline sans étalon : temps non comparés, à refaire avec --save-baseline)")
+    for name, s in res["stages"].items():
+        b = ref.get(name, {}).get("s")
+        delta = f"  ({(s['s'] / (b * scale) - 1) * 100:+.0f} % vs baseline)" if b and scale else ""
+        mem = _fmt(s["delta_mib"], sign=True) if s["delta_mib"] is not None else "?"
+        print(f"  {name:<20} {s['s']:9.3f} s   pic {_fmt(s['peak_mib']):>8} Mio ({mem} Mio){delta}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark du cleaner par étape (données synthétiques)")
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--stream", action="store_true", help="mesurer clean_streaming de bout en bout")
+    ap.add_argument("--chunk-rows", type=int, default=cleaner.CHUNK_ROWS)
+    ap.add_argument("--workdir", type=Path, default=WORKDIR, help="fichiers synthétiques (réutilisés)")
+    ap.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="hausse tolérée (0.25 = +25 %%)")
+    ap.add_argument("--check", action="store_true", help="code retour 1 en cas de régression")
+    args = ap.parse_args()
+
+    base = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    runs, problems = {}, []
+    for rows in args.rows:
+        calib = calibrate()
+        if args.stream:
+            key, res = f"{rows}-stream", run_stream(rows, args.seed, args.workdir, args.chunk_rows)
+        else:
+            key, res = str(rows), run(rows, args.seed, args.workdir)
+        # Étalon encadrant la mesure (la vitesse d'une VM varie d'une minute à l'autre) ;
+        # gardé par taille : les tailles fusionnées dans la baseline gardent le leur
+        res["calibration_s"] = round((calib + calibrate()) / 2, 5)
+        runs[key] = res
+        print_report(key, res, base)
+        if base:
+            problems += compare(key, res, base, args.tolerance)
+
+    if args.save_baseline:
+        merged = dict((base or {}).get("runs", {}), **runs)    # les autres tailles de la baseline sont gardées
+        out = {"python": platform.python_version(), "pandas": pd.__version__, "machine": platform.machine(),
+               "seed": args.seed, "runs": dict(sorted(merged.items(), key=lambda kv: (int(kv[0].split("-")[0]), kv[0])))}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(out, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"✔ Baseline enregistrée : {args.baseline}")
+    elif base:
+        for p in problems:
+            print(f"⚠ Régression : {p}")
+        if not problems:
+            print("✔ Aucune régression par rapport à la baseline")
+        if problems and args.check:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
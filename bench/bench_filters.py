@@ -0,0 +1,119 @@
+# bench/bench_filters.py
+"""
+Benchmark des filtres du tableau de bord : `FilterIndex.query` (index construit une
+fois) contre l'ancien masque pandas recalculé à chaque rerun (between / isin puis
+`df.loc[mask].copy()`).
+
+Mêmes données que bench_load_csv.py (CSV du cleaner sur annonces synthétiques) ;
+l'ensemble filtré est le code postal (le CSV n'a pas de colonne ville). Pour une
+série de positions de curseurs, on vérifie que les lignes retenues sont identiques :
+
+    python bench/bench_filters.py                     # 1 000 000 d'annonces
+    python bench/bench_filters.py --rows 100000 --save
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "bench"))
+
+from bench_cleaner import WORKDIR, _fmt, _stage             # noqa: E402
+from bench_load_csv import csv_path                         # noqa: E402
+from filter_index import FilterIndex                        # noqa: E402
+from schema import DESCRIPTION_COL, compact_schema, read_cleaned_csv  # noqa: E402
+
+RESULTS_PATH = ROOT / "bench" / "results" / "filters.json"
+SET_COL      = "postal_code"
+
+
+def scenarios(df: pd.DataFrame, count: int, seed: int) -> List[Dict]:
+    """Positions de curseurs : tout, intervalles larges et étroits, 0 à 3 codes postaux."""
+    rng = np.random.default_rng(seed)
+    p = df["price_eur"].quantile([0, 1]).tolist()
+    s = df["surface_m2"].quantile([0, 1]).tolist()
+    codes = sorted(df[SET_COL].dropna().unique().tolist())
+    out = [{"price": tuple(p), "surface": tuple(s), "codes": [], "outliers": False}]
+    for _ in range(count - 1):
+        a, b = np.sort(rng.uniform(*p, 2))
+        c, d = np.sort(rng.uniform(*s, 2))
+        out.append({"price": (a, b), "surface": (c, d), "outliers": bool(rng.random() < 0.5),
+                    "codes": rng.choice(codes, rng.integers(0, 4), replace=False).tolist()})
+    return out
+
+
+def mask_filter(df: pd.DataFrame, sc: Dict) -> pd.DataFrame:
+    """Ancienne version (app.py) : masque complet puis copie."""
+    mask = pd.Series(True, index=df.index)
+    mask &= df["price_eur"].between(*sc["price"], inclusive="both")
+    mask &= df["surface_m2"].between(*sc["surface"], inclusive="both")
+    if sc["codes"]:
+        mask &= df[SET_COL].isin(sc["codes"])
+    if sc["outliers"]:
+        mask &= ~df["outlier"].fillna(False).astype(bool)
+    return df.loc[mask].copy()
+
+
+def index_query(idx: FilterIndex, sc: Dict) -> np.ndarray:
+    return idx.query(ranges={"price_eur": sc["price"], "surface_m2": sc["surface"]},
+                     sets={SET_COL: sc["codes"]}, exclude=["outlier"] if sc["outliers"] else [])
+
+
+def _timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(rows: int, seed: int, workdir: Path, count: int, repeat: int) -> Dict:
+    df = compact_schema(read_cleaned_csv(str(csv_path(workdir, rows, seed)), exclude=[DESCRIPTION_COL]))
+    st: Dict[str, Dict] = {}
+    idx = _stage(st, "build_index", lambda: FilterIndex(df, sets=[SET_COL], flags={"outlier": df["outlier"]}))
+    old, query, take = [], [], []
+    for sc in scenarios(df, count, seed):
+        assert mask_filter(df, sc).index.equals(df.take(index_query(idx, sc)).index), sc
+        old.append(_timed(lambda: mask_filter(df, sc), repeat))
+        query.append(_timed(lambda: index_query(idx, sc), repeat))
+        take.append(_timed(lambda: df.take(index_query(idx, sc)), repeat))
+    ms = lambda xs: {"median_ms": round(float(np.median(xs)) * 1e3, 2), "max_ms": round(float(np.max(xs)) * 1e3, 2)}
+    return {"rows": rows, "scenarios": count, "build_s": st["build_index"]["s"],
+            "build_delta_mib": st["build_index"]["delta_mib"],
+            "mask_and_copy": ms(old), "index_query": ms(query), "index_query_and_take": ms(take)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark des filtres du tableau de bord")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--scenarios", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--workdir", type=Path, default=WORKDIR)
+    ap.add_argument("--save", action="store_true", help=f"enregistrer dans {RESULTS_PATH.relative_to(ROOT)}")
+    args = ap.parse_args()
+
+    results = []
+    for rows in args.rows:
+        res = run(rows, args.seed, args.workdir, args.scenarios, args.repeat)
+        results.append(res)
+        print(f"{_fmt(rows)} annonces : index construit en {res['build_s']:.2f} s "
+              f"({_fmt(res['build_delta_mib'] or 0, sign=True)} Mio), {res['scenarios']} positions de curseurs")
+        for name in ("mask_and_copy", "index_query", "index_query_and_take"):
+            print(f"  {name:<22} médiane {res[name]['median_ms']:8.2f} ms   max {res[name]['max_ms']:8.2f} ms")
+    if args.save:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RESULTS_PATH.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"✔ Résultats enregistrés : {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# bench/bench_geocode.py
+"""
+Benchmark de l'étape de géocodage du cleaner (`geocode.Geocoder.annotate`) :
+
+- sur le CSV du cleaner (annonces synthétiques, comme bench_load_csv.py) : gazetteer
+  des quartiers, un quartier sur trois absent pour passer par le cache puis par un
+  géocodeur distant simulé (sans réseau, sans attente). Premier passage (cache vide)
+  puis second passage (tout vient du gazetteer et du cache, aucune requête) ;
+- sur un gazetteer au format BAN de --ban-rows adresses (ordre de grandeur de Paris) :
+  lecture et indexation, puis résolution de --ban-queries clés distinctes (adresse
+  exacte ou voie).
+
+L'ancien tableau de bord demandait Nominatim ligne à ligne, une requête par seconde
+au mieux : le coût évité est estimé à une seconde par adresse distincte.
+
+    python bench/bench_geocode.py                          # 1 000 000 d'annonces
+    python bench/bench_geocode.py --rows 100000 --save
+"""
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "bench"))
+
+import geocode                                              # noqa: E402
+from bench_cleaner import WORKDIR, _fmt, _stage             # noqa: E402
+from bench_load_csv import csv_path                         # noqa: E402
+from schema import read_cleaned_csv                         # noqa: E402
+from synth import ARRONDISSEMENTS                           # noqa: E402
+
+RESULTS_PATH = ROOT / "bench" / "results" / "geocode.json"
+STREET_TYPES = ["Rue", "Avenue", "Boulevard", "Place", "Impasse", "Passage", "Quai"]
+
+
+class SimulatedRemote(geocode.RemoteGeocoder):
+    """Géocodeur distant local : coordonnées déterministes, sans attente."""
+    name = "simulé"
+    min_interval = 0.0
+
+    def query(self, label, postal_code):
+        h = abs(hash((label, postal_code))) % 10_000
+        return 48.82 + h / 100_000, 2.25 + h / 50_000
+
+
+def write_quarters(path: Path) -> int:
+    """Gazetteer `name,postal_code,lat,lon` : deux quartiers sur trois de chaque arrondissement."""
+    rows = [(q, cp, 48.85 + i / 1000, 2.35 + k / 1000)
+            for i, (cp, (_, quarters)) in enumerate(ARRONDISSEMENTS.items())
+            for k, q in enumerate(quarters) if k % 3 != 2]
+    pd.DataFrame(rows, columns=["name", "postal_code", "lat", "lon"]).to_csv(path, index=False)
+    return len(rows)
+
+
+def write_ban(path: Path, rows: int, seed: int) -> pd.DataFrame:
+    """Extrait au format BAN (adresses-75.csv) : voies de ~20 numéros, quelques bis/ter."""
+    rng = np.random.default_rng(seed)
+    cps = np.array(list(ARRONDISSEMENTS))
+    street = np.arange(rows) // 20
+    df = pd.DataFrame({
+        "id": np.arange(rows), "numero": np.arange(rows) % 20 * 2 + 1,
+        "rep": np.where(rng.random(rows) < 0.05, "bis", ""),
+        "nom_voie": [f"{STREET_TYPES[s % len(STREET_TYPES)]} de la Voie n°{s}" for s in street],
+        "code_postal": cps[street % len(cps)],
+        "nom_commune": "Paris",
+        "lon": 2.25 + rng.random(rows) * 0.17, "lat": 48.81 + rng.random(rows) * 0.09,
+    })
+    df.to_csv(path, sep=";", index=False)
+    return df
+
+
+def run(rows: int, seed: int, workdir: Path, ban_rows: int, ban_queries: int) -> Dict:
+    tmp = workdir / "geocode_bench"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    st: Dict[str, Dict] = {}
+
+    # 1) Étape du cleaner sur les annonces
+    df = read_cleaned_csv(str(csv_path(workdir, rows, seed)), columns=["ID", "address", "postal_code"])
+    n_quarters = write_quarters(tmp / "quartiers.csv")
+    distinct = int(df[["address", "postal_code"]].drop_duplicates().shape[0])
+    geo = _stage(st, "load_gazetteer", lambda: geocode.Geocoder(tmp / "quartiers.csv", tmp / "geocode.sqlite",
+                                                                 remote=SimulatedRemote()))
+    cold = _stage(st, "annotate_cold", lambda: geo.annotate(df.copy()))
+    first = dict(geo.stats)
+    geo = geocode.Geocoder(tmp / "quartiers.csv", tmp / "geocode.sqlite", remote=SimulatedRemote())
+    warm = _stage(st, "annotate_warm", lambda: geo.annotate(df.copy()))
+    assert np.array_equal(cold[["lat", "lon"]].to_numpy(), warm[["lat", "lon"]].to_numpy(), equal_nan=True)
+    assert cold.loc[df["address"].notna(), "lat"].notna().all()
+    assert geo.stats["remote"] == 0
+
+    # 2) Gazetteer au format BAN
+    ban = write_ban(tmp / "ban.csv", ban_rows, seed)
+    gaz = _stage(st, "load_ban", lambda: geocode.Gazetteer(tmp / "ban.csv"))
+    rng = np.random.default_rng(seed)
+    pick = ban.iloc[rng.integers(0, len(ban), ban_queries)]
+    numbers = np.where(rng.random(len(pick)) < 0.2, 999, pick["numero"])   # 20 % de numéros inconnus → voie
+    labels = [f"{n} {r + ' ' if r else ''}{s}" for n, r, s in zip(numbers, pick["rep"], pick["nom_voie"])]
+    keys = geocode._keys(pick["code_postal"], labels).to_pylist()
+    coords = _stage(st, "lookup_ban", lambda: gaz.lookup(keys))
+    assert not np.isnan(coords).any()
+
+    return {"rows": rows, "distinct_addresses": distinct, "gazetteer_quarters": n_quarters,
+            "first_pass": first, "annotate_cold_s": st["annotate_cold"]["s"],
+            "annotate_warm_s": st["annotate_warm"]["s"], "annotate_delta_mib": st["annotate_cold"]["delta_mib"],
+            "ban_rows": ban_rows, "ban_keys": len(gaz), "load_ban_s": st["load_ban"]["s"],
+            "load_ban_delta_mib": st["load_ban"]["delta_mib"], "ban_queries": ban_queries,
+            "lookup_ban_ms": round(st["lookup_ban"]["s"] * 1e3, 1),
+            "nominatim_estimate_s": distinct}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark de l'étape de géocodage")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--ban-rows", type=int, default=150_000)
+    ap.add_argument("--ban-queries", type=int, default=100_000)
+    ap.add_argument("--workdir", type=Path, default=WORKDIR)
+    ap.add_argument("--save", action="store_true", help=f"enregistrer dans {RESULTS_PATH.relative_to(ROOT)}")
+    args = ap.parse_args()
+
+    results = []
+    for rows in args.rows:
+        res = run(rows, args.seed, args.workdir, args.ban_rows, args.ban_queries)
+        results.append(res)
+        f = res["first_pass"]
+        print(f"{_fmt(rows)} annonces, {res['distinct_addresses']} adresses distinctes : "
+              f"1er passage {res['annotate_cold_s']:.2f} s ({f.get('gazetteer', 0)} gazetteer, "
+              f"{f.get('remote', 0)} distant), 2e passage {res['annotate_warm_s']:.2f} s (0 requête) ; "
+              f"Nominatim ligne à ligne : ≥ {_fmt(res['nominatim_estimate_s'])} s")
+        print(f"  gazetteer BAN {_fmt(res['ban_rows'])} adresses → {_fmt(res['ban_keys'])} clés en "
+              f"{res['load_ban_s']:.2f} s ({_fmt(res['load_ban_delta_mib'] or 0, sign=True)} Mio), "
+              f"{_fmt(res['ban_queries'])} clés résolues en {res['lookup_ban_ms']:.0f} ms")
+    if args.save:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RESULTS_PATH.write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"✔ Résultats enregistrés : {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
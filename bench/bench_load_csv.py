@@ -0,0 +1,113 @@
+# bench/bench_load_csv.py
+"""
+Benchmark de la lecture du CSV par le tableau de bord : `schema.read_cleaned_csv`
+(octets bruts, lecteur CSV Arrow, types explicites) contre l'ancien `app.load_csv`
+(texte décodé, découpé puis recollé, StringIO, moteur "python" de pandas).
+
+Le CSV est celui du cleaner (`clean_streaming`) sur des annonces synthétiques
+(`bench/synth.py`), gardé dans --workdir. Valeurs identiques vérifiées :
+
+    python bench/bench_load_csv.py                        # 100 000 et 1 000 000 d'annonces
+    python bench/bench_load_csv.py --rows 200000 --save
+
+L'ancienne version garde plusieurs copies du texte en mémoire : au-delà de
+--reference-max-rows, elle n'est pas mesurée (la machine n'y suffirait pas).
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "bench"))
+
+import cleaner                                        # noqa: E402
+from bench_cleaner import WORKDIR, _stage, raw_path   # noqa: E402
+from schema import DESCRIPTION_COL, read_cleaned_csv  # noqa: E402
+
+RESULTS_PATH = ROOT / "bench" / "results" / "load_csv.json"
+
+
+def load_csv_python(path: Path, with_description: bool = False) -> pd.DataFrame:
+    """Implémentation d'origine de app.load_csv (référence, fichier local)."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    lines = text.splitlines()
+    if lines and lines[0].strip().lower().startswith("sep="):
+        text = "\n".join(lines[1:])
+    buf = io.StringIO(text)
+    return pd.read_csv(
+        buf, sep=";", engine="python", encoding="utf-8", quotechar='"', quoting=csv.QUOTE_MINIMAL,
+        on_bad_lines="error", usecols=None if with_description else (lambda c: c != DESCRIPTION_COL),
+    )
+
+
+def csv_path(workdir: Path, rows: int, seed: int) -> Path:
+    path = workdir / f"cleaned_{rows}_{seed}.csv"
+    if not path.exists():
+        t0 = time.perf_counter()
+        cleaner.clean_streaming(raw_path(workdir, rows, seed), path, workdir / f"_parquet_{rows}")
+        print(f"  (nettoyage de {rows:_} annonces synthétiques : {time.perf_counter() - t0:.1f} s)".replace("_", " "))
+    return path
+
+
+def _check(ref: pd.DataFrame, new: pd.DataFrame) -> None:
+    """Mêmes colonnes et mêmes valeurs, aux types près : l'ancienne lecture devinait les
+    types (codes postaux relus en flottants, 75004.0), le nouveau lecteur suit CSV_DTYPES."""
+    assert list(ref.columns) == list(new.columns), (list(ref.columns), list(new.columns))
+    for c in ref.columns:
+        left, right = ref[c], new[c]
+        if isinstance(right.dtype, pd.StringDtype) and pd.api.types.is_numeric_dtype(left.dtype):
+            right = pd.to_numeric(right)
+        pd.testing.assert_series_equal(left.astype(object).where(left.notna(), None),
+                                       right.astype(object).where(right.notna(), None), check_dtype=False)
+
+
+def run(rows: int, seed: int, workdir: Path, reference_max: int) -> Dict:
+    path = csv_path(workdir, rows, seed)
+    st: Dict[str, Dict] = {}
+    new = _stage(st, "arrow", lambda: read_cleaned_csv(str(path), exclude=[DESCRIPTION_COL]))
+    _stage(st, "arrow_with_description", lambda: read_cleaned_csv(str(path)))
+    res = {"rows": rows, "csv_mib": round(path.stat().st_size / 2**20, 1)}
+    if rows <= reference_max:
+        ref = _stage(st, "python", lambda: load_csv_python(path))
+        _check(ref, new)
+        res["speedup"] = round(st["python"]["s"] / st["arrow"]["s"], 1)
+    res["stages"] = {k: {"s": v["s"], "peak_mib": v["peak_mib"], "delta_mib": v["delta_mib"]} for k, v in st.items()}
+    return res
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark de la lecture du CSV du tableau de bord")
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workdir", type=Path, default=WORKDIR)
+    ap.add_argument("--reference-max-rows", type=int, default=300_000)
+    ap.add_argument("--save", action="store_true", help=f"enregistrer dans {RESULTS_PATH.relative_to(ROOT)}")
+    args = ap.parse_args()
+
+    results: List[Dict] = []
+    for rows in args.rows:
+        res = run(rows, args.seed, args.workdir, args.reference_max_rows)
+        results.append(res)
+        print(f"{rows:_} annonces ({res['csv_mib']} Mio de CSV)".replace("_", " "))
+        for name, s in res["stages"].items():
+            mem = f"{s['delta_mib']:+.0f}" if s["delta_mib"] is not None else "?"
+            print(f"  {name:<24} {s['s']:8.3f} s   pic {s['peak_mib']:7.0f} Mio ({mem} Mio)")
+        if "speedup" in res:
+            print(f"  → ×{res['speedup']} sans les descriptions (valeurs identiques)")
+    if args.save:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RESULTS_PATH.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"✔ Résultats enregistrés : {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
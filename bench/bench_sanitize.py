@@ -0,0 +1,121 @@
+# bench/bench_sanitize.py
+"""
+Benchmark de `cleaner.sanitize_strings` (version vectorisée) contre l'ancienne
+version cellule par cellule (`Series.map`), sur des annonces synthétiques.
+
+La sortie doit être strictement identique (valeurs et dtypes) :
+
+    python bench/bench_sanitize.py                    # 100 000 et 1 000 000 de lignes
+    python bench/bench_sanitize.py --rows 20000 --save
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import cleaner   # noqa: E402
+
+RESULTS_PATH = ROOT / "bench" / "results" / "sanitize_strings.json"
+WORDS = ["Bel", "appartement", "lumineux", "T3", "proche", "métro", "Paris", "11ème", "balcon",
+         "parquet", "cave", "gardien", "rénové", "calme", "vue", "dégagée", "ascenseur", "prix:"]
+# Séparateurs entre mots : surtout des espaces simples, parfois du bruit de mise en page
+NOISE   = [" ", "  ", "\n", "\r\n", "\t", " ; ", "\xa0", "\u202f", "\x0b", "\x1f", "\n\n  ", ". "]
+NOISE_P = [0.80, 0.03, 0.04, 0.02, 0.01, 0.02, 0.02, 0.01, 0.005, 0.005, 0.01, 0.03]
+
+
+def sanitize_strings_map(df: pd.DataFrame, sep: str = ";") -> pd.DataFrame:
+    """Implémentation d'origine (référence)."""
+    text_cols = df.select_dtypes(include=["string", "object"]).columns
+
+    def clean(x):
+        if pd.isna(x):
+            return x
+        s = str(x)
+        s = s.replace("\r\n", " ").replace("\n", " ").replace("\r", " ").replace("\t", " ")
+        s = re.sub(r"\s+", " ", s).strip()
+        if sep in s:
+            s = s.replace(sep, ",")
+        return s
+
+    for c in text_cols:
+        df[c] = df[c].map(clean)
+    return df
+
+
+def _text(rng: np.random.Generator, n_words: int) -> str:
+    words = rng.choice(WORDS, n_words)
+    seps = rng.choice(NOISE, n_words, p=NOISE_P)
+    return "".join(f"{w}{s}" for w, s in zip(words, seps))
+
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Colonnes texte du cleaner, avec retours ligne, tabulations, espaces Unicode,
+    séparateurs et valeurs manquantes ; le reste est numérique (non touché)."""
+    rng = np.random.default_rng(seed)
+    n_pool = min(rows, 5000)
+    titles = [_text(rng, 6) for _ in range(n_pool)]
+    descs = [_text(rng, 80) for _ in range(n_pool)]
+    idx = rng.integers(0, n_pool, rows)
+    miss = rng.random(rows) < 0.05
+    df = pd.DataFrame({
+        "url": [f"https://www.seloger.com/annonces/achat/appartement/paris/{i}.htm" for i in range(rows)],
+        "ID": np.arange(rows, dtype="int64"),
+        "title": pd.array(np.where(miss, None, np.array(titles, dtype=object)[idx]), dtype="string"),
+        "postal_code": pd.array(rng.choice(["75011", "75014", " 75020 ", None], rows), dtype="string"),
+        "address": pd.array(rng.choice(["Paris 11ème (75011)", "Paris\n14ème ;(75014)", None], rows), dtype="string"),
+        "surface_m2": rng.uniform(9, 200, rows).round(1),
+        "description": pd.array(np.array(descs, dtype=object)[idx], dtype="string"),
+        "dpe_letter": pd.array(rng.choice(list("ABCDEFG") + [None], rows), dtype="string"),
+        "floor_raw": pd.Series(rng.choice([" 3 ", 2, "RDC\n", None, np.nan], rows), dtype=object),
+        "empty": pd.Series([None] * rows, dtype=object),
+    })
+    return df
+
+
+def run(rows: int, repeat: int) -> Dict:
+    base = synthetic_frame(rows)
+    t_map, t_vec = [], []
+    for _ in range(repeat):
+        df = base.copy()
+        t0 = time.perf_counter()
+        ref = sanitize_strings_map(df)
+        t_map.append(time.perf_counter() - t0)
+        df = base.copy()
+        t0 = time.perf_counter()
+        out = cleaner.sanitize_strings(df)
+        t_vec.append(time.perf_counter() - t0)
+    pd.testing.assert_frame_equal(out, ref)
+    m, v = min(t_map), min(t_vec)
+    return {"rows": rows, "map_s": round(m, 3), "vectorized_s": round(v, 3), "speedup": round(m / v, 1)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark de sanitize_strings")
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--save", action="store_true", help=f"enregistrer dans {RESULTS_PATH.relative_to(ROOT)}")
+    args = ap.parse_args()
+
+    results: List[Dict] = []
+    for rows in args.rows:
+        res = run(rows, args.repeat)
+        results.append(res)
+        print(f"{rows:>10,} lignes : map {res['map_s']:.3f} s  •  vectorisé {res['vectorized_s']:.3f} s"
+              f"  •  ×{res['speedup']}  (sortie identique)".replace(",", " "))
+    if args.save:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RESULTS_PATH.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"✔ Résultats enregistrés : {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# bench/bench_search.py
+"""
+Benchmark de la recherche texte du tableau de bord : `SearchIndex.search` (index
+construit une fois) contre l'ancien `df["address"].str.contains(q, case=False)`.
+
+Mêmes données que bench_load_csv.py (CSV du cleaner sur annonces synthétiques).
+Sur l'adresse seule, les lignes trouvées par l'index contiennent celles de
+str.contains (vérifié pour chaque requête) :
+
+    python bench/bench_search.py                          # 1 000 000 d'annonces, sans descriptions
+    python bench/bench_search.py --rows 300000 --with-description --save
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "bench"))
+
+from bench_cleaner import WORKDIR, _fmt, _stage             # noqa: E402
+from bench_load_csv import csv_path                         # noqa: E402
+from schema import read_cleaned_csv                         # noqa: E402
+from search_index import SearchIndex                        # noqa: E402
+
+RESULTS_PATH = ROOT / "bench" / "results" / "search.json"
+QUERIES      = ["ménilmontant", "montant", "paris 11", "belle", "goutte d'or", "balcon sud", "cave", "vendome"]
+
+
+def run(rows: int, seed: int, workdir: Path, with_description: bool, queries: List[str]) -> Dict:
+    columns = ["address", "title"] + (["description"] if with_description else [])
+    df = read_cleaned_csv(str(csv_path(workdir, rows, seed)), columns=columns)
+    st: Dict[str, Dict] = {}
+    idx = _stage(st, "build_index", lambda: SearchIndex(df))
+    address_only = SearchIndex(df[["address"]])
+    res = {"rows": rows, "with_description": with_description, "build_s": st["build_index"]["s"],
+           "build_delta_mib": st["build_index"]["delta_mib"], "vocabulary": len(idx.vocab), "queries": {}}
+    for q in queries:
+        t0 = time.perf_counter()
+        pos, _ = idx.search(q)
+        t_index = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ref = np.flatnonzero(df["address"].str.contains(q, case=False, na=False, regex=False).to_numpy(dtype=bool))
+        t_scan = time.perf_counter() - t0
+        assert np.isin(ref, address_only.search(q)[0]).all(), q
+        res["queries"][q] = {"hits": len(pos), "index_ms": round(t_index * 1e3, 2),
+                             "str_contains_hits": len(ref), "str_contains_ms": round(t_scan * 1e3, 2)}
+    return res
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark de la recherche texte du tableau de bord")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--with-description", action="store_true")
+    ap.add_argument("--workdir", type=Path, default=WORKDIR)
+    ap.add_argument("--save", action="store_true", help=f"ajouter à {RESULTS_PATH.relative_to(ROOT)}")
+    args = ap.parse_args()
+
+    results = []
+    for rows in args.rows:
+        res = run(rows, args.seed, args.workdir, args.with_description, QUERIES)
+        results.append(res)
+        print(f"{_fmt(rows)} annonces{' (avec descriptions)' if res['with_description'] else ''} : "
+              f"index construit en {res['build_s']:.2f} s ({_fmt(res['build_delta_mib'] or 0, sign=True)} Mio), "
+              f"{_fmt(res['vocabulary'])} mots")
+        for q, r in res["queries"].items():
+            print(f"  {q!r:<16} index {_fmt(r['hits']):>9} lignes {r['index_ms']:7.1f} ms   "
+                  f"str.contains(adresse) {_fmt(r['str_contains_hits']):>9} lignes {r['str_contains_ms']:7.1f} ms")
+    if args.save:
+        old = json.loads(RESULTS_PATH.read_text(encoding="utf-8")) if RESULTS_PATH.exists() else []
+        keep = [r for r in old if (r["rows"], r["with_description"]) not in
+                {(n["rows"], n["with_description"]) for n in results}]
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RESULTS_PATH.write_text(json.dumps(keep + results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"✔ Résultats enregistrés : {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
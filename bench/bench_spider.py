@@ -0,0 +1,255 @@
+# bench/bench_spider.py
+"""
+Benchmark hors ligne de l'extraction du spider sur un corpus HTML figé.
+
+Chaque page du corpus (`bench/corpus/detail/*.html`, `bench/corpus/search/*.html`)
+est servie à `parse_detail`, `parse_search`, `extract_dpe_and_ges_letters` et
+`extract_year_built` via une réponse Scrapy construite localement (aucun réseau).
+Le fichier `.json` voisin donne la sortie attendue (URL incluse).
+
+    python bench/bench_spider.py                      # rapport + comparaison à la baseline
+    python bench/bench_spider.py --save-baseline      # fige les résultats courants
+    python bench/bench_spider.py --check              # code retour 1 si régression
+    python bench/bench_spider.py --archive data/archive   # débit seul sur l'archive HTML
+
+Comme pour bench_cleaner.py, les temps sont comparés en unités d'étalon (charge de
+référence mesurée à chaque run) : la baseline reste valable sur une autre machine.
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "bench"))
+
+from scrapy.http import HtmlResponse, Request   # noqa: E402
+from scrapy.utils.test import get_crawler       # noqa: E402
+
+import spider                                    # noqa: E402
+from bench_cleaner import calibrate              # noqa: E402
+
+CORPUS_DIR    = ROOT / "bench" / "corpus"
+BASELINE_PATH = ROOT / "bench" / "results" / "spider_baseline.json"
+FIELDS = ["title", "price_eur", "surface_m2", "rooms", "floor", "address", "postal_code",
+          "description", "dpe_letter", "ges_letter", "year_built", "property_type"]
+
+
+# ----------------- Corpus & fausses réponses -----------------
+def load_pages(kind: str, corpus: Path) -> List[Dict]:
+    pages = []
+    for html in sorted((corpus / kind).glob("*.html")):
+        golden = json.loads(html.with_suffix(".json").read_text(encoding="utf-8"))
+        pages.append({"name": html.stem, "url": golden["url"], "body": html.read_bytes(), "golden": golden})
+    return pages
+
+
+def load_archive_pages(root: Path) -> List[Dict]:
+    from archive import HtmlArchive
+    arch = HtmlArchive(root)
+    return [{"name": e["sha256"][:12], "url": e["url"], "body": arch.get(e["sha256"]), "golden": None}
+            for e in arch.latest().values()]
+
+
+def fake_response(page: Dict) -> HtmlResponse:
+    return HtmlResponse(page["url"], body=page["body"], encoding="utf-8", request=Request(page["url"]))
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.items = []
+
+    def append(self, item):
+        self.items.append(item)
+
+    def record_seen(self, ids, day=None):
+        pass
+
+
+def offline_spider():
+    """Instance du spider sans store disque ni index d'IDs (rien n'est lu ni écrit)."""
+    sp = spider.SeLogerSelectorsTP.__new__(spider.SeLogerSelectorsTP)
+    sp.crawler = get_crawler(spider.SeLogerSelectorsTP)
+    sp.search_url, sp.max_new, sp.max_pages = spider.SEARCH_URL, 10**9, 10**9
+    sp.archive = sp.pool = None
+    sp.revisit_known = False
+    sp.detail_callback = sp.parse_detail
+    reset_spider(sp)
+    return sp
+
+
+def reset_spider(sp) -> None:
+    sp.store, sp.known, sp.requested_ids = _MemoryStore(), set(), set()
+    sp.sightings = sp.store
+    sp.new_found = sp.pages_seen = sp.in_flight = 0
+    sp.backlog, sp.next_page = deque(), None
+
+
+# ----------------- Mesures -----------------
+def _timeit(fn, repeat: int) -> float:
+    """Meilleur temps (s) de `repeat` exécutions : le bruit de la machine ne fait
+    qu'allonger une mesure, comme pour l'étalon."""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return min(runs)
+
+
+def run_detail(sp, page: Dict) -> Optional[Dict]:
+    reset_spider(sp)
+    list(sp.parse_detail(fake_response(page)) or [])
+    return sp.store.items[-1] if sp.store.items else None
+
+
+def run_search(sp, page: Dict) -> Dict:
+    reset_spider(sp)
+    reqs = list(sp.parse_search(fake_response(page)))
+    return {"detail_urls": [r.url for r in reqs if r.callback == sp.parse_detail],
+            "next_url": next((r.url for r in reqs if r.callback == sp.parse_search), None)}
+
+
+def bench(detail: List[Dict], search: List[Dict], repeat: int) -> Dict:
+    sp = offline_spider()
+    funcs = {
+        "parse_detail": lambda p: run_detail(sp, p),
+        "page_text": lambda p: spider.PageContext(fake_response(p)).text,
+        "extract_dpe_and_ges_letters": lambda p: spider.extract_dpe_and_ges_letters(fake_response(p)),
+        "extract_year_built": lambda p: spider.extract_year_built(fake_response(p)),
+    }
+    per_func = {name: sum(_timeit(lambda: fn(p), repeat) for p in detail) / max(len(detail), 1) * 1e3
+                for name, fn in funcs.items()}
+    per_func["parse_search"] = sum(_timeit(lambda: run_search(sp, p), repeat) for p in search) / max(len(search), 1) * 1e3
+
+    # Débit de bout en bout sur les fiches
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for p in detail:
+            run_detail(sp, p)
+    elapsed = time.perf_counter() - t0
+    pages_per_sec = repeat * len(detail) / elapsed if elapsed else 0.0
+
+    # Mémoire de pointe sur une passe
+    tracemalloc.start()
+    for p in detail:
+        run_detail(sp, p)
+    for p in search:
+        run_search(sp, p)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Exactitude par champ contre les sorties de référence
+    hits = {f: 0 for f in FIELDS}
+    scored, misses = 0, []
+    for p in detail:
+        if p["golden"] is None:
+            continue
+        item = run_detail(sp, p) or {}
+        scored += 1
+        for f in FIELDS:
+            if item.get(f) == p["golden"].get(f):
+                hits[f] += 1
+            else:
+                misses.append(f"{p['name']}.{f}: {item.get(f)!r} ≠ {p['golden'].get(f)!r}")
+    search_ok = sum(run_search(sp, p) == {k: p["golden"][k] for k in ("detail_urls", "next_url")}
+                    for p in search if p["golden"] is not None)
+
+    accuracy = {f: round(hits[f] / scored, 4) for f in FIELDS} if scored else {}
+    return {
+        "pages": {"detail": len(detail), "search": len(search)},
+        "pages_per_sec": round(pages_per_sec, 1),
+        "ms_per_call": {k: round(v, 3) for k, v in per_func.items()},
+        "peak_kib": round(peak / 1024, 1),
+        "accuracy": accuracy,
+        "accuracy_overall": round(sum(hits.values()) / (scored * len(FIELDS)), 4) if scored else None,
+        "search_pages_ok": f"{search_ok}/{len(search)}",
+        "misses": misses,
+    }
+
+
+def _scale(res: Dict, base: Dict) -> Optional[float]:
+    # Temps de la baseline ramenés à cette machine ; None si la baseline n'a pas d'étalon
+    return res["calibration_s"] / base["calibration_s"] if base.get("calibration_s") else None
+
+
+def compare(res: Dict, base: Dict, tolerance: float) -> List[str]:
+    """Régressions par rapport à la baseline : temps (en unités d'étalon, au-delà de
+    `tolerance`) et exactitude."""
+    problems = []
+    scale = _scale(res, base)
+    for k, v in res["ms_per_call"].items():
+        b = base.get("ms_per_call", {}).get(k)
+        if b and scale and v > b * scale * (1 + tolerance):
+            problems.append(f"{k} : {b * scale:.3f} → {v:.3f} ms (+{(v / (b * scale) - 1) * 100:.0f} % à étalon égal)")
+    for f, v in res["accuracy"].items():
+        b = base.get("accuracy", {}).get(f)
+        if b is not None and v < b:
+            problems.append(f"exactitude {f} : {b:.2%} → {v:.2%}")
+    if base.get("search_pages_ok") and res["search_pages_ok"] != base["search_pages_ok"]:
+        problems.append(f"pages de recherche : {base['search_pages_ok']} → {res['search_pages_ok']}")
+    return problems
+
+
+def print_report(res: Dict, base: Optional[Dict]) -> None:
+    print(f"Fiches : {res['pages']['detail']}  •  recherche : {res['pages']['search']}")
+    print(f"Débit parse_detail : {res['pages_per_sec']} pages/s  •  mémoire de pointe : {res['peak_kib']} Kio  •  "
+          f"étalon : {res['calibration_s'] * 1e3:.1f} ms")
+    scale = _scale(res, base or {})
+    if base and not scale:
+        print("  (baseline sans étalon : temps non comparés, à refaire avec --save-baseline)")
+    for k, v in res["ms_per_call"].items():
+        ref = (base or {}).get("ms_per_call", {}).get(k)
+        delta = f"  ({(v / (ref * scale) - 1) * 100:+.0f} % vs baseline)" if ref and scale else ""
+        print(f"  {k:<30} {v:8.3f} ms{delta}")
+    if res["accuracy"]:
+        print(f"Exactitude globale : {res['accuracy_overall']:.2%}  •  recherche : {res['search_pages_ok']}")
+        for f, v in res["accuracy"].items():
+            print(f"  {f:<14} {v:.0%}")
+        for m in res["misses"]:
+            print(f"  ✗ {m}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark hors ligne de l'extraction du spider")
+    ap.add_argument("--corpus", type=Path, default=CORPUS_DIR)
+    ap.add_argument("--archive", type=Path, help="mesurer le débit sur une archive HTML (sans référence)")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="hausse de temps tolérée (0.25 = +25 %%)")
+    ap.add_argument("--check", action="store_true", help="code retour 1 en cas de régression")
+    args = ap.parse_args()
+
+    if args.archive:
+        detail, search = load_archive_pages(args.archive), []
+    else:
+        detail, search = load_pages("detail", args.corpus), load_pages("search", args.corpus)
+    calib = calibrate()
+    res = bench(detail, search, args.repeat)
+    res["calibration_s"] = round((calib + calibrate()) / 2, 5)   # étalon encadrant la mesure
+
+    base = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    print_report(res, base)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(res, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"✔ Baseline enregistrée : {args.baseline}")
+    elif base:
+        problems = compare(res, base, args.tolerance)
+        for p in problems:
+            print(f"⚠ Régression : {p}")
+        if not problems:
+            print("✔ Aucune régression par rapport à la baseline")
+        if problems and args.check:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# bench/synth.py
+"""
+Générateur reproductible d'annonces brutes synthétiques, au format des items du spider.
+
+Prix au m² par arrondissement, surfaces et pièces cohérentes, descriptions de
+250 à 2 000 caractères (retours ligne, doubles espaces, « m² », accents, « ; »),
+champs manquants, quelques valeurs au format français (« 518 400 € », « 57,5 m² »)
+et quelques valeurs factices (prix à 1 €, surface à 1 m²).
+
+    python bench/synth.py --rows 1000000 --out /tmp/raw_1m.json            # tableau JSON (ancien format)
+    python bench/synth.py --rows 1000000 --out /tmp/raw_1m --format store  # store segmenté (data/raw)
+
+    from synth import iter_records
+    for rec in iter_records(10_000, seed=0): ...
+"""
+import argparse
+import json
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterator
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+BLOCK     = 50_000        # annonces générées par bloc vectorisé
+DESC_POOL = 20_000        # descriptions distinctes (tirées au hasard pour chaque annonce)
+
+# Arrondissement → (prix au m² médian, quartiers)
+ARRONDISSEMENTS = {
+    "75001": (13_500, ["Vendôme", "Palais Royal", "Les Halles"]),
+    "75002": (12_500, ["Bourse", "Sentier", "Montorgueil"]),
+    "75003": (13_000, ["Marais", "Arts et Métiers", "Temple"]),
+    "75004": (14_000, ["Île Saint-Louis", "Saint-Paul", "Notre-Dame"]),
+    "75005": (13_000, ["Jardin des Plantes", "Val de Grâce", "Sorbonne"]),
+    "75006": (15_500, ["Odéon", "Saint-Germain-des-Prés", "Notre-Dame-des-Champs"]),
+    "75007": (15_000, ["Gros Caillou", "Invalides", "École Militaire"]),
+    "75008": (12_500, ["Europe", "Madeleine", "Champs-Élysées"]),
+    "75009": (11_500, ["Saint-Georges", "Chaussée d'Antin", "Rochechouart"]),
+    "75010": (10_000, ["Saint-Vincent-de-Paul", "Porte Saint-Martin", "Hôpital Saint-Louis"]),
+    "75011": (10_200, ["Folie-Méricourt", "Roquette", "Sainte-Marguerite"]),
+    "75012": (9_600, ["Bel-Air", "Picpus", "Bercy"]),
+    "75013": (9_000, ["Gare", "Maison-Blanche", "Croulebarbe"]),
+    "75014": (10_200, ["Montparnasse", "Petit-Montrouge", "Plaisance"]),
+    "75015": (10_300, ["Saint-Lambert", "Necker", "Grenelle"]),
+    "75016": (11_500, ["Chaillot", "Auteuil", "Muette"]),
+    "75116": (12_000, ["Chaillot", "Porte Dauphine"]),
+    "75017": (10_800, ["Ternes", "Batignolles", "Épinettes"]),
+    "75018": (9_300, ["Clignancourt-Jules Joffrin", "Grandes Carrières", "Goutte d'Or"]),
+    "75019": (8_500, ["Villette", "Pont de Flandre", "Amérique"]),
+    "75020": (8_700, ["Télégraphe-Pelleport Saint Fargeau", "Belleville", "Charonne"]),
+}
+PROPERTY_TYPES = ["appartement", "maison", "loft", "duplex", "studio"]
+PROPERTY_P     = [0.86, 0.03, 0.02, 0.04, 0.05]
+LETTERS        = list("ABCDEFG")
+LETTERS_P      = [0.02, 0.05, 0.17, 0.30, 0.24, 0.12, 0.10]
+
+# Taux de champs manquants / mal formés (ordres de grandeur observés sur les vraies fiches)
+P_MISSING = {"price_eur": 0.02, "surface_m2": 0.02, "rooms": 0.05, "floor": 0.12, "address": 0.01,
+             "postal_code": 0.01, "description": 0.03, "dpe_letter": 0.15, "ges_letter": 0.18,
+             "year_built": 0.35, "property_type": 0.02}
+P_FR_FORMAT   = 0.03       # prix / surface en texte français
+P_PLACEHOLDER = 0.002      # prix à 1 €, surface à 1 m²
+
+_SENTENCES = [
+    "Au {floor}ème étage avec ascenseur d'un bel immeuble {epoch}, un appartement de {surface}m² Carrez",
+    "Il se compose d'une entrée, d'un double séjour lumineux, d'une cuisine équipée et de {bedrooms} chambres",
+    "Parquet, moulures et cheminées d'origine ; belle hauteur sous plafond",
+    "Proche métro et commerces, à deux pas du marché",
+    "Une cave complète ce bien rare à la vente",
+    "Exposition sud, vue dégagée sur les toits de Paris",
+    "Salle d'eau avec WC, nombreux rangements sur mesure",
+    "Copropriété de {lots} lots, charges annuelles : {charges} €",
+    "Interphone, digicode, gardien ; espace vélos",
+    "Travaux à prévoir, fort potentiel",
+    "DPE en « {dpe} », montant estimé des dépenses annuelles d'énergie : {energy} €",
+    "Contacter l'agence 7j/7 pour une visite",
+]
+_SEPS   = [" ", ".\n ", ". ", ".  ", ".\n\n", " ; "]
+_SEPS_P = [0.10, 0.40, 0.35, 0.07, 0.05, 0.03]
+
+
+def _descriptions(rng: np.random.Generator, n: int) -> list:
+    """`n` descriptions de longueurs réalistes (log-normale, médiane ≈ 800 caractères),
+    assemblées à partir de phrases variées tirées en bloc."""
+    phrases = [_SENTENCES[rng.integers(len(_SENTENCES))].format(
+        floor=rng.integers(1, 8), epoch=rng.choice(["haussmannien", "des années 30", "récent"]),
+        surface=f"{rng.uniform(15, 150):.2f}".replace(".", ","), bedrooms=rng.integers(1, 5),
+        lots=rng.integers(5, 120), charges=f"{rng.integers(800, 6000):,}".replace(",", " "),
+        dpe=LETTERS[rng.integers(7)], energy=rng.integers(400, 4000)) for _ in range(1_000)]
+    mean_len = np.mean([len(p) for p in phrases]) + 2
+    target = np.clip(rng.lognormal(np.log(800), 0.45, n), 200, 2_500)
+    counts = np.maximum(1, np.round(target / mean_len)).astype(int)
+    pick = rng.integers(len(phrases), size=counts.sum()).tolist()
+    seps = rng.choice(len(_SEPS), size=counts.sum(), p=_SEPS_P).tolist()
+    out, k = [], 0
+    for c in counts.tolist():
+        out.append("".join(phrases[pick[j]] + _SEPS[seps[j]] for j in range(k, k + c)).strip())
+        k += c
+    return out
+
+
+def _slug(name: str) -> str:
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return ascii_name.lower().replace(" ", "-").replace("'", "-")
+
+
+def _fr_number(x: float, unit: str) -> str:
+    s = f"{x:,.0f}" if unit == "€" else f"{x:,.1f}"
+    return s.replace(",", " ").replace(".", ",") + f" {unit}"
+
+
+def iter_records(rows: int, seed: int = 0) -> Iterator[Dict]:
+    """`rows` annonces brutes, identiques pour une même graine."""
+    rng = np.random.default_rng(seed)
+    codes = list(ARRONDISSEMENTS)
+    base_ppm2 = np.array([ARRONDISSEMENTS[c][0] for c in codes], dtype=float)
+    descs = _descriptions(rng, min(DESC_POOL, max(rows, 1)))
+    places = {}      # code postal → [(segment d'URL, adresse)] par quartier
+    for cp, (_, names) in ARRONDISSEMENTS.items():
+        num = int(cp[-2:]) if cp != "75116" else 16
+        url_label, label = ("1er", "1er") if num == 1 else (f"{num}eme", f"{num}ème")
+        places[cp] = [(f"paris-{url_label}-75/{_slug(q)}", f"{q}, Paris {label} ({cp})") for q in names]
+
+    for lo in range(0, rows, BLOCK):
+        n = min(BLOCK, rows - lo)
+        ids = 200_000_000 + (lo + np.arange(n)) * 7 + rng.integers(0, 7, n)   # uniques, non contigus
+        arr = rng.integers(len(codes), size=n)
+        ptype = rng.choice(PROPERTY_TYPES, n, p=PROPERTY_P)
+        surface = np.clip(rng.lognormal(np.log(50), 0.55, n), 9, 600).round(1)
+        surface = np.where(ptype == "studio", np.clip(surface / 2.5, 9, 35).round(1), surface)
+        price = np.round(surface * base_ppm2[arr] * rng.lognormal(0, 0.18, n), -2)
+        rooms = np.clip(np.round(surface / 22 + rng.normal(0, 0.6, n)), 1, 12).astype(int)
+        floor = rng.integers(0, 9, n)
+        year = rng.choice(np.r_[rng.integers(1650, 1914, 50), rng.integers(1914, 2025, 50)], n)
+        dpe = rng.choice(LETTERS, n, p=LETTERS_P)
+        ges = rng.choice(LETTERS, n, p=LETTERS_P)
+        quarter = rng.integers(0, 3, n)
+        desc_idx = rng.integers(len(descs), size=n)
+        missing = {k: rng.random(n) < p for k, p in P_MISSING.items()}
+        fr = rng.random(n) < P_FR_FORMAT
+        placeholder = rng.random(n) < P_PLACEHOLDER
+
+        # Listes Python : l'accès élément par élément est bien plus rapide que sur les tableaux numpy
+        ids, arr, ptype, surface, price, rooms, floor, year, dpe, ges, quarter, desc_idx, fr, placeholder = (
+            a.tolist() for a in (ids, arr, ptype, surface, price, rooms, floor, year, dpe, ges, quarter,
+                                 desc_idx, fr, placeholder))
+        missing = {k: np.flatnonzero(m).tolist() for k, m in missing.items()}
+        records = []
+        for i in range(n):
+            cp = codes[arr[i]]
+            slug, address = places[cp][quarter[i] % len(places[cp])]
+            rec = {
+                "url": f"https://www.seloger.com/annonces/achat/{ptype[i]}/{slug}/{ids[i]}.htm",
+                "ID": ids[i],
+                "title": "SeLoger",
+                "price_eur": price[i],
+                "surface_m2": surface[i],
+                "rooms": rooms[i],
+                "floor": floor[i],
+                "address": address,
+                "postal_code": cp,
+                "description": descs[desc_idx[i]],
+                "dpe_letter": dpe[i],
+                "ges_letter": ges[i],
+                "year_built": year[i],
+                "property_type": ptype[i],
+            }
+            if fr[i]:
+                rec["price_eur"] = _fr_number(price[i], "€")
+                rec["surface_m2"] = _fr_number(surface[i], "m²")
+            if placeholder[i]:
+                rec["price_eur" if i % 2 else "surface_m2"] = 1.0
+            records.append(rec)
+        for k, rows_missing in missing.items():
+            for i in rows_missing:
+                records[i][k] = None
+        yield from records
+
+
+def write_json(path: Path, rows: int, seed: int = 0) -> None:
+    """Tableau JSON écrit au fil de l'eau (même format que data/raw_data.json)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i, rec in enumerate(iter_records(rows, seed)):
+            f.write((",\n" if i else "") + json.dumps(rec, ensure_ascii=False))
+        f.write("\n]\n")
+
+
+def write_store(root: Path, rows: int, seed: int = 0) -> None:
+    from store import ItemStore
+    store = ItemStore(root, fsync_every=10**9)
+    store.extend(iter_records(rows, seed))
+    store.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Annonces brutes synthétiques")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, required=True)
+    ap.add_argument("--format", choices=["json", "store"], default="json")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    (write_json if args.format == "json" else write_store)(args.out, args.rows, args.seed)
+    print(f"✔ {args.rows:,} annonces → {args.out} ({time.perf_counter() - t0:.1f} s)".replace(",", " "))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# src/aggregates.py
+"""
+Agrégats de marché précalculés par le cleaner, fusionnables d'un jour à l'autre.
+
+Grain : code postal × type de bien × lettre DPE × nombre de pièces.
+
+    data/aggregates/stats.parquet   # n, puis pour price_eur et price_per_m2 : n, somme, somme des carrés
+    data/aggregates/hist.parquet    # histogrammes à bornes fixes (log) : clés, métrique, classe, effectif
+
+Toutes les mesures sont des sommes : deux tables se fusionnent (ou se retranchent,
+pour une annonce modifiée) par simple addition, sans relire les annonces.
+Moyenne et écart-type viennent des sommes ; médiane et quantiles de l'histogramme
+(interpolation géométrique dans la classe, erreur bornée par la largeur d'une classe ≈ 4 %).
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+AGG_DIR     = Path("data/aggregates")
+GROUP_KEYS  = ["postal_code", "property_type", "dpe_letter", "rooms"]
+# Bornes fixes (partagées par tous les passages) ; classes extrêmes ouvertes
+BIN_EDGES: Dict[str, np.ndarray] = {
+    "price_eur":    np.geomspace(10_000, 20_000_000, 201),
+    "price_per_m2": np.geomspace(500, 100_000, 141),
+}
+METRICS = list(BIN_EDGES)
+
+
+# ----------------- Construction -----------------
+def _keys(df: pd.DataFrame) -> pd.DataFrame:
+    out = pd.DataFrame(index=df.index)
+    for k in GROUP_KEYS:
+        out[k] = df[k] if k in df.columns else pd.NA
+    out["postal_code"] = out["postal_code"].astype("string")
+    out["property_type"] = out["property_type"].astype("string")
+    out["dpe_letter"] = out["dpe_letter"].astype("string")
+    out["rooms"] = pd.to_numeric(out["rooms"], errors="coerce").astype("Int16")
+    return out
+
+
+def _bin(values: np.ndarray, metric: str) -> np.ndarray:
+    edges = BIN_EDGES[metric]
+    return np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+
+
+def summarize(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Annonces nettoyées → (stats, hist). Les annonces marquées `outlier` comptent
+    dans n mais pas dans les métriques."""
+    keys = _keys(df)
+    stats = keys.copy()
+    stats["n"] = 1
+    hists = []
+    outlier = df["outlier"].fillna(False).astype(bool) if "outlier" in df.columns \
+        else pd.Series(False, index=df.index)
+    for m in METRICS:
+        v = pd.to_numeric(df[m], errors="coerce").astype("float64") if m in df.columns \
+            else pd.Series(np.nan, index=df.index)
+        ok = v.notna() & ~outlier
+        stats[f"{m}_n"] = ok.astype("int64")
+        stats[f"{m}_sum"] = v.where(ok, 0.0)
+        stats[f"{m}_sumsq"] = (v * v).where(ok, 0.0)
+        h = keys[ok.to_numpy()].copy()
+        h["metric"] = m
+        h["bin"] = _bin(v[ok].to_numpy(), m).astype("int16")
+        h["count"] = 1
+        hists.append(h)
+    stats = stats.groupby(GROUP_KEYS, dropna=False, sort=True).sum().reset_index()
+    hist = pd.concat(hists, ignore_index=True)
+    hist = hist.groupby(GROUP_KEYS + ["metric", "bin"], dropna=False, sort=True)["count"].sum().reset_index()
+    return stats, hist
+
+
+def merge(a: Tuple[pd.DataFrame, pd.DataFrame], b: Tuple[pd.DataFrame, pd.DataFrame],
+          sign: int = 1) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """a + b (ou a − b avec sign=-1) ; les groupes devenus vides disparaissent."""
+    out = []
+    for x, y, keys in ((a[0], b[0], GROUP_KEYS), (a[1], b[1], GROUP_KEYS + ["metric", "bin"])):
+        y = y.copy()
+        vals = [c for c in y.columns if c not in keys]
+        y[vals] = y[vals] * sign
+        z = pd.concat([x, y], ignore_index=True).groupby(keys, dropna=False, sort=True).sum().reset_index()
+        count_col = "n" if "n" in z.columns else "count"
+        out.append(z[z[count_col] > 0].reset_index(drop=True))
+    return out[0], out[1]
+
+
+# ----------------- Lecture / écriture -----------------
+def write_aggregates(agg: Tuple[pd.DataFrame, pd.DataFrame], root: Path = AGG_DIR) -> None:
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    for name, df in zip(("stats", "hist"), agg):
+        tmp = root / f"_{name}.parquet.tmp"
+        df.to_parquet(tmp, index=False)
+        tmp.replace(root / f"{name}.parquet")
+
+
+def read_aggregates(root: Path = AGG_DIR) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    root = Path(root)
+    return pd.read_parquet(root / "stats.parquet"), pd.read_parquet(root / "hist.parquet")
+
+
+def exists(root: Path = AGG_DIR) -> bool:
+    return (Path(root) / "stats.parquet").exists() and (Path(root) / "hist.parquet").exists()
+
+
+# ----------------- Indicateurs -----------------
+def _select(df: pd.DataFrame, where: Optional[Dict[str, Iterable]]) -> pd.DataFrame:
+    mask = pd.Series(True, index=df.index)
+    for k, values in (where or {}).items():
+        mask &= df[k].isin(list(values))
+    return df[mask]
+
+
+def _hist_quantiles(counts: np.ndarray, metric: str, qs: List[float]) -> List[float]:
+    edges = BIN_EDGES[metric]
+    total = counts.sum()
+    if total == 0:
+        return [np.nan] * len(qs)
+    cum = np.cumsum(counts)
+    out = []
+    for q in qs:
+        i = int(np.searchsorted(cum, q * total, side="left"))
+        before = cum[i - 1] if i > 0 else 0
+        frac = (q * total - before) / counts[i] if counts[i] else 0.5
+        lo, hi = edges[i], edges[i + 1]
+        out.append(float(lo * (hi / lo) ** frac))
+    return out
+
+
+def summary(agg: Tuple[pd.DataFrame, pd.DataFrame], by: Optional[List[str]] = None,
+            where: Optional[Dict[str, Iterable]] = None,
+            qs: Tuple[float, ...] = (0.1, 0.25, 0.5, 0.75, 0.9)) -> pd.DataFrame:
+    """Indicateurs (effectif, moyenne, écart-type, quantiles) par `by`, après filtre `where`
+    (ex. where={"postal_code": ["75011"]}). Sans `by` : une seule ligne."""
+    stats, hist = _select(agg[0], where), _select(agg[1], where)
+    by = by or []
+    if by:
+        labels = stats[by].drop_duplicates().sort_values(by).reset_index(drop=True)
+        labels["_g"] = np.arange(len(labels))
+        stats, hist = stats.merge(labels, on=by), hist.merge(labels, on=by)   # NA = NA pour merge
+    else:
+        labels = pd.DataFrame({"_g": [0]})
+        stats, hist = stats.assign(_g=0), hist.assign(_g=0)
+    n_groups = len(labels)
+    sums = stats.groupby("_g")[[c for c in stats.columns if c == "n" or c.startswith(tuple(METRICS))]].sum()
+    sums = sums.reindex(range(n_groups), fill_value=0)
+
+    out = labels.drop(columns="_g").copy()
+    out["n"] = sums["n"].to_numpy()
+    for m in METRICS:
+        n, s1, s2 = (sums[f"{m}_{x}"].to_numpy(dtype="float64") for x in ("n", "sum", "sumsq"))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, s1 / n, np.nan)
+            out[f"{m}_n"] = n.astype("int64")
+            out[f"{m}_mean"] = mean
+            out[f"{m}_std"] = np.sqrt(np.clip(np.where(n > 0, s2 / n, np.nan) - mean ** 2, 0, None))
+        hm = hist[hist["metric"] == m]
+        counts = np.zeros((n_groups, len(BIN_EDGES[m]) - 1))
+        np.add.at(counts, (hm["_g"].to_numpy(), hm["bin"].to_numpy(dtype="int64")), hm["count"].to_numpy())
+        qv = np.array([_hist_quantiles(c, m, list(qs)) for c in counts]).reshape(n_groups, len(qs))
+        for j, q in enumerate(qs):
+            out[f"{m}_q{int(round(q * 100))}"] = qv[:, j]
+    return out
+
+
+def histogram(agg: Tuple[pd.DataFrame, pd.DataFrame], metric: str,
+              where: Optional[Dict[str, Iterable]] = None) -> pd.DataFrame:
+    """Distribution (bornes basse/haute, effectif) d'une métrique, classes non vides."""
+    h = _select(agg[1], where)
+    h = h[h["metric"] == metric].groupby("bin")["count"].sum()
+    edges = BIN_EDGES[metric]
+    return pd.DataFrame({"low": edges[h.index], "high": edges[h.index + 1], "count": h.to_numpy()})
@@ -1,22 +1,35 @@
 # app.py
 import re
-from functools import lru_cache
 import os
 import pandas as pd
 import streamlit as st
-import csv
-import io
-import requests
 import numpy as np
+import json
 
 from datetime import datetime
 from email.utils import parsedate_to_datetime
 
+import aggregates
+import remote_cache
+from dataset import dataset_columns, last_modified, list_partitions, read_dataset
+from filter_index import FilterIndex
+from search_index import SearchIndex
+from schema import CATEGORY_COLS, DESCRIPTION_COL, bytes_per_row, compact_schema, read_cleaned_csv
+
 
 # ---------- CONFIG ----------
 st.set_page_config(page_title="Immo Dashboard", layout="wide")
 
 DEFAULT_CSV_URL = "https://raw.githubusercontent.com/MarylineFONTA/PipeLine-Immobilier/refs/heads/main/data/cleaned_data.csv"
+# Dataset Parquet écrit par cleaner.py (utilisé s'il est présent localement)
+DEFAULT_PARQUET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "cleaned_parquet")
+# Agrégats de marché précalculés par cleaner.py (KPI globaux sans parcourir les annonces)
+DEFAULT_AGG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "aggregates")
+# Clusters de quasi-doublons calculés par cleaner.py (dedup.py)
+DEFAULT_DUP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "duplicates.parquet")
+# Cache disque des téléchargements (CSV distant, API GitHub), partagé entre processus
+HTTP_CACHE_DIR = os.getenv("IMMO_HTTP_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "http_cache"))
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
 
 PARIS_ARR_COORDS = {
     "75001": (48.8625, 2.3369), "75002": (48.8686, 2.3412), "75003": (48.8627, 2.3601),
@@ -31,54 +44,49 @@ PARIS_ARR_COORDS = {
 
 # ---------- UTILS ----------
 
-@st.cache_data(ttl=600)
-def get_csv_last_modified(url: str) -> datetime | None:
-    """Renvoie la date locale du dernier commit qui a modifié le fichier pointé
-    par une URL GitHub (raw ou blob). Ne plante pas si st.secrets est absent."""
-    def to_local(dt: datetime) -> datetime:
-        try:
-            from zoneinfo import ZoneInfo
-            return dt.astimezone(ZoneInfo("Europe/Paris"))
-        except Exception:
-            return dt.astimezone()
-
-    def parse_github(u: str):
-        # -> (owner, repo, branch, path) ou None
-        if "raw.githubusercontent.com" in u:
-            parts = u.split("raw.githubusercontent.com/")[-1].split("/")
-            owner, repo = parts[0], parts[1]
-            if len(parts) >= 5 and parts[2] == "refs" and parts[3] == "heads":
-                branch = parts[4]
-                path = "/".join(parts[5:])
-            else:
-                branch = parts[2]
-                path = "/".join(parts[3:])
-            return owner, repo, branch, path
-        if "github.com" in u and "/blob/" in u:
-            tail = u.split("github.com/")[-1]
-            owner, repo, _, branch, *pp = tail.split("/")
-            path = "/".join(pp)
-            return owner, repo, branch, path
-        return None
+def _to_local(dt: datetime) -> datetime:
+    try:
+        from zoneinfo import ZoneInfo
+        return dt.astimezone(ZoneInfo("Europe/Paris"))
+    except Exception:
+        return dt.astimezone()
+
+
+def _parse_github(u: str):
+    # -> (owner, repo, branch, path) ou None
+    if "raw.githubusercontent.com" in u:
+        parts = u.split("raw.githubusercontent.com/")[-1].split("/")
+        owner, repo = parts[0], parts[1]
+        if len(parts) >= 5 and parts[2] == "refs" and parts[3] == "heads":
+            branch = parts[4]
+            path = "/".join(parts[5:])
+        else:
+            branch = parts[2]
+            path = "/".join(parts[3:])
+        return owner, repo, branch, path
+    if "github.com" in u and "/blob/" in u:
+        tail = u.split("github.com/")[-1]
+        owner, repo, _, branch, *pp = tail.split("/")
+        path = "/".join(pp)
+        return owner, repo, branch, path
+    return None
+
+
+def raw_csv_url(url: str) -> str:
+    # Convertir URL GitHub "blob" -> "raw"
+    if url.startswith("http") and "github.com" in url and "/blob/" in url:
+        url = url.replace("https://github.com/", "https://raw.githubusercontent.com/").replace("/blob/", "/")
+    return url
+
 
-    parsed = parse_github(url)
+def commits_request(url: str) -> dict | None:
+    """Requête (arguments de remote_cache.fetch) du dernier commit qui a modifié le
+    fichier pointé par une URL GitHub (raw ou blob) ; None pour une autre URL."""
+    parsed = _parse_github(url)
     if not parsed:
-        # URL non GitHub : dernier recours = en-tête Last-Modified (souvent absent)
-        try:
-            r = requests.head(url, timeout=10, allow_redirects=True,
-                              headers={"User-Agent": "immo-dashboard"})
-            lm = r.headers.get("Last-Modified") or r.headers.get("last-modified")
-            if lm:
-                from email.utils import parsedate_to_datetime
-                return to_local(parsedate_to_datetime(lm))
-        except Exception:
-            pass
         return None
-
     owner, repo, branch, path = parsed
-    api = "https://api.github.com/repos/{}/{}/commits".format(owner, repo)
-    params = {"path": path, "sha": branch, "per_page": 1}
-    headers = {"Accept": "application/vnd.github+json", "User-Agent": "immo-dashboard"}
+    headers = {"Accept": "application/vnd.github+json"}
 
     # 🔐 Token optionnel : d'abord variable d'env, sinon secrets si dispo
     token = os.getenv("GITHUB_TOKEN")
@@ -89,47 +97,104 @@ def get_csv_last_modified(url: str) -> datetime | None:
             token = None
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    return {"url": f"{GITHUB_API_URL}/repos/{owner}/{repo}/commits",
+            "params": {"path": path, "sha": branch, "per_page": 1}, "headers": headers}
+
 
+@st.cache_data(ttl=600)
+def get_csv_last_modified(url: str) -> datetime | None:
+    """Renvoie la date locale du dernier commit qui a modifié le fichier pointé
+    par une URL GitHub (raw ou blob), sinon l'en-tête Last-Modified du CSV (déjà
+    dans le cache disque). Ne plante pas si st.secrets ou le réseau sont absents."""
+    req = commits_request(url)
     try:
-        r = requests.get(api, params=params, headers=headers, timeout=15)
-        if r.ok and r.json():
-            iso = r.json()[0]["commit"]["committer"]["date"]  # "YYYY-MM-DDTHH:MM:SSZ"
-            dt = datetime.fromisoformat(iso.replace("Z", "+00:00"))
-            return to_local(dt)
+        if req is None:
+            # URL non GitHub : dernier recours = en-tête Last-Modified (souvent absent)
+            lm = remote_cache.fetch(raw_csv_url(url), cache_dir=HTTP_CACHE_DIR, body=False).last_modified
+            return _to_local(parsedate_to_datetime(lm)) if lm else None
+        commits = json.loads(remote_cache.fetch(**req, cache_dir=HTTP_CACHE_DIR).content)
+        if commits:
+            iso = commits[0]["commit"]["committer"]["date"]  # "YYYY-MM-DDTHH:MM:SSZ"
+            return _to_local(datetime.fromisoformat(iso.replace("Z", "+00:00")))
     except Exception:
         pass
     return None
 
 
-@st.cache_data(show_spinner=True, ttl=600)
-def load_csv(url: str) -> pd.DataFrame:
-    # Convertir URL GitHub "blob" -> "raw"
-    if url.startswith("http") and "github.com" in url and "/blob/" in url:
-        url = url.replace("https://github.com/", "https://raw.githubusercontent.com/").replace("/blob/", "/")
+@st.cache_resource(show_spinner=True, max_entries=4)
+def load_csv(url: str, with_description: bool = False, version=None) -> pd.DataFrame:
+    """`version` (ETag du CSV distant, date du fichier local) : une copie inchangée
+    n'est pas relue ni re-parsée, une nouvelle version l'est aussitôt."""
+    url = raw_csv_url(url)
+    # Octets bruts (cache disque partagé, revalidé par If-None-Match ; fichier local mappé en
+    # mémoire) ; BOM et ligne 'sep=;' sautés sans copie, types de cleaner.coerce_types,
+    # descriptions (l'essentiel du volume) seulement à la demande
+    source = remote_cache.fetch(url, cache_dir=HTTP_CACHE_DIR).content if url.startswith("http") else url
+    df = read_cleaned_csv(source, exclude=() if with_description else (DESCRIPTION_COL,))
+    return _compact(df)
+
+
+def csv_version(url: str):
+    """Revalide (304 si inchangés) le CSV et la date de son dernier commit en
+    parallèle ; renvoie la version du CSV et le statut de la copie ("stale" : origine
+    injoignable, dernière copie servie)."""
+    url = raw_csv_url(url)
+    if not url.startswith("http"):
+        return (os.path.getmtime(url) if os.path.exists(url) else None), None
+    specs = [{"url": url}] + [r for r in [commits_request(url)] if r]
+    res = remote_cache.prefetch(specs, cache_dir=HTTP_CACHE_DIR)[0]
+    if res is None:
+        return None, None
+    return res.etag or res.last_modified or res.validated_at, res.status
+
+@st.cache_resource(show_spinner=True, max_entries=4)
+def load_parquet(path: str, postal_codes: tuple = (), with_description: bool = False, version=None) -> pd.DataFrame:
+    # `version` (date du dataset) : même clé que les index construits sur ce DataFrame.
+    # Élagage : seulement les arrondissements choisis, et sans `description` par défaut
+    columns = None
+    if not with_description:
+        columns = [c for c in dataset_columns(path) if c != DESCRIPTION_COL]
+    df = read_dataset(path, columns=columns, postal_codes=list(postal_codes) or None, categories=CATEGORY_COLS)
+    return _compact(df)
+
+@st.cache_data(max_entries=4)
+def load_aggregates(path: str, version=None):
+    # Agrégats écrits par le cleaner avec le dataset local (`version` : date du dataset)
+    return aggregates.read_aggregates(path) if aggregates.exists(path) else None
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def summarize_frame(key: tuple, _df: pd.DataFrame):
+    # Autre source (CSV) : agrégats calculés une fois sur les lignes chargées
+    return aggregates.summarize(_df)
 
-    # Récupérer le contenu (pour détecter une éventuelle 1re ligne 'sep=;')
-    if url.startswith("http"):
-        text = requests.get(url, timeout=30).text
-    else:
-        with open(url, "r", encoding="utf-8", errors="replace") as f:
-            text = f.read()
-
-    # Sauter la ligne 'sep=;' éventuelle
-    lines = text.splitlines()
-    if lines and lines[0].strip().lower().startswith("sep="):
-        text = "\n".join(lines[1:])
-
-    # Lecture robuste en supposant que ton pipeline écrit avec ';' et des guillemets "
-    buf = io.StringIO(text)
-    return pd.read_csv(
-        buf,
-        sep=";",
-        engine="python",
-        encoding="utf-8",
-        quotechar='"',
-        quoting=csv.QUOTE_MINIMAL,
-        on_bad_lines="error",  # mets "warn" pour localiser si besoin
-    )
+@st.cache_data(ttl=600)
+def load_duplicate_ids(path: str) -> frozenset:
+    # IDs des annonces non canoniques (republications d'une annonce déjà présente)
+    dups = pd.read_parquet(path, columns=["ID", "is_canonical"])
+    return frozenset(dups.loc[~dups["is_canonical"], "ID"].astype(str))
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_filter_index(key: tuple, _df: pd.DataFrame, dup_path: str | None) -> FilterIndex:
+    # Construit une fois par jeu de données (`key` : source, version, doublons) ; les
+    # reruns des curseurs ne font plus que des recherches dichotomiques et des ET de bitmaps
+    flags = {}
+    if "outlier" in _df:
+        flags["outlier"] = _df["outlier"]
+    if dup_path and "ID" in _df:
+        flags["duplicate"] = _df["ID"].astype(str).isin(load_duplicate_ids(dup_path))
+    return FilterIndex(_df, flags=flags)
+
+@st.cache_resource(show_spinner="Indexation des textes…", max_entries=2)
+def load_search_index(key: tuple, _df: pd.DataFrame) -> SearchIndex:
+    # Construit à la première recherche sur ce jeu de données (description incluse si chargée)
+    return SearchIndex(_df)
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    # Schéma compact (catégories, entiers étroits) ; octets/ligne avant → après pour la sidebar
+    before = bytes_per_row(df)
+    df = compact_schema(df)
+    df.attrs["bytes_per_row"] = (before, bytes_per_row(df))
+    return df
 
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     # Harmonise les noms de colonnes usuels
@@ -186,83 +251,57 @@ def extract_city(addr: str) -> str | None:
     m = re.search(r"([A-Za-zÀ-ÖØ-öø-ÿ'’\- ]+)\s*\(", addr)
     return m.group(1).strip() if m else None
 
-@lru_cache(maxsize=2048)
-def geocode_address(addr: str) -> tuple[float | None, float | None]:
-    """Géocodage Nominatim + normalisation Paris arrondissements."""
-    if not addr:
-        return (None, None)
-
-    try:
-        from geopy.geocoders import Nominatim
-        import time, re
-
-        geolocator = Nominatim(user_agent="streamlit-immo-dashboard")
-        q = addr.strip()
-
-        # 1) Si CP déjà présent (ex: 75014), on s'en sert tel quel
-        m_cp = re.search(r"\b(\d{5})\b", q)
-        if m_cp:
-            cp = m_cp.group(1)
-            # on renforce la requête
-            q1 = f"{q}, {cp}, France"
-            loc = geolocator.geocode(q1, exactly_one=True, addressdetails=False, country_codes="fr", timeout=10)
-            if loc:
-                return (loc.latitude, loc.longitude)
-
-        # 2) Si mention "Paris xx(e/ème)" sans CP, on fabrique le CP
-        m_arr = re.search(r"paris[^0-9]*(\d{1,2})(?:er|e|ème)?", q, re.IGNORECASE)
-        if m_arr:
-            n = int(m_arr.group(1))
-            cps = []
-            if 1 <= n <= 20:
-                cps.append(f"750{n:02d}")
-                # cas particulier du 16e : parfois 75116
-                if n == 16:
-                    cps.append("75116")
-            # On tente avec les CP construits
-            for cp_try in cps:
-                q2 = f"{q}, {cp_try}, Paris, France"
-                loc = geolocator.geocode(q2, exactly_one=True, addressdetails=False, country_codes="fr", timeout=10)
-                if loc:
-                    return (loc.latitude, loc.longitude)
-                time.sleep(1)  # respecter ~1 req/s
-
-        # 3) Fallback : préciser la ville/pays
-        if "paris" in q.lower():
-            q3 = f"{q}, Paris, France"
-        else:
-            q3 = f"{q}, France"
-
-        loc = geolocator.geocode(q3, exactly_one=True, addressdetails=False, country_codes="fr", timeout=10)
-        if loc:
-            return (loc.latitude, loc.longitude)
-
-    except Exception:
-        pass
-
-    return (None, None)
-
-
 # ---------- SIDEBAR ----------
 st.sidebar.header("Paramètres")
-csv_url = st.sidebar.text_input("URL CSV (GitHub raw)", value=DEFAULT_CSV_URL, help="https://github.com/MarylineFONTA/PipeLine-Immobilier/blob/main/data/cleaned_data.csv")
+use_parquet = os.path.isdir(DEFAULT_PARQUET_DIR) and st.sidebar.checkbox(
+    "Lire le Parquet local", value=True, help="data/cleaned_parquet, écrit par cleaner.py")
+if use_parquet:
+    arr_sel = st.sidebar.multiselect("Codes postaux (chargement)", list_partitions(DEFAULT_PARQUET_DIR), default=[])
+else:
+    csv_url = st.sidebar.text_input("URL CSV (GitHub raw)", value=DEFAULT_CSV_URL, help="https://github.com/MarylineFONTA/PipeLine-Immobilier/blob/main/data/cleaned_data.csv")
+
+with_desc = st.sidebar.checkbox("Charger les descriptions", value=False)
 
 if st.sidebar.button("↻ Recharger les données"):
     load_csv.clear()   # vide le cache
+    get_csv_last_modified.clear()
+    remote_cache.expire(HTTP_CACHE_DIR)   # copies gardées, revalidées (304 si inchangées)
+    load_parquet.clear()
+    load_aggregates.clear()
+    summarize_frame.clear()
+    load_duplicate_ids.clear()
+    load_filter_index.clear()
+    load_search_index.clear()
     st.rerun()
-    
-df = load_csv(csv_url)
+
+if use_parquet:
+    parquet_ver = last_modified(DEFAULT_PARQUET_DIR)
+    df = load_parquet(DEFAULT_PARQUET_DIR, tuple(arr_sel), with_desc, parquet_ver)
+    data_key = ("parquet", tuple(arr_sel), with_desc, parquet_ver)
+else:
+    csv_ver, csv_status = csv_version(csv_url)
+    df = load_csv(csv_url, with_desc, csv_ver)
+    data_key = ("csv", csv_url, with_desc, csv_ver)
+    if csv_status == "stale":
+        st.sidebar.warning("Source injoignable : affichage de la dernière copie téléchargée.")
+
+dup_path = DEFAULT_DUP_PATH if os.path.isfile(DEFAULT_DUP_PATH) else None
+fidx = load_filter_index(data_key + (dup_path and os.path.getmtime(dup_path),), df, dup_path)
+
+if "bytes_per_row" in df.attrs:
+    b_before, b_after = df.attrs["bytes_per_row"]
+    gain = f"{b_before:,.0f} → " if round(b_before) != round(b_after) else ""
+    st.sidebar.caption(f"Mémoire : {gain}{b_after:,.0f} octets/ligne".replace(",", " "))
 
 
 st.sidebar.markdown("### Filtres")
-price_eur_min, price_eur_max = (
-    int(df["price_eur"].min()) if "price_eur" in df and df["price_eur"].notna().any() else 0,
-    int(df["price_eur"].max()) if "price_eur" in df and df["price_eur"].notna().any() else 1_000_000,
-)
-surface_m2_min, surface_m2_max = (
-    int(df["surface_m2"].min()) if "surface_m2" in df and df["surface_m2"].notna().any() else 0,
-    int(df["surface_m2"].max()) if "surface_m2" in df and df["surface_m2"].notna().any() else 200,
-)
+# Bornes lues dans l'index (valeurs triées) : pas de parcours des colonnes à chaque rerun
+price_eur_min, price_eur_max = map(int, fidx.bounds("price_eur") or (0, 1_000_000))
+surface_m2_min, surface_m2_max = map(int, fidx.bounds("surface_m2") or (0, 200))
+
+# Un seul arrondissement chargé peut ne contenir qu'une annonce : bornes distinctes
+price_eur_max = max(price_eur_max, price_eur_min + 1)
+surface_m2_max = max(surface_m2_max, surface_m2_min + 1)
 
 def fmt_fr(n): return f"{int(n):,}".replace(",", " ")
 
@@ -286,16 +325,15 @@ price_eur_sel = st.sidebar.select_slider(
 surface_m2_sel = st.sidebar.slider("Surface (m²)", min_value=surface_m2_min, max_value=surface_m2_max,
                                 value=(surface_m2_min, surface_m2_max), step=1)
 
-cities = sorted([c for c in df.get("city", pd.Series([])).dropna().unique().tolist()])
+cities = fidx.values("city")
 city_sel = st.sidebar.multiselect("Ville", cities, default=[])
 
-q = st.sidebar.text_input("Recherche texte (dans l’adresse)", value="")
-
-do_geocode = False
-
-#do_geocode = st.sidebar
-# checkbox("Géocoder les lignes sans lat/lon (Nominatim)", value=False,
-#                                help="À utiliser avec parcimonie (quotas). Le résultat est mis en cache en mémoire.")
+q = st.sidebar.text_input("Recherche texte", value="", help="Adresse, titre (et description si chargée) ; "
+                          "sans accents ni majuscules, début ou morceau de mot (« menil », « montant »)")
+hide_outliers = "outlier" in df and st.sidebar.checkbox(
+    "Exclure les valeurs aberrantes", value=True, help="Prix ou surfaces invalides, ou extrêmes pour leur code postal et type de bien")
+hide_dups = dup_path is not None and "ID" in df and st.sidebar.checkbox(
+    "Masquer les doublons", value=True, help="Une seule annonce par bien republié (data/duplicates.parquet)")
 
 # ---------- MAIN ----------
 #st.title("🏠 Tableau de bord immobilier - Paris (Source : seloger.com)")
@@ -312,7 +350,10 @@ st.markdown(
 )
 
 # --- juste avant le header ---
-last_dt  = get_csv_last_modified(csv_url)               # ta fonction déjà définie
+if use_parquet:
+    last_dt = datetime.fromtimestamp(parquet_ver) if parquet_ver else None
+else:
+    last_dt = get_csv_last_modified(csv_url)               # ta fonction déjà définie
 last_txt = last_dt.strftime("%d/%m/%Y %H:%M") if last_dt else "indisponible"
 
 # --- header avec Source + Date sur UNE seule ligne ---
@@ -330,29 +371,33 @@ st.markdown(
 
 
 
-# KPIs en haut
+# KPIs en haut (agrégats précalculés du dataset local, sinon calculés sur les lignes chargées)
+agg = load_aggregates(DEFAULT_AGG_DIR, parquet_ver) if use_parquet else None
+if agg is None:
+    agg = summarize_frame(data_key, df)
+where = {"postal_code": arr_sel} if use_parquet and arr_sel else None
 left, mid, right = st.columns(3)
-left.metric("Annonces (total)", len(df))
-if "price_eur" in df:
-    mid.metric("Prix moyen (global)", f"{int(df['price_eur'].mean(skipna=True)):,} €".replace(",", " "))
-if {"price_eur", "surface_m2"}.issubset(df.columns):
-    right.metric("€/m² moyen (global)", f"{int(df['price_per_m2'].mean(skipna=True)):,} €".replace(",", " "))
-
-# Filtres
-mask = pd.Series(True, index=df.index)
-if "price_eur" in df:
-    mask &= df["price_eur"].between(price_eur_sel[0], price_eur_sel[1], inclusive="both")
-if "surface_m2" in df:
-    mask &= df["surface_m2"].between(surface_m2_sel[0], surface_m2_sel[1], inclusive="both")
-if city_sel and "city" in df:
-    mask &= df["city"].isin(city_sel)
+tot = aggregates.summary(agg, where=where).iloc[0]
+left.metric("Annonces (total)", int(tot["n"]))
+if tot["price_eur_n"]:
+    mid.metric("Prix moyen (global)", f"{int(tot['price_eur_mean']):,} €".replace(",", " "))
+if tot["price_per_m2_n"]:
+    right.metric("€/m² moyen (global)", f"{int(tot['price_per_m2_mean']):,} €".replace(",", " "))
+
+# Filtres : positions des lignes retenues (index), puis une seule extraction
+pos = fidx.query(
+    ranges={"price_eur": price_eur_sel, "surface_m2": surface_m2_sel},
+    sets={"city": city_sel},
+    exclude=[name for name, on in (("outlier", hide_outliers), ("duplicate", hide_dups)) if on],
+)
 if q:
-    if "address" in df:
-        mask &= df["address"].str.contains(q, case=False, na=False)
-    elif "city" in df:
-        mask &= df["city"].str.contains(q, case=False, na=False)
+    # Lignes trouvées par l'index de recherche (par pertinence) ∩ lignes retenues par les filtres
+    hits, _ = load_search_index(data_key, df).search(q)
+    kept = np.zeros(len(df), dtype=bool)
+    kept[pos] = True
+    pos = hits[kept[hits]]
 
-dff = df.loc[mask].copy()
+dff = df.take(pos)
 
 # KPIs filtrés
 st.subheader("🔎 Résultats filtrés")
@@ -475,36 +520,34 @@ def _try_show_map(df):
     return True
 
 
-# On force : pas de géocodage automatique
-do_geocode = False
-
-# A) 1er essai d'affichage avec les coordonnées déjà présentes
+# A) 1er essai d'affichage avec les coordonnées écrites par le cleaner (geocode.py)
 shown = _try_show_map(dff)
 
-# B) Si rien à afficher, on complète d'abord par le code postal Paris, puis on réessaie
+# B) Si rien à afficher, on complète par le centre de l'arrondissement (code postal), puis on réessaie
 if not shown and "postal_code" in dff.columns:
     missing = dff["lat"].isna() | dff["lon"].isna()
-    for idx, cp in dff.loc[missing, "postal_code"].astype(str).items():
-        cp = cp.strip()
-        if cp in PARIS_ARR_COORDS:
-            y, x = PARIS_ARR_COORDS[cp]
-            dff.at[idx, "lat"] = y
-            dff.at[idx, "lon"] = x
-    shown = _try_show_map(dff)
-
-# C) Optionnel : géocoder → jamais exécuté (do_geocode = False)
-if not shown and do_geocode and "address" in dff:
-    st.caption("Géocodage en cours (Nominatim)…")
-    lat_new, lon_new = [], []
-    for addr in dff["address"].fillna(""):
-        y, x = geocode_address(addr)
-        lat_new.append(y); lon_new.append(x)
-    dff.loc[dff["lat"].isna(), "lat"] = pd.Series(lat_new, index=dff.index)[dff["lat"].isna()]
-    dff.loc[dff["lon"].isna(), "lon"] = pd.Series(lon_new, index=dff.index)[dff["lon"].isna()]
+    cp = dff["postal_code"].astype("string").str.strip()
+    dff.loc[missing, "lat"] = cp[missing].map({k: v[0] for k, v in PARIS_ARR_COORDS.items()}).astype("float64")
+    dff.loc[missing, "lon"] = cp[missing].map({k: v[1] for k, v in PARIS_ARR_COORDS.items()}).astype("float64")
     shown = _try_show_map(dff)
 
 # ------------------ FIN CARTE ------------------
 
+# Marché par code postal (agrégats : quelques centaines de lignes au plus)
+st.markdown("### 📊 Marché par code postal")
+by_cp = aggregates.summary(agg, by=["postal_code"], where=where)
+st.dataframe(
+    pd.DataFrame({
+        "Code postal": by_cp["postal_code"],
+        "Annonces": by_cp["n"],
+        "Prix médian (€)": by_cp["price_eur_q50"].round(-3),
+        "€/m² médian": by_cp["price_per_m2_q50"].round(0),
+        "€/m² 10 %": by_cp["price_per_m2_q10"].round(0),
+        "€/m² 90 %": by_cp["price_per_m2_q90"].round(0),
+    }),
+    use_container_width=True, hide_index=True,
+)
+
 # Tableau
 st.markdown("### 📋 Données filtrées")
 # Configuration des colonnes (URL cliquable si possible)
@@ -516,7 +559,7 @@ if "url" in dff.columns:
         pass
 
 st.dataframe(
-    dff.sort_values(by=["price_eur"], ascending=True, na_position="last") if "price_eur" in dff else dff,
+    dff.sort_values(by=["price_eur"], ascending=True, na_position="last") if "price_eur" in dff and not q else dff,
     use_container_width=True,
     column_config=col_config or None,
 )
@@ -0,0 +1,73 @@
+# src/archive.py
+"""
+Archive HTML compressée et adressée par contenu des fiches téléchargées.
+
+    data/archive/objects/ab/abcdef….html.gz   # corps gzip, nom = sha256 du HTML brut
+    data/archive/manifest.jsonl               # url, ID, sha256, encodage, date de capture
+
+Deux captures identiques ne sont stockées qu'une fois ; le manifeste (append-only)
+garde l'historique des captures et sert d'entrée à `reextract.py`.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+ARCHIVE_DIR   = Path("data/archive")
+MANIFEST_NAME = "manifest.jsonl"
+GZIP_LEVEL    = 6
+
+
+class HtmlArchive:
+    def __init__(self, root: Path = ARCHIVE_DIR):
+        self.root = Path(root)
+        self._manifest = None
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.html.gz"
+
+    def put(self, url: str, body: bytes, id_val: Optional[int] = None, encoding: str = "utf-8") -> str:
+        """Archive un corps de page ; renvoie son empreinte sha256."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(gzip.compress(body, compresslevel=GZIP_LEVEL))
+            os.replace(tmp, path)
+        if self._manifest is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            # Tamponné par ligne : après un crash, chaque objet écrit a son entrée au manifeste
+            self._manifest = (self.root / MANIFEST_NAME).open("a", encoding="utf-8", buffering=1)
+        entry = {"url": url, "ID": id_val, "sha256": digest, "encoding": encoding, "fetched_at": int(time.time())}
+        self._manifest.write(json.dumps(entry) + "\n")
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        return gzip.decompress(self._object_path(digest).read_bytes())
+
+    def entries(self) -> Iterator[Dict]:
+        path = self.root / MANIFEST_NAME
+        if not path.exists():
+            return
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try: yield json.loads(line)
+                    except json.JSONDecodeError: pass   # dernière ligne tronquée
+
+    def latest(self) -> Dict[str, Dict]:
+        """Dernière capture par URL."""
+        out: Dict[str, Dict] = {}
+        for e in self.entries():
+            out[e["url"]] = e
+        return out
+
+    def close(self) -> None:
+        if self._manifest is not None:
+            self._manifest.close()
+            self._manifest = None
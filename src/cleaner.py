@@ -1,15 +1,34 @@
 # src/cleaner.py
 #from __future__ import annotations
 
+import argparse
+import hashlib
 import json
+import os
 import re
 import csv
+import shutil
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from aggregates import GROUP_KEYS, METRICS, merge, read_aggregates, summarize, write_aggregates
+import dedup
+import geocode
+import history
+from dataset import PARTITION_COL, DatasetWriter, read_dataset, upsert_dataset, write_dataset
+from schema import DESCRIPTION_COL, FLOAT_COLS, INT_COLS, STR_COLS, compact_schema, describe_gain
+from store import ItemStore
 
 
 def read_json_records(path: Path) -> List[Dict]:
+    # Store segmenté (dossier de segments JSON Lines) : dernière version de chaque annonce
+    if path.is_dir():
+        return list(ItemStore(path).iter_latest())
+
     text = path.read_text(encoding="utf-8").strip()
     try:
         data = json.loads(text)
@@ -33,20 +52,79 @@ def read_json_records(path: Path) -> List[Dict]:
         return records
 
 
-def coerce_types(df: pd.DataFrame) -> pd.DataFrame:
-    float_cols = ["price_eur", "surface_m2"]
-    int_cols = ["rooms", "floor", "year_built"]
-    str_cols = ["url", "title", "address", "postal_code", "description", "dpe_letter", "ges_letter","property_type"]
+def _iter_json_array(f, block: int = 1 << 20) -> Iterator[Dict]:
+    """Objets d'un tableau JSON lus au fil de l'eau (un bloc + un objet en mémoire)."""
+    dec = json.JSONDecoder()
+    buf, pos = f.read(block), 0
+    pos = buf.index("[") + 1
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            if pos == len(buf):
+                raise json.JSONDecodeError("fin de bloc", buf, pos)
+            obj, pos = dec.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            more = f.read(block)
+            if not more:
+                if buf[pos:].strip():
+                    raise ValueError("Tableau JSON tronqué.")
+                return
+            buf, pos = buf[pos:] + more, 0
+            continue
+        if isinstance(obj, dict):
+            yield obj
+
+
+def iter_json_records(path: Path) -> Iterator[Dict]:
+    """Comme read_json_records, mais en flux : store segmenté (dernière version de
+    chaque annonce), NDJSON ligne à ligne, ou tableau JSON décodé objet par objet."""
+    if path.is_dir():
+        yield from ItemStore(path).iter_latest()
+        return
+    with path.open("r", encoding="utf-8") as f:
+        head = f.read(64).lstrip()
+        f.seek(0)
+        if head.startswith("["):
+            yield from _iter_json_array(f)
+            return
+        for i, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+                if not isinstance(obj, dict):
+                    raise ValueError
+            except Exception as exc:
+                raise ValueError(f"Ligne {i}: impossible de parser en JSON.") from exc
+            yield obj
+
+
+def iter_record_chunks(path: Path, chunk_rows: int) -> Iterator[List[Dict]]:
+    chunk: List[Dict] = []
+    for rec in iter_json_records(path):
+        chunk.append(rec)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 
-    for col in float_cols:
+def coerce_types(df: pd.DataFrame) -> pd.DataFrame:
+    # Listes partagées avec la relecture du CSV (schema.CSV_DTYPES)
+    for col in FLOAT_COLS:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
 
-    for col in int_cols:
+    for col in INT_COLS:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
 
-    for col in str_cols:
+    for col in STR_COLS:
         if col in df.columns:
             df[col] = df[col].astype("string")
 
@@ -68,81 +146,457 @@ def add_price_per_m2(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# ----------------- Valeurs aberrantes -----------------
+OUTLIER_MODE    = "flag"                           # "flag" (colonnes outlier, outlier_reason), "drop" ou "off"
+OUTLIER_SEGMENT = ["postal_code", "property_type"]  # statistiques robustes par segment
+OUTLIER_BOUNDS  = {                                # bornes absolues (prix factices, erreurs de parsing)
+    "price_eur":    (10_000, 50_000_000),
+    "surface_m2":   (8, 5_000),
+    "price_per_m2": (500, 100_000),
+}
+OUTLIER_METRICS = ["price_per_m2", "price_eur"]     # règles robustes, sur le log de la valeur
+OUTLIER_MAD_Z   = 3.5       # |0.6745·(x − médiane) / MAD| au-delà → aberrant (None : règle désactivée)
+OUTLIER_IQR_K   = 3.0       # hors [Q1 − k·IQR, Q3 + k·IQR] → aberrant (None : règle désactivée)
+OUTLIER_MIN_N   = 20        # segment plus petit : bornes absolues seulement
+
+
+def _group_quantiles(codes: np.ndarray, values: np.ndarray, n_groups: int,
+                     qs: List[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantiles (interpolation linéaire) de `values` par groupe, NaN exclus, et
+    effectifs : un seul tri (groupe, valeur), aucune boucle sur les groupes."""
+    ok = ~np.isnan(values)
+    v, c = values[ok], codes[ok]
+    order = np.argsort(v)                              # tri par valeur, puis tri stable par groupe
+    order = order[np.argsort(c[order], kind="stable")]
+    v = v[order]
+    counts = np.bincount(c, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    out = np.full((n_groups, len(qs)), np.nan)
+    has = counts > 0
+    for j, q in enumerate(qs):
+        pos = starts[has] + q * (counts[has] - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, starts[has] + counts[has] - 1)
+        out[has, j] = v[lo] + (v[hi] - v[lo]) * (pos - lo)
+    return out, counts
+
+
+def _log(df: pd.DataFrame, col: str) -> np.ndarray:
+    x = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(x > 0, np.log(x), np.nan)
+
+
+def flag_outliers(df: pd.DataFrame, reference: Optional[pd.DataFrame] = None) -> pd.Series:
+    """Motif(s) d'exclusion de chaque ligne (NA si rien d'anormal) : bornes absolues,
+    puis médiane/MAD et Q1/Q3 du segment, calculés sur `reference` (défaut : `df`)."""
+    ref = df if reference is None else reference
+    reason = np.full(len(df), "", dtype=object)    # masques creux : seules les lignes touchées sont concaténées
+
+    def hit(mask: np.ndarray, tag: str) -> None:
+        reason[mask] += "," + tag
+
+    def out_of_bounds(frame: pd.DataFrame) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        res = {}
+        for col, (lo, hi) in OUTLIER_BOUNDS.items():
+            if col in frame.columns:
+                x = pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+                res[col] = (x < lo, x > hi)
+        return res
+
+    in_bounds = np.ones(len(df), dtype=bool)       # les règles robustes ne portent que sur ces lignes
+    for col, (low, high) in out_of_bounds(df).items():
+        hit(low, f"{col}<min")
+        hit(high, f"{col}>max")
+        in_bounds &= ~(low | high)
+
+    seg = [c for c in OUTLIER_SEGMENT if c in df.columns and c in ref.columns]
+    metrics = [m for m in OUTLIER_METRICS if m in df.columns and m in ref.columns]
+    if seg and metrics and len(ref):
+        # Codes de segment communs à la référence et aux lignes testées
+        keys = pd.concat([ref[seg].astype("string"), df[seg].astype("string")], ignore_index=True)
+        codes = keys.groupby(seg, dropna=False, sort=False).ngroup().to_numpy()
+        n_groups = int(codes.max()) + 1
+        c_ref, c_df = codes[:len(ref)], codes[len(ref):]
+        ref_bad = np.zeros(len(ref), dtype=bool)       # la référence sans les valeurs hors bornes
+        for low, high in out_of_bounds(ref).values():
+            ref_bad |= low | high
+        for m in metrics:
+            x_ref = np.where(ref_bad, np.nan, _log(ref, m))
+            qv, n = _group_quantiles(c_ref, x_ref, n_groups, [0.25, 0.5, 0.75])
+            q1, med, q3 = qv.T
+            mad = _group_quantiles(c_ref, np.abs(x_ref - med[c_ref]), n_groups, [0.5])[0][:, 0]
+            x = _log(df, m)
+            enough = in_bounds & (n[c_df] >= OUTLIER_MIN_N)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if OUTLIER_MAD_Z is not None:
+                    z = 0.6745 * (x - med[c_df]) / mad[c_df]
+                    hit(enough & (mad[c_df] > 0) & (np.abs(z) > OUTLIER_MAD_Z), f"{m}:mad")
+                if OUTLIER_IQR_K is not None:
+                    iqr = (q3 - q1)[c_df]
+                    hit(enough & ((x < q1[c_df] - OUTLIER_IQR_K * iqr) | (x > q3[c_df] + OUTLIER_IQR_K * iqr)),
+                        f"{m}:iqr")
+    # En une fois : une affectation par masque échoue quand une seule ligne est marquée
+    return pd.Series([r[1:] if r else None for r in reason], index=df.index, dtype="string")
+
+
+def apply_outliers(df: pd.DataFrame, mode: str = OUTLIER_MODE,
+                   reference: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    if mode == "off" or df.empty:
+        return df
+    reason = flag_outliers(df, reference)
+    if mode == "drop":
+        return df[reason.isna()].reset_index(drop=True)
+    df["outlier"] = reason.notna().astype("boolean")
+    df["outlier_reason"] = reason
+    return df
+
+
+# Espaces au sens de str.isspace / `\s` de re (RE2, utilisé par Arrow, n'a qu'un \s ASCII)
+_WS_CHARS = ("\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004"
+             "\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000")
+
+def _ws_class(chars: str) -> str:
+    return "[" + "".join(f"\\x{{{ord(c):x}}}" for c in chars) + "]"
+
+
+# Seules les suites de 2+ espaces et les espaces autres que " " sont réécrites
+_WS_TO_FIX = f"{_ws_class(_WS_CHARS)}{{2,}}|{_ws_class(_WS_CHARS.replace(' ', ''))}"
+
+
+def _clean_column(col: pd.Series, sep: str) -> pd.Series:
+    """Même résultat que l'ancien `map` cellule par cellule (compression des espaces,
+    strip, séparateur → ","), en trois noyaux Arrow sur toute la colonne."""
+    if not col.notna().any():
+        return col
+    if not isinstance(col.dtype, pd.StringDtype):
+        col = col.where(col.isna(), col.astype(str))        # valeurs non texte : str(x)
+    arr = pa.array(col, type=pa.large_string(), from_pandas=True)
+    arr = pc.replace_substring_regex(arr, pattern=_WS_TO_FIX, replacement=" ")
+    arr = pc.utf8_trim(arr, characters=" ")
+    arr = pc.replace_substring(arr, pattern=sep, replacement=",")
+    return pd.Series(arr.to_pandas(), index=col.index, name=col.name)
+
+
 def sanitize_strings(df: pd.DataFrame, sep: str = ";") -> pd.DataFrame:
     """
     Supprime retours ligne/tabulations, compresse les espaces et remplace le séparateur
     éventuel dans les colonnes texte pour garantir 1 ligne physique par annonce.
     """
     text_cols = df.select_dtypes(include=["string", "object"]).columns
-
-    def clean(x):
-        if pd.isna(x):
-            return x
-        s = str(x)
-        # Enlever \r, \n, \t et compresser espaces
-        s = s.replace("\r\n", " ").replace("\n", " ").replace("\r", " ").replace("\t", " ")
-        s = re.sub(r"\s+", " ", s).strip()
-        # Éviter que le séparateur apparaisse dans le texte
-        if sep in s:
-            s = s.replace(sep, ",")
-        return s
-
     for c in text_cols:
-        df[c] = df[c].map(clean)
+        df[c] = _clean_column(df[c], sep)
     return df
 
 
-def main() -> None:
-    root = Path(__file__).resolve().parents[1]   # dossier racine du projet
-    data_dir = root / "data"
-    json_in = data_dir / "raw_data.json"
-    csv_out = data_dir / "cleaned_data.csv"
-
-    if not json_in.exists():
-        raise SystemExit(f"Fichier introuvable : {json_in}")
+ORDERED_COLS = [
+    "url","ID", "title", "postal_code", "address",
+    "rooms", "floor", "surface_m2",
+    "price_eur", "price_per_m2",
+    "dpe_letter", "ges_letter", "year_built","property_type",
+    "lat", "lon",
+    "outlier", "outlier_reason",
+    "description"
+]
+_DERIVED_COLS = {"price_per_m2", "lat", "lon", "outlier", "outlier_reason"}
 
-    records = read_json_records(json_in)
-    if not records:
-        raise SystemExit("Aucune annonce trouvée dans le JSON.")
 
+def clean_records(records: List[Dict], full_schema: bool = False, outliers: str = OUTLIER_MODE,
+                  reference: Optional[pd.DataFrame] = None,
+                  geocoder: Optional[geocode.Geocoder] = None) -> pd.DataFrame:
+    """`reference` : annonces servant aux statistiques des valeurs aberrantes (défaut : le lot).
+    `geocoder` : colonnes lat / lon (gazetteer, cache, puis géocodeur distant)."""
     df = pd.DataFrame(records)
+    if full_schema:
+        # Toutes les colonnes, même absentes du lot : schéma identique d'un lot à l'autre
+        for c in ORDERED_COLS:
+            if c not in df.columns and c not in _DERIVED_COLS:
+                df[c] = None
     df = coerce_types(df)
     df = add_price_per_m2(df)
+    df = apply_outliers(df, outliers, reference)
+    if geocoder is not None:
+        df = geocoder.annotate(df)
 
     # Colonnes ordonnées (1 info par colonne)
-    ordered_cols = [
-        "url","ID", "title", "postal_code", "address",
-        "rooms", "floor", "surface_m2",
-        "price_eur", "price_per_m2",
-        "dpe_letter", "ges_letter", "year_built","property_type",
-        "description"
-    ]
-    existing = [c for c in ordered_cols if c in df.columns]
+    existing = [c for c in ORDERED_COLS if c in df.columns]
     df = df[existing]
 
     # Nettoyage des colonnes texte
-    df = sanitize_strings(df, sep=";")
+    return sanitize_strings(df, sep=";")
 
-    # Stat globale (optionnel)
-    avg_ppm2 = df["price_per_m2"].mean(skipna=True)
-    avg_msg = "indisponible"
-    if pd.notna(avg_ppm2):
-        avg_msg = f"{avg_ppm2:,.2f} €/m²".replace(",", " ").replace(".", ",")
 
-    # Écriture CSV compatible Excel FR : séparateur ; et BOM UTF-8
+def write_csv(df: pd.DataFrame, csv_out: Path, append: bool = False) -> None:
+    # Écriture CSV compatible Excel FR : séparateur ; et BOM UTF-8 (en tête de fichier seulement)
     df.to_csv(
         csv_out,
         sep=";",
         index=False,
-        encoding="utf-8-sig",
+        mode="a" if append else "w",
+        header=not append,
+        encoding="utf-8" if append else "utf-8-sig",
         quoting=csv.QUOTE_MINIMAL,
         lineterminator="\n",
     )
 
+
+# ----------------- Mode incrémental -----------------
+STATE_NAME = "cleaner_state.json"   # watermark du store + empreinte par annonce
+
+
+def record_key(rec: Dict) -> str:
+    return str(rec.get("ID") if rec.get("ID") is not None else rec.get("url"))
+
+
+def record_hash(rec: Dict) -> str:
+    blob = json.dumps(rec, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def load_state(path: Path, *outputs: Path) -> Dict:
+    """État du dernier passage ; repart de zéro si une sortie a disparu."""
+    if path.exists() and all(o.exists() for o in outputs):
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            pass
+    return {"generation": 0, "offsets": {}, "hashes": {}}
+
+
+def read_delta(json_in: Path, state: Dict) -> List[Dict]:
+    """Enregistrements ajoutés depuis le watermark. Après une compaction du store
+    (génération différente) ou avec l'ancien format JSON, tout est relu : les
+    empreintes écartent ensuite ce qui n'a pas changé."""
+    if not json_in.is_dir():
+        return read_json_records(json_in)
+    store = ItemStore(json_in)
+    if state.get("generation") != store.generation():
+        state["generation"], state["offsets"] = store.generation(), {}
+    return list(store.iter_records_from(state["offsets"]))
+
+
+def upsert_csv(delta: pd.DataFrame, csv_out: Path, updated: set) -> None:
+    """Ajoute `delta` à la sortie existante, en remplaçant les lignes des IDs de `updated`.
+    Sans mise à jour ni nouvelle colonne, simple ajout en fin de fichier."""
+    with csv_out.open("r", encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f, delimiter=";"), [])
+    if not updated and set(delta.columns) <= set(header):
+        write_csv(delta.reindex(columns=header), csv_out, append=True)
+        return
+    old = pd.read_csv(csv_out, sep=";", dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    old = old[~old["ID"].isin(updated)] if "ID" in old.columns else old
+    cols = [c for c in ORDERED_COLS if c in header or c in delta.columns]
+    cols += [c for c in header if c not in cols]
+    write_csv(pd.concat([old, delta], ignore_index=True).reindex(columns=cols), csv_out)
+
+
+def write_near_duplicates(parquet_out: Path, dup_out: Path) -> None:
+    """Recalcule les clusters de quasi-doublons sur tout le dataset (un nouvel
+    ID peut rejoindre un cluster existant et en changer l'annonce canonique)."""
+    if not parquet_out.exists():
+        return
+    clusters, extra = dedup.write_duplicates(
+        dedup.near_duplicates(read_dataset(parquet_out, columns=dedup.COLUMNS)), dup_out)
+    print(f"✔ Quasi-doublons : {clusters} clusters, {extra} annonces non canoniques ({dup_out})")
+
+
+def record_history(json_in: Path, parquet_out: Path, history_out: Path) -> None:
+    """Charge dans l'historique SQLite les annonces listées par le spider depuis le
+    dernier instantané (relevés `seen/` du store), une date de relevé par instantané."""
+    if not parquet_out.exists() or not json_in.is_dir():
+        return
+    store = ItemStore(json_in)
+    if not store.seen_days():
+        print("ℹ Historique : aucun relevé de recherche dans le store, instantané non chargé")
+        return
+    df = read_dataset(parquet_out, columns=history.COLUMNS)
+    for day, res in history.load_seen(df, store, path=history_out).items():
+        print(f"✔ Historique {day} : {res['total']} annonces vues, {res['new']} nouvelles, "
+              f"{res['changed']} prix/surfaces modifiés ({history_out})")
+
+
+def clean_incremental(json_in: Path, csv_out: Path, state_path: Path,
+                      parquet_out: Optional[Path] = None, agg_out: Optional[Path] = None,
+                      dup_out: Optional[Path] = None, outliers: str = OUTLIER_MODE,
+                      geocoder: Optional[geocode.Geocoder] = None) -> None:
+    """`agg_out` suppose `parquet_out` : les anciennes versions des annonces modifiées
+    y sont relues pour être retranchées des agrégats."""
+    outputs = [csv_out] + [o for o in (parquet_out, agg_out) if o]
+    state = load_state(state_path, *outputs)
+    hashes: Dict[str, str] = state["hashes"]
+    fresh = not hashes                         # premier passage : la sortie est réécrite
+
+    # Dernière version de chaque annonce du delta, seulement si nouvelle ou modifiée
+    changed: Dict[str, Dict] = {}
+    added, updated = set(), set()
+    for rec in read_delta(json_in, state):
+        key, h = record_key(rec), record_hash(rec)
+        if hashes.get(key) == h:
+            continue
+        if key in hashes and key not in added:
+            updated.add(key)
+        else:
+            added.add(key)
+        changed.pop(key, None)
+        changed[key] = rec
+        hashes[key] = h
+
+    if changed:
+        # Statistiques des valeurs aberrantes sur tout le dataset à jour, pas sur le seul delta
+        delta = clean_records(list(changed.values()), outliers="off", geocoder=geocoder)
+        reference = delta
+        if not fresh and parquet_out and parquet_out.exists() and outliers != "off":
+            old = read_dataset(parquet_out, columns=["ID"] + OUTLIER_SEGMENT + list(OUTLIER_BOUNDS))
+            reference = pd.concat([old[~old["ID"].astype(str).isin(changed)], delta], ignore_index=True)
+        delta = apply_outliers(delta, outliers, reference)
+        if fresh:
+            write_csv(delta, csv_out)
+        else:
+            upsert_csv(delta, csv_out, updated)
+        if agg_out and parquet_out:
+            agg = summarize(delta) if fresh else merge(read_aggregates(agg_out), summarize(delta))
+            if updated:
+                old = read_dataset(parquet_out, columns=["ID"] + GROUP_KEYS + METRICS + ["outlier"])
+                agg = merge(agg, summarize(old[old["ID"].astype(str).isin(updated)]), sign=-1)
+            write_aggregates(agg, agg_out)
+        if parquet_out and PARTITION_COL in delta.columns:
+            if fresh:
+                write_dataset(compact_schema(delta, categories=False), parquet_out)
+            else:
+                upsert_dataset(compact_schema(delta, categories=False), parquet_out, replaced=updated)
+        if dup_out and parquet_out:
+            write_near_duplicates(parquet_out, dup_out)
+        print(f"✔ CSV mis à jour : {csv_out}")
+        print(f"✔ Annonces nouvelles : {len(added)}  •  modifiées : {len(updated)}  •  total : {len(hashes)}")
+    else:
+        print(f"ℹ Aucune annonce nouvelle ou modifiée depuis le dernier passage ({csv_out})")
+
+    tmp = state_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, state_path)
+
+
+# ----------------- Mode flux -----------------
+CHUNK_ROWS = 50_000   # annonces par lot en mode --stream (borne la mémoire)
+
+
+def clean_streaming(json_in: Path, csv_out: Path, parquet_out: Path,
+                    chunk_rows: int = CHUNK_ROWS, agg_out: Optional[Path] = None,
+                    outliers: str = OUTLIER_MODE, geocoder: Optional[geocode.Geocoder] = None) -> Dict:
+    """Nettoie par lots de `chunk_rows` annonces et ajoute chaque lot aux sorties :
+    la mémoire ne dépend que de la taille d'un lot, pas de l'historique (les
+    statistiques des valeurs aberrantes sont donc celles du lot)."""
+    tmp_csv = csv_out.with_suffix(".csv.tmp")
+    writer = DatasetWriter(parquet_out)
+    rows, ppm2_sum, ppm2_n, agg = 0, 0.0, 0, None
+    for chunk in iter_record_chunks(json_in, chunk_rows):
+        df = clean_records(chunk, full_schema=True, outliers=outliers, geocoder=geocoder)
+        write_csv(df, tmp_csv, append=rows > 0)
+        writer.write(compact_schema(df, categories=False))
+        agg = summarize(df) if agg is None else merge(agg, summarize(df))
+        rows += len(df)
+        ppm2 = (df[~df["outlier"]] if "outlier" in df.columns else df)["price_per_m2"].dropna()
+        ppm2_sum += float(ppm2.sum())
+        ppm2_n += len(ppm2)
+    if not rows:
+        shutil.rmtree(writer.tmp, ignore_errors=True)
+        raise SystemExit("Aucune annonce trouvée dans le JSON.")
+    os.replace(tmp_csv, csv_out)
+    n_parts = writer.close()
+    if agg_out:
+        write_aggregates(agg, agg_out)
+    return {"rows": rows, "partitions": n_parts, "avg_ppm2": ppm2_sum / ppm2_n if ppm2_n else None}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Nettoyage des annonces brutes → CSV")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true",
+                      help="ne nettoyer que les annonces nouvelles ou modifiées depuis le dernier passage")
+    mode.add_argument("--stream", action="store_true",
+                      help="nettoyer par lots à mémoire bornée (historique volumineux)")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="annonces par lot en mode --stream")
+    ap.add_argument("--outliers", choices=["flag", "drop", "off"], default=OUTLIER_MODE,
+                    help="valeurs aberrantes : marquer (colonnes outlier, outlier_reason), supprimer ou ignorer")
+    ap.add_argument("--geocode", choices=["local", *geocode.REMOTES, "off"], default="local",
+                    help="colonnes lat/lon : gazetteer et cache seulement (local), puis géocodeur distant "
+                         "pour les adresses restantes (ban, nominatim), ou aucune")
+    ap.add_argument("--geocode-budget", type=int, default=geocode.REMOTE_BUDGET,
+                    help="requêtes distantes au plus par passage")
+    args = ap.parse_args()
+
+    root = Path(__file__).resolve().parents[1]   # dossier racine du projet
+    data_dir = root / "data"
+    json_in = data_dir / "raw"                   # store segmenté écrit par le spider
+    if not json_in.exists():
+        json_in = data_dir / "raw_data.json"      # ancien format
+    csv_out = data_dir / "cleaned_data.csv"
+    parquet_out = data_dir / "cleaned_parquet"   # même contenu, typé, partitionné par code postal
+    agg_out = data_dir / "aggregates"            # agrégats de marché fusionnables
+    dup_out = data_dir / "duplicates.parquet"    # clusters de quasi-doublons
+    history_out = data_dir / "history.sqlite"    # first_seen / last_seen, historique des prix
+
+    if not json_in.exists():
+        raise SystemExit(f"Fichier introuvable : {json_in}")
+
+    geocoder = None
+    if args.geocode != "off":
+        geocoder = geocode.Geocoder(data_dir / "gazetteer.csv", data_dir / "geocode.sqlite",
+                                    remote=None if args.geocode == "local" else args.geocode,
+                                    budget=args.geocode_budget)
+
+    if args.incremental:
+        clean_incremental(json_in, csv_out, data_dir / STATE_NAME, parquet_out, agg_out, dup_out, args.outliers,
+                          geocoder)
+        if geocoder is not None:
+            print(f"✔ Géocodage : {geocoder.summary()}")
+        if geocoder is not None and geocoder.remote is not None:
+            # Annonces déjà écrites restées sans coordonnées (budget épuisé au passage précédent)
+            filled = geocode.backfill(geocoder, parquet_out, csv_out)
+            if filled:
+                print(f"✔ Géocodage : {filled} annonces déjà écrites complétées")
+        record_history(json_in, parquet_out, history_out)
+        return
+
+    if args.stream:
+        res = clean_streaming(json_in, csv_out, parquet_out, args.chunk_rows, agg_out, args.outliers, geocoder)
+        rows, avg_ppm2 = res["rows"], res["avg_ppm2"]
+        print(f"✔ Parquet écrit : {parquet_out} ({res['partitions']} partitions)")
+    else:
+        records = read_json_records(json_in)
+        if not records:
+            raise SystemExit("Aucune annonce trouvée dans le JSON.")
+
+        df = clean_records(records, outliers=args.outliers, geocoder=geocoder)
+        kept = df[~df["outlier"]] if "outlier" in df.columns else df
+        rows, avg_ppm2 = len(df), kept["price_per_m2"].mean(skipna=True)
+        if "outlier" in df.columns:
+            print(f"ℹ Valeurs aberrantes marquées : {int(df['outlier'].sum())}")
+
+        write_csv(df, csv_out)
+        write_aggregates(summarize(df), agg_out)
+        if PARTITION_COL in df.columns:
+            n_parts = write_dataset(compact_schema(df, categories=False), parquet_out)
+            print(f"✔ Parquet écrit : {parquet_out} ({n_parts} partitions)")
+        compact = compact_schema(df)
+        print(f"ℹ Mémoire (schéma compact) : {describe_gain(df, compact)}")
+        print(f"ℹ Mémoire (compact, sans description) : "
+              f"{describe_gain(df, compact.drop(columns=DESCRIPTION_COL, errors='ignore'))}")
+    if geocoder is not None:
+        print(f"✔ Géocodage : {geocoder.summary()}")
+    write_near_duplicates(parquet_out, dup_out)
+    record_history(json_in, parquet_out, history_out)
+    # Un passage complet invalide l'état incrémental
+    (data_dir / STATE_NAME).unlink(missing_ok=True)
+
+    # Stat globale (optionnel)
+    avg_msg = "indisponible"
+    if avg_ppm2 is not None and pd.notna(avg_ppm2):
+        avg_msg = f"{avg_ppm2:,.2f} €/m²".replace(",", " ").replace(".", ",")
+
     print(f"✔ CSV écrit : {csv_out}")
-    print(f"✔ Lignes (annonces) : {len(df)}")
+    print(f"✔ Lignes (annonces) : {rows}")
     print(f"ℹ Prix moyen au m² : {avg_msg}")
 
-
 if __name__ == "__main__":
     main()
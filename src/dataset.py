@@ -0,0 +1,148 @@
+# src/dataset.py
+"""
+Sortie colonnaire typée du cleaner : Parquet partitionné par code postal.
+
+    data/cleaned_parquet/postal_code=75014/part-00000.parquet
+    data/cleaned_parquet/postal_code=__HIVE_DEFAULT_PARTITION__/part-00000.parquet   # sans code postal
+
+Les types nullables de `coerce_types` (Int64 / Float64 / string) sont conservés.
+La lecture ne charge que les colonnes et les arrondissements demandés :
+
+    read_dataset(PARQUET_DIR, columns=["price_eur", "surface_m2"], postal_codes=["75011", "75020"])
+"""
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+PARQUET_DIR   = Path("data/cleaned_parquet")
+PARTITION_COL = "postal_code"
+NULL_PART     = "__HIVE_DEFAULT_PARTITION__"   # valeur nulle (convention Hive, relue comme NA)
+PART_FILE     = "part-00000.parquet"
+PART_GLOB     = "part-*.parquet"   # une partition peut compter un fichier par lot (écriture en flux)
+
+
+def _part_dir(root: Path, value) -> Path:
+    return root / f"{PARTITION_COL}={value if isinstance(value, str) and value else NULL_PART}"
+
+
+def _write_part(df: pd.DataFrame, path: Path, name: str = PART_FILE) -> None:
+    path.mkdir(parents=True, exist_ok=True)
+    tmp = path / f"_{name}.tmp"        # préfixe "_" : ignoré par les lecteurs de dataset
+    # La colonne de partition reste aussi dans le fichier : ordre et type des colonnes préservés
+    df.to_parquet(tmp, index=False, engine="pyarrow")
+    os.replace(tmp, path / name)
+
+
+def _read_partition(path: Path) -> Optional[pd.DataFrame]:
+    parts = [pd.read_parquet(f) for f in sorted(path.glob(PART_GLOB))]
+    return pd.concat(parts, ignore_index=True) if parts else None
+
+
+class DatasetWriter:
+    """Écriture par lots (un fichier par lot et par partition) dans un dossier
+    temporaire, publié d'un bloc à la fermeture."""
+
+    def __init__(self, root: Path = PARQUET_DIR):
+        self.root = Path(root)
+        self.tmp = self.root.with_name(self.root.name + ".tmp")
+        if self.tmp.exists():
+            shutil.rmtree(self.tmp)
+        self.tmp.mkdir(parents=True)
+        self.batches = 0
+        self.partitions = set()
+
+    def write(self, df: pd.DataFrame) -> None:
+        name = f"part-{self.batches:05d}.parquet"
+        for value, part in df.groupby(PARTITION_COL, dropna=False, sort=True):
+            path = _part_dir(self.tmp, value)
+            _write_part(part, path, name)
+            self.partitions.add(path.name)
+        self.batches += 1
+
+    def close(self) -> int:
+        """Publie le dataset ; renvoie le nombre de partitions."""
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        os.replace(self.tmp, self.root)
+        return len(self.partitions)
+
+
+def write_dataset(df: pd.DataFrame, root: Path = PARQUET_DIR) -> int:
+    """(Ré)écrit tout le dataset ; renvoie le nombre de partitions."""
+    writer = DatasetWriter(root)
+    writer.write(df)
+    return writer.close()
+
+
+def upsert_dataset(delta: pd.DataFrame, root: Path = PARQUET_DIR, replaced: Iterable = ()) -> int:
+    """Ne réécrit que les partitions touchées : celles du delta et celles qui
+    contenaient une ancienne version d'un ID de `replaced`. Renvoie leur nombre."""
+    root = Path(root)
+    replaced = set(replaced)
+    touched = {_part_dir(root, v) for v in delta[PARTITION_COL].unique()}
+    if replaced and root.exists():
+        ids = read_dataset(root, columns=["ID", PARTITION_COL])
+        old = ids[ids["ID"].astype(str).isin(replaced)]
+        touched |= {_part_dir(root, v) for v in old[PARTITION_COL].unique()}
+    delta_ids = set(delta["ID"].astype(str))
+    for path in touched:
+        frames = []
+        cur = _read_partition(path)
+        if cur is not None:
+            frames.append(cur[~cur["ID"].astype(str).isin(delta_ids)])
+        value = path.name.split("=", 1)[1]
+        frames.append(delta[delta[PARTITION_COL].fillna(NULL_PART) == value])
+        frames = [f for f in frames if len(f)]
+        if frames:
+            _write_part(pd.concat(frames, ignore_index=True).reindex(columns=delta.columns), path)
+            for f in path.glob(PART_GLOB):
+                if f.name != PART_FILE:
+                    f.unlink()
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+    return len(touched)
+
+
+def list_partitions(root: Path = PARQUET_DIR) -> List[str]:
+    """Codes postaux présents (sans lire aucun fichier)."""
+    root = Path(root)
+    if not root.exists():
+        return []
+    return sorted(p.name.split("=", 1)[1] for p in root.glob(f"{PARTITION_COL}=*")
+                  if p.name.split("=", 1)[1] != NULL_PART)
+
+
+def _open(root: Path) -> ds.Dataset:
+    return ds.dataset(
+        Path(root), format="parquet",
+        partitioning=ds.partitioning(pa.schema([(PARTITION_COL, pa.large_string())]), flavor="hive"),
+    )
+
+
+def dataset_columns(root: Path = PARQUET_DIR) -> List[str]:
+    return _open(root).schema.names
+
+
+def last_modified(root: Path = PARQUET_DIR) -> Optional[float]:
+    """Date (timestamp) de la dernière partition écrite."""
+    mtimes = [p.stat().st_mtime for p in Path(root).glob(f"*/{PART_GLOB}")]
+    return max(mtimes) if mtimes else None
+
+
+def read_dataset(root: Path = PARQUET_DIR, columns: Optional[List[str]] = None,
+                 postal_codes: Optional[Iterable[str]] = None,
+                 categories: Optional[List[str]] = None) -> pd.DataFrame:
+    """Lecture avec élagage de colonnes (`columns`) et de partitions (`postal_codes`) ;
+    les colonnes de `categories` sont relues directement en `category`."""
+    dataset = _open(root)
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    flt = ds.field(PARTITION_COL).isin(list(postal_codes)) if postal_codes else None
+    table = dataset.to_table(columns=columns, filter=flt)
+    # Les métadonnées pandas des fichiers restaurent les dtypes nullables
+    return table.to_pandas(categories=[c for c in categories or [] if c in table.column_names])
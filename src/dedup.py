@@ -0,0 +1,190 @@
+# src/dedup.py
+"""
+Détection des quasi-doublons (même bien republié par une autre agence, ou sous un nouvel ID).
+
+MinHash sur les 3-grammes de mots du titre + description, LSH par bandes dans
+chaque code postal (seules les annonces d'un même seau sont comparées : coût
+linéaire), puis vérification des candidats (similarité estimée, surface, pièces,
+prix dans les tolérances) et regroupement en clusters. L'annonce canonique d'un
+cluster est la plus complète (puis le plus petit ID).
+
+    python src/dedup.py          # data/cleaned_parquet → data/duplicates.parquet
+
+Sortie : ID, dup_cluster (ID de l'annonce canonique), is_canonical.
+"""
+import re
+import zlib
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+DUP_PATH      = Path("data/duplicates.parquet")
+NUM_PERM      = 64          # taille de la signature MinHash
+BANDS         = 16          # LSH : 16 bandes de 4 lignes → seuil ≈ (1/16)^(1/4) ≈ 0.5
+SHINGLE_WORDS = 3
+MIN_JACCARD   = 0.6         # similarité estimée minimale des textes
+SURFACE_TOL   = 0.05        # écart relatif de surface toléré
+PRICE_TOL     = 0.15        # écart relatif de prix toléré (baisse de prix à la republication)
+MAX_BUCKET    = 20          # au-delà, un seau n'est relié qu'en chaîne (textes génériques)
+BATCH         = 2000        # annonces par lot de calcul des signatures
+COLUMNS       = ["ID", "postal_code", "title", "description", "surface_m2", "rooms", "price_eur"]
+
+_rng = np.random.default_rng(20240601)              # graine fixe : signatures reproductibles
+_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+# ----------------- Signatures -----------------
+def _normalize(texts: pd.Series) -> pd.Series:
+    """Minuscules sans accents (décomposition NFKD, marques diacritiques retirées)."""
+    return (texts.str.lower().str.normalize("NFKD")
+            .str.encode("ascii", errors="ignore").str.decode("ascii"))
+
+
+def shingles(text: str) -> List[int]:
+    """Empreintes crc32 des 3-grammes de mots d'un texte normalisé (voir _normalize)."""
+    words = _WORD_RE.findall(text)
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return [zlib.crc32(g.encode()) for g in set(grams)]
+
+
+def minhash(texts: List[str]) -> np.ndarray:
+    """Signatures (n × NUM_PERM, uint32). Hachage multiplicatif (a·x + b) >> 32 en
+    uint64, min par annonce via reduceat. Texte vide → signature nulle (jamais candidate)."""
+    sig = np.zeros((len(texts), NUM_PERM), dtype=np.uint32)
+    for lo in range(0, len(texts), BATCH):
+        sh = [shingles(t) for t in texts[lo:lo + BATCH]]
+        sizes = np.array([len(s) for s in sh])
+        if not sizes.any():
+            continue
+        x = np.fromiter((h for s in sh for h in s), dtype=np.uint64, count=int(sizes.sum()))
+        h = ((x[:, None] * _A + _B) >> np.uint64(32)).astype(np.uint32)
+        nonempty = np.flatnonzero(sizes)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))[nonempty]
+        sig[lo + nonempty] = np.minimum.reduceat(h, starts, axis=0)
+    return sig
+
+
+# ----------------- Candidats & vérification -----------------
+def _candidate_pairs(sig: np.ndarray, block: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Paires (i, j) partageant au moins une bande LSH dans le même bloc (code postal)."""
+    rows = NUM_PERM // BANDS
+    idx = np.flatnonzero(valid)
+    mult = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5],
+                    dtype=np.uint64)[:rows]
+    pairs = []
+    for b in range(BANDS):
+        band = sig[idx, b * rows:(b + 1) * rows].astype(np.uint64)
+        key = (band * mult).sum(axis=1) ^ np.uint64(b)
+        order = np.lexsort((key, block[idx]))
+        k, g, members = key[order], block[idx][order], idx[order]
+        same = np.r_[False, (k[1:] == k[:-1]) & (g[1:] == g[:-1])]
+        # Toutes les paires d'un seau jusqu'à MAX_BUCKET membres, en chaîne au-delà
+        run_start = np.maximum.accumulate(np.where(~same, np.arange(len(same)), 0))
+        small = np.bincount(run_start, minlength=len(same))[run_start] <= MAX_BUCKET
+        for d in range(1, MAX_BUCKET):
+            ok = np.zeros(len(same), dtype=bool)
+            ok[d:] = run_start[d:] == run_start[:-d]
+            if d > 1:
+                ok &= small
+            if not ok.any():
+                break
+            j = np.flatnonzero(ok)
+            pairs.append(np.stack([members[j - d], members[j]], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    p = np.sort(np.concatenate(pairs), axis=1)
+    return np.unique(p, axis=0)
+
+
+def _close(a: np.ndarray, b: np.ndarray, tol: float) -> np.ndarray:
+    """Écart relatif ≤ tol ; une valeur manquante ne bloque pas."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rel = np.abs(a - b) / np.maximum(np.abs(a), np.abs(b))
+    return np.isnan(rel) | (rel <= tol)
+
+
+def _components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Composantes connexes (propagation du plus petit label, vectorisée)."""
+    labels = np.arange(n)
+    if not len(pairs):
+        return labels
+    i, j = pairs[:, 0], pairs[:, 1]
+    while True:
+        low = np.minimum(labels[i], labels[j])
+        new = labels.copy()
+        np.minimum.at(new, i, low)
+        np.minimum.at(new, j, low)
+        new = new[new]                   # raccourci des chaînes
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def near_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+    """ID, dup_cluster, is_canonical pour chaque annonce de `df`."""
+    df = df.reset_index(drop=True)
+    n = len(df)
+    empty = pd.Series("", index=df.index)
+    text = (df.get("title", empty).fillna("").astype(str) + " "
+            + df.get("description", empty).fillna("").astype(str))
+    sig = minhash(_normalize(text).tolist())
+    block = pd.factorize(df["postal_code"].astype("string").fillna(""))[0]
+    pairs = _candidate_pairs(sig, block, valid=sig.any(axis=1))
+
+    if len(pairs):
+        i, j = pairs[:, 0], pairs[:, 1]
+
+        def num(c: str) -> np.ndarray:
+            if c not in df.columns:
+                return np.full(n, np.nan)
+            return pd.to_numeric(df[c], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+        surface, rooms, price = num("surface_m2"), num("rooms"), num("price_eur")
+        keep = ((sig[i] == sig[j]).mean(axis=1) >= MIN_JACCARD) \
+            & _close(surface[i], surface[j], SURFACE_TOL) \
+            & _close(price[i], price[j], PRICE_TOL) \
+            & (np.isnan(rooms[i]) | np.isnan(rooms[j]) | (rooms[i] == rooms[j]))
+        pairs = pairs[keep]
+    comp = _components(n, pairs)
+
+    # Canonique : la plus complète, puis le plus petit ID
+    completeness = df.notna().sum(axis=1).to_numpy()
+    ids = pd.to_numeric(df["ID"], errors="coerce").to_numpy(dtype="float64")
+    order = np.lexsort((ids, -completeness, comp))
+    first = np.r_[True, comp[order][1:] != comp[order][:-1]]
+    canon_row = np.empty(n, dtype=np.int64)
+    canon_row[comp[order][first]] = order[first]
+    canon = canon_row[comp]
+    return pd.DataFrame({
+        "ID": df["ID"].to_numpy(),
+        "dup_cluster": df["ID"].to_numpy()[canon],
+        "is_canonical": canon == np.arange(n),
+    })
+
+
+def write_duplicates(dups: pd.DataFrame, path: Path = DUP_PATH) -> Tuple[int, int]:
+    """Écrit la table ; renvoie (clusters de 2+ annonces, annonces en double)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"_{path.name}.tmp")
+    dups.to_parquet(tmp, index=False)
+    tmp.replace(path)
+    sizes = dups["dup_cluster"].value_counts()
+    return int((sizes > 1).sum()), int((~dups["is_canonical"]).sum())
+
+
+def main() -> None:
+    from dataset import PARQUET_DIR, read_dataset
+    df = read_dataset(PARQUET_DIR, columns=COLUMNS)
+    clusters, extra = write_duplicates(near_duplicates(df))
+    print(f"✔ {DUP_PATH} : {clusters} clusters de quasi-doublons, {extra} annonces non canoniques")
+
+
+if __name__ == "__main__":
+    main()
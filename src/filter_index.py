@@ -0,0 +1,126 @@
+# src/filter_index.py
+"""
+Index des filtres du tableau de bord, construit une fois par jeu de données chargé.
+
+- intervalles (prix, surface) : valeurs triées + positions, bornes trouvées par
+  recherche dichotomique (np.searchsorted) ;
+- ensembles (ville) : un bitmap compressé (np.packbits) par valeur, unis pour une
+  sélection de plusieurs valeurs ;
+- drapeaux (valeurs aberrantes, doublons) : bitmaps précalculés.
+
+Les conditions sont intersectées en NumPy et la requête renvoie des positions de
+lignes (le DataFrame n'est pas recopié) :
+
+    idx = FilterIndex(df, flags={"outlier": df["outlier"]})
+    pos = idx.query(ranges={"price_eur": (300_000, 600_000)}, sets={"city": ["Paris"]}, exclude=["outlier"])
+    dff = df.take(pos)
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+RANGE_COLS = ["price_eur", "surface_m2"]
+SET_COLS   = ["city"]
+
+
+def _float(s: pd.Series) -> np.ndarray:
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+class FilterIndex:
+    def __init__(self, df: pd.DataFrame, ranges: Iterable[str] = RANGE_COLS, sets: Iterable[str] = SET_COLS,
+                 flags: Optional[Dict[str, pd.Series]] = None):
+        self.n = len(df)
+        # Intervalles : valeurs non nulles triées, positions correspondantes, positions des nulles
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        for col in ranges:
+            if col not in df.columns:
+                continue
+            v = _float(df[col])
+            null = np.isnan(v)
+            pos = np.flatnonzero(~null)
+            order = pos[np.argsort(v[pos], kind="stable")]
+            self._sorted[col] = (v[order], order, np.flatnonzero(null))
+
+        # Ensembles : positions groupées par valeur (tri des codes), puis un bitmap par valeur
+        self._bitmaps: Dict[str, Dict[object, np.ndarray]] = {}
+        for col in sets:
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=True)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            maps = {}
+            for k, value in enumerate(uniques):
+                m = np.zeros(self.n, dtype=bool)
+                m[order[bounds[k]:bounds[k + 1]]] = True
+                maps[value] = np.packbits(m)
+            self._bitmaps[col] = maps
+
+        self._flags = {name: np.packbits(pd.Series(mask).fillna(False).to_numpy(dtype=bool))
+                       for name, mask in (flags or {}).items()}
+
+    # ----------------- Métadonnées (bornes des curseurs, listes) -----------------
+    def bounds(self, col: str) -> Optional[Tuple[float, float]]:
+        """(min, max) des valeurs non nulles, sans parcourir la colonne."""
+        vals = self._sorted.get(col, (np.empty(0),))[0]
+        return (float(vals[0]), float(vals[-1])) if len(vals) else None
+
+    def values(self, col: str) -> List:
+        return sorted(self._bitmaps.get(col, {}))
+
+    # ----------------- Conditions -----------------
+    def _unpack(self, bits: np.ndarray) -> np.ndarray:
+        return np.unpackbits(bits, count=self.n).view(bool)
+
+    def range_mask(self, col: str, lo: float, hi: float) -> Optional[np.ndarray]:
+        """lo ≤ valeur ≤ hi (valeurs manquantes exclues, comme Series.between) ;
+        None si la condition garde toutes les lignes."""
+        vals, order, null = self._sorted[col]
+        i, j = np.searchsorted(vals, lo, side="left"), np.searchsorted(vals, hi, side="right")
+        if i == 0 and j == self.n:
+            return None
+        if j - i < self.n // 2:          # on marque le plus petit des deux côtés
+            m = np.zeros(self.n, dtype=bool)
+            m[order[i:j]] = True
+        else:
+            m = np.ones(self.n, dtype=bool)
+            m[order[:i]] = False
+            m[order[j:]] = False
+            m[null] = False
+        return m
+
+    def set_mask(self, col: str, values: Iterable) -> np.ndarray:
+        maps = self._bitmaps[col]
+        bits = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+        for v in values:
+            if v in maps:
+                bits |= maps[v]
+        return self._unpack(bits)
+
+    def query(self, ranges: Optional[Dict[str, Tuple[float, float]]] = None,
+              sets: Optional[Dict[str, Iterable]] = None, exclude: Iterable[str] = ()) -> np.ndarray:
+        """Positions (croissantes) des lignes qui vérifient toutes les conditions. Une
+        colonne absente de l'index n'est pas filtrée ; un ensemble vide non plus."""
+        masks = []
+        for col, (lo, hi) in (ranges or {}).items():
+            if col in self._sorted:
+                masks.append(self.range_mask(col, lo, hi))
+        for col, values in (sets or {}).items():
+            values = list(values)
+            if values and col in self._bitmaps:
+                masks.append(self.set_mask(col, values))
+        if exclude:
+            bits = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+            for name in exclude:
+                if name in self._flags:
+                    bits |= self._flags[name]
+            masks.append(~self._unpack(bits))
+        masks = [m for m in masks if m is not None]
+        if not masks:
+            return np.arange(self.n)
+        mask = masks[0].copy() if len(masks) > 1 else masks[0]
+        for m in masks[1:]:
+            mask &= m
+        return np.flatnonzero(mask)
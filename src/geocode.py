@@ -0,0 +1,438 @@
+# src/geocode.py
+"""
+Géocodage par lots des annonces nettoyées : le cleaner écrit `lat` / `lon` dans ses
+sorties (CSV, Parquet) et le tableau de bord n'appelle plus aucun service.
+
+Chaque adresse distincte (libellé avant la virgule + code postal) n'est résolue
+qu'une fois, sur une clé normalisée "code postal|libellé" (minuscules, sans accents,
+abréviations de voies développées) :
+
+1. gazetteer local (data/gazetteer.csv ou .csv.gz) : extrait BAN d'un département
+   (adresses-75.csv.gz : numéro, voie, lieu-dit) ou liste `name;postal_code;lat;lon`
+   (quartiers...) ; l'adresse exacte, sinon la voie (sans le numéro) ;
+2. cache SQLite des résolutions distantes précédentes (data/geocode.sqlite) ;
+3. pour ce qui reste seulement, géocodeur distant (API Adresse de la BAN, Nominatim,
+   ou tout objet `RemoteGeocoder`), au débit imposé et dans la limite d'un budget de
+   requêtes par passage. Les adresses introuvables sont mémorisées aussi, et
+   retentées après MISS_RETRY_DAYS jours.
+
+    geo = Geocoder(remote="ban")
+    df = geo.annotate(df)                        # colonnes lat, lon
+
+    python src/geocode.py backfill --remote ban  # complète les sorties du cleaner
+    python src/geocode.py lookup "Vendôme, Paris 1er (75001)"
+"""
+import argparse
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import requests
+
+from text_norm import fold
+
+GAZETTEER       = Path("data/gazetteer.csv")    # ou data/gazetteer.csv.gz
+GEOCODE_DB      = Path("data/geocode.sqlite")
+REMOTE_BUDGET   = 500       # requêtes distantes au plus par passage (le reste attend le suivant)
+MISS_RETRY_DAYS = 30        # une adresse introuvable n'est redemandée qu'après ce délai
+MAX_ERRORS      = 3         # erreurs réseau consécutives avant d'abandonner le distant pour ce passage
+TIMEOUT         = 10
+USER_AGENT      = "immo-pipeline"
+
+# Abréviations courantes des voies (mots entiers, après normalisation)
+ABBREVIATIONS = {
+    "bd": "boulevard", "bld": "boulevard", "av": "avenue", "ave": "avenue", "pl": "place",
+    "fg": "faubourg", "fbg": "faubourg", "imp": "impasse", "sq": "square", "pass": "passage",
+    "crs": "cours", "r": "rue", "st": "saint", "ste": "sainte",
+}
+_HOUSE_NUMBER = r"^\d+ ?(bis|ter|quater|[a-z])? "
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    key         TEXT PRIMARY KEY,   -- "code postal|libellé normalisé"
+    lat         REAL,               -- NULL : introuvable (retenté après MISS_RETRY_DAYS)
+    lon         REAL,
+    source      TEXT NOT NULL,      -- géocodeur qui a répondu (ban, nominatim...)
+    resolved_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+# ----------------- Clés normalisées -----------------
+def _arrow(values) -> pa.Array:
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    return values.cast(pa.string()) if isinstance(values, pa.Array) else pa.array(values, pa.string())
+
+
+def normalize(texts) -> pa.Array:
+    """Minuscules sans accents, ponctuation → espace, abréviations développées (Arrow ;
+    chaque texte distinct une fois : une voie revient à chaque numéro)."""
+    enc = pc.dictionary_encode(_arrow(texts))
+    arr = pc.replace_substring_regex(fold(enc.dictionary), pattern=r"[^a-z0-9]+", replacement=" ")
+    for short, full in ABBREVIATIONS.items():
+        arr = pc.replace_substring_regex(arr, pattern=rf"\b{short}\b", replacement=full)
+    return pc.take(pc.utf8_trim_whitespace(arr), enc.indices)
+
+
+def _keys(postal_codes, labels, normalized: bool = False) -> pa.Array:
+    labels = _arrow(labels) if normalized else normalize(labels)
+    return pc.binary_join_element_wise(pc.fill_null(_arrow(postal_codes), ""), labels, "|")
+
+
+def split_addresses(addresses: pd.Series, postal_codes: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Libellé (avant la première virgule, sans "(75001)") et code postal (colonne
+    `postal_code`, sinon les 5 chiffres de l'adresse) de chaque adresse."""
+    addr = addresses.astype("string")
+    label = addr.str.split(",", n=1).str[0].str.replace(r"\(\d{5}\)|\b\d{5}\b", "", regex=True).str.strip()
+    cp = addr.str.extract(r"\b(\d{5})\b", expand=False)
+    if postal_codes is not None:
+        cp = postal_codes.astype("string").str.strip().replace("", pd.NA).fillna(cp)
+    return pd.DataFrame({"label": label.replace("", pd.NA), "postal_code": cp}, index=addresses.index)
+
+
+# ----------------- Gazetteer -----------------
+class Gazetteer:
+    """Index clé normalisée → coordonnées, lu une fois (pandas.Index haché, consulté
+    en une passe pour toutes les clés d'un lot)."""
+
+    def __init__(self, path: Path = GAZETTEER):
+        self.path = Path(path)
+        with pa.input_stream(str(self.path), compression="detect") as f:
+            head = f.read(4096).decode("utf-8-sig", "replace").splitlines()[0]
+        delimiter = ";" if head.count(";") >= head.count(",") else ","
+        as_text = {c: pa.string() for c in ("numero", "rep", "nom_voie", "nom_ld", "code_postal",
+                                            "name", "postal_code")}
+        table = pacsv.read_csv(str(self.path), parse_options=pacsv.ParseOptions(delimiter=delimiter),
+                               convert_options=pacsv.ConvertOptions(column_types=as_text))
+        cols = set(table.column_names)
+
+        def text(name: str) -> pa.Array:
+            return pc.fill_null(_arrow(table[name]), "") if name in cols else ""
+
+        # (clé, rang) : l'adresse exacte l'emporte sur la voie, la voie sur le lieu-dit
+        if "nom_voie" in cols:              # extrait BAN
+            cp = table["code_postal"]
+            street = normalize(text("nom_voie"))
+            full = pc.utf8_trim_whitespace(pc.binary_join_element_wise(
+                text("numero"), pc.utf8_lower(text("rep")), street, " "))
+            full = pc.replace_substring(full, pattern="  ", replacement=" ")    # sans indice de répétition
+            parts = [(_keys(cp, full, normalized=True), 0), (_keys(cp, street, normalized=True), 1)]
+            if "nom_ld" in cols:
+                parts.append((_keys(cp, text("nom_ld")), 2))
+        else:                               # liste name;postal_code;lat;lon
+            parts = [(_keys(table["postal_code"], text("name")), 0)]
+        lat = pd.to_numeric(table["lat"].to_pandas(), errors="coerce").to_numpy()
+        lon = pd.to_numeric(table["lon"].to_pandas(), errors="coerce").to_numpy()
+
+        g = pd.concat([pd.DataFrame({"key": k.to_numpy(zero_copy_only=False), "lat": lat, "lon": lon, "rank": r})
+                       for k, r in parts], ignore_index=True).dropna()
+        g = g[~g["key"].str.endswith("|")]
+        # Une voie, un lieu-dit : centre des adresses qui la composent
+        g = g.groupby(["key", "rank"], sort=False, as_index=False)[["lat", "lon"]].mean()
+        g = g.sort_values("rank", kind="stable").drop_duplicates("key")
+        self.index = pd.Index(g["key"].to_numpy(dtype=object))
+        self.coords = g[["lat", "lon"]].to_numpy(dtype="float64")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def lookup(self, keys) -> np.ndarray:
+        """Coordonnées (n, 2) des clés, NaN si absentes : adresse exacte, sinon la voie."""
+        keys = np.asarray(keys, dtype=object)
+        out = np.full((len(keys), 2), np.nan)
+        pos = self.index.get_indexer(keys)
+        found = pos >= 0
+        out[found] = self.coords[pos[found]]
+        rest = np.flatnonzero(~found)
+        if len(rest):
+            street = pc.replace_substring_regex(pa.array(keys[rest].tolist(), pa.string()),
+                                                pattern=r"\|" + _HOUSE_NUMBER[1:], replacement="|")
+            pos = self.index.get_indexer(np.asarray(street.to_pylist(), dtype=object))
+            out[rest[pos >= 0]] = self.coords[pos[pos >= 0]]
+        return out
+
+
+# ----------------- Cache SQLite -----------------
+def connect(path: Path = GEOCODE_DB) -> sqlite3.Connection:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.executescript(SCHEMA)
+    return con
+
+
+def cached(con: sqlite3.Connection, keys: Iterable[str], batch: int = 500) -> Dict[str, Tuple]:
+    """clé → (lat, lon, resolved_at) des clés déjà résolues (lat NULL : introuvable)."""
+    keys, out = list(keys), {}
+    for lo in range(0, len(keys), batch):
+        chunk = keys[lo:lo + batch]
+        rows = con.execute(f"SELECT key, lat, lon, resolved_at FROM geocodes WHERE key IN "
+                           f"({','.join('?' * len(chunk))})", chunk)
+        out.update((k, (y, x, at)) for k, y, x, at in rows)
+    return out
+
+
+# ----------------- Géocodeurs distants -----------------
+class RemoteGeocoder(ABC):
+    """`query(label, postal_code)` → (lat, lon) ou None si introuvable ; une exception
+    (réseau, quota) n'est pas mise en cache. Appels espacés d'au moins `min_interval` s."""
+    name = "remote"
+    min_interval = 1.0
+
+    def __init__(self):
+        self._last = 0.0
+
+    def __call__(self, label: str, postal_code: Optional[str]) -> Optional[Tuple[float, float]]:
+        wait = self._last + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            return self.query(label, postal_code)
+        finally:
+            self._last = time.monotonic()
+
+    @abstractmethod
+    def query(self, label: str, postal_code: Optional[str]) -> Optional[Tuple[float, float]]:
+        ...
+
+
+class BanGeocoder(RemoteGeocoder):
+    """API Adresse (BAN) : 50 requêtes/s par IP, on reste bien en dessous."""
+    name = "ban"
+    min_interval = 0.05
+    url = "https://api-adresse.data.gouv.fr/search/"
+    min_score = 0.5
+
+    def query(self, label, postal_code):
+        params = {"q": label, "limit": 1, **({"postcode": postal_code} if postal_code else {})}
+        resp = requests.get(self.url, params=params, headers={"User-Agent": USER_AGENT}, timeout=TIMEOUT)
+        resp.raise_for_status()
+        feats = resp.json().get("features") or []
+        if not feats or feats[0].get("properties", {}).get("score", 0) < self.min_score:
+            return None
+        lon, lat = feats[0]["geometry"]["coordinates"][:2]
+        return float(lat), float(lon)
+
+
+class NominatimGeocoder(RemoteGeocoder):
+    """Nominatim (OpenStreetMap) via geopy : 1 requête/s au plus (politique d'usage)."""
+    name = "nominatim"
+    min_interval = 1.0
+
+    def __init__(self, user_agent: str = USER_AGENT):
+        super().__init__()
+        from geopy.geocoders import Nominatim    # dépendance optionnelle
+        self._geo = Nominatim(user_agent=user_agent)
+
+    def query(self, label, postal_code):
+        q = f"{label}, {postal_code}, France" if postal_code else f"{label}, France"
+        loc = self._geo.geocode(q, exactly_one=True, addressdetails=False, country_codes="fr", timeout=TIMEOUT)
+        return (loc.latitude, loc.longitude) if loc else None
+
+
+REMOTES = {"ban": BanGeocoder, "nominatim": NominatimGeocoder}
+
+
+# ----------------- Géocodage par lots -----------------
+class Geocoder:
+    """Gazetteer + cache + distant. Le budget de requêtes distantes est partagé par
+    tous les lots d'un passage (mode --stream du cleaner)."""
+
+    def __init__(self, gazetteer: Optional[Path] = GAZETTEER, cache: Path = GEOCODE_DB,
+                 remote=None, budget: int = REMOTE_BUDGET):
+        path = next((p for p in (Path(gazetteer), Path(f"{gazetteer}.gz")) if p.exists()), None) if gazetteer else None
+        self.gazetteer = Gazetteer(path) if path else None
+        self.cache = Path(cache)
+        self.remote = REMOTES[remote]() if isinstance(remote, str) else remote
+        self.budget = budget
+        self.stats: Counter = Counter()
+
+    def resolve_keys(self, keys: List[str], labels: List[str], postal_codes: List[Optional[str]]) -> np.ndarray:
+        """Coordonnées (n, 2) de clés distinctes ; `labels` (texte d'origine) et
+        `postal_codes` servent aux requêtes distantes."""
+        out = np.full((len(keys), 2), np.nan)
+        todo = np.arange(len(keys))
+        if self.gazetteer is not None and len(keys):
+            out = self.gazetteer.lookup(keys)
+            todo = np.flatnonzero(np.isnan(out[:, 0]))
+            self.stats["gazetteer"] += len(keys) - len(todo)
+        if not len(todo):
+            return out
+        if self.remote is None and not self.cache.exists():
+            self.stats["missing"] += len(todo)    # rien à lire ni à écrire : pas de base créée
+            return out
+
+        con = connect(self.cache)
+        try:
+            known = cached(con, (keys[i] for i in todo))
+            retry_before = (datetime.now() - timedelta(days=MISS_RETRY_DAYS)).isoformat(timespec="seconds")
+            ask = []
+            for i in todo.tolist():
+                hit = known.get(keys[i])
+                if hit is not None and hit[0] is not None:
+                    out[i] = hit[:2]
+                    self.stats["cache"] += 1
+                elif hit is not None and hit[2] >= retry_before:
+                    self.stats["unknown"] += 1        # introuvable, déjà demandé récemment
+                else:
+                    ask.append(i)
+            errors = 0
+            for i in ask:
+                if self.remote is None:
+                    self.stats["missing"] += 1
+                    continue
+                if self.budget <= 0 or errors >= MAX_ERRORS:
+                    self.stats["pending"] += 1        # à résoudre au prochain passage
+                    continue
+                self.budget -= 1
+                try:
+                    res = self.remote(labels[i], postal_codes[i])
+                except Exception as exc:              # réseau, quota : rien n'est mis en cache
+                    errors += 1
+                    self.stats["errors"] += 1
+                    if errors == MAX_ERRORS:
+                        print(f"⚠ Géocodeur {self.remote.name} indisponible ({exc}), reste reporté")
+                    continue
+                errors = 0
+                with con:
+                    con.execute("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?)",
+                                (keys[i], *(res or (None, None)), self.remote.name,
+                                 datetime.now().isoformat(timespec="seconds")))
+                if res:
+                    out[i] = res
+                self.stats["remote" if res else "unknown"] += 1
+        finally:
+            con.close()
+        return out
+
+    def resolve(self, addresses: pd.Series, postal_codes: Optional[pd.Series] = None) -> np.ndarray:
+        """Coordonnées (n, 2) de chaque adresse, NaN si non résolue."""
+        out = np.full((len(addresses), 2), np.nan)
+        if not len(addresses):
+            return out
+        # Adresses distinctes : chacune n'est découpée, normalisée et cherchée qu'une fois
+        pairs = addresses.astype("string").fillna("")
+        if postal_codes is not None:
+            pairs = postal_codes.astype("string").fillna("") + "|" + pairs
+        codes, uniques = pd.factorize(pairs)
+        first = np.empty(len(uniques), dtype=np.int64)      # une ligne par adresse distincte
+        first[codes] = np.arange(len(codes))
+        parts = split_addresses(addresses.iloc[first].reset_index(drop=True),
+                                None if postal_codes is None else postal_codes.iloc[first].reset_index(drop=True))
+        ok = parts["label"].notna().to_numpy()
+        keys = np.asarray(_keys(parts["postal_code"][ok], parts["label"][ok]).to_pylist(), dtype=object)
+        # Plusieurs adresses peuvent partager une clé ("Bd", "Boulevard"...)
+        key_codes, distinct = pd.factorize(keys)
+        first_key = np.empty(len(distinct), dtype=np.int64)
+        first_key[key_codes] = np.arange(len(key_codes))
+        labels = parts["label"][ok].iloc[first_key].tolist()
+        cps = parts["postal_code"][ok].iloc[first_key].astype(object).where(lambda s: s.notna(), None).tolist()
+        per_key = self.resolve_keys(list(distinct), labels, cps)
+        per_addr = np.full((len(uniques), 2), np.nan)
+        per_addr[ok] = per_key[key_codes]
+        return per_addr[codes]
+
+    def annotate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Colonnes `lat` / `lon` (float, NaN si non résolue) ajoutées ou complétées."""
+        if "address" not in df.columns:
+            return df
+        lat = pd.to_numeric(df["lat"], errors="coerce") if "lat" in df.columns else pd.Series(np.nan, index=df.index)
+        lon = pd.to_numeric(df["lon"], errors="coerce") if "lon" in df.columns else pd.Series(np.nan, index=df.index)
+        missing = (lat.isna() | lon.isna()).to_numpy()
+        if missing.any():
+            cp = df["postal_code"][missing] if "postal_code" in df.columns else None
+            coords = self.resolve(df["address"][missing], cp)
+            lat, lon = lat.to_numpy(dtype="float64", copy=True), lon.to_numpy(dtype="float64", copy=True)
+            lat[missing], lon[missing] = coords[:, 0], coords[:, 1]
+        df["lat"] = np.asarray(lat, dtype="float64")
+        df["lon"] = np.asarray(lon, dtype="float64")
+        return df
+
+    def summary(self) -> str:
+        s = self.stats
+        msg = f"{s['gazetteer']} adresses par le gazetteer, {s['cache']} par le cache"
+        if self.remote is None:
+            return msg + f", {s['missing'] + s['unknown']} sans coordonnées (pas de géocodeur distant)"
+        return (msg + f", {s['remote']} par {self.remote.name}, {s['unknown']} introuvables, "
+                f"{s['pending']} reportées" + (f", {s['errors']} erreurs" if s["errors"] else ""))
+
+
+# ----------------- Sorties du cleaner -----------------
+def backfill(geocoder: Geocoder, parquet_out: Optional[Path] = None, csv_out: Optional[Path] = None) -> int:
+    """Complète lat/lon des annonces déjà écrites (nouveau gazetteer, adresses
+    reportées faute de budget...). Une sortie n'est réécrite que si des coordonnées
+    ont été trouvées ; renvoie le nombre de lignes complétées."""
+    from cleaner import ORDERED_COLS, write_csv
+    from dataset import read_dataset, write_dataset
+    from schema import compact_schema
+
+    filled, coords = 0, None                   # coords : ID → (lat, lon), reportées sur le CSV
+    if parquet_out and Path(parquet_out).exists():
+        df = read_dataset(parquet_out, columns=["ID", "address", "postal_code", "lat", "lon"])
+        before = int(df["lat"].notna().sum()) if "lat" in df.columns else 0
+        df = geocoder.annotate(df)
+        filled = int(df["lat"].notna().sum()) - before
+        coords = df.set_index(df["ID"].astype(str))[["lat", "lon"]]
+        coords = coords[~coords.index.duplicated()]
+        if filled:
+            # Relecture complète reportée par ID : l'ordre des partitions n'est pas garanti
+            full = read_dataset(parquet_out)
+            ids = full["ID"].astype(str)
+            full["lat"], full["lon"] = ids.map(coords["lat"]), ids.map(coords["lon"])
+            write_dataset(compact_schema(full, categories=False), parquet_out)
+    if csv_out and Path(csv_out).exists():
+        df = pd.read_csv(csv_out, sep=";", dtype=str, keep_default_na=False, encoding="utf-8-sig")
+        before = int(pd.to_numeric(df["lat"], errors="coerce").notna().sum()) if "lat" in df.columns else 0
+        if coords is not None and "ID" in df.columns:
+            for c in ("lat", "lon"):
+                old = pd.to_numeric(df[c], errors="coerce") if c in df.columns else np.nan
+                df[c] = df["ID"].map(coords[c]).fillna(old)
+        else:
+            df = geocoder.annotate(df)
+        after = int(df["lat"].notna().sum())
+        if after > before:
+            cols = [c for c in ORDERED_COLS if c in df.columns] + [c for c in df.columns if c not in ORDERED_COLS]
+            write_csv(df[cols], csv_out)
+            filled = max(filled, after - before)
+    return filled
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Géocodage par lots des annonces nettoyées")
+    ap.add_argument("--gazetteer", type=Path, default=GAZETTEER)
+    ap.add_argument("--cache", type=Path, default=GEOCODE_DB)
+    ap.add_argument("--remote", choices=[*REMOTES, "off"], default="off", help="géocodeur distant des adresses restantes")
+    ap.add_argument("--budget", type=int, default=REMOTE_BUDGET, help="requêtes distantes au plus")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    bf = sub.add_parser("backfill", help="compléter lat/lon de data/cleaned_parquet et data/cleaned_data.csv")
+    bf.add_argument("--csv", type=Path, default=Path("data/cleaned_data.csv"))
+    lk = sub.add_parser("lookup", help="géocoder une adresse")
+    lk.add_argument("address")
+    lk.add_argument("--postal-code", default=None)
+    args = ap.parse_args()
+
+    geo = Geocoder(args.gazetteer, args.cache, None if args.remote == "off" else args.remote, args.budget)
+    if args.cmd == "backfill":
+        from dataset import PARQUET_DIR
+        n = backfill(geo, PARQUET_DIR, args.csv)
+        print(f"✔ {n} annonces complétées ({geo.summary()})")
+    else:
+        cp = None if args.postal_code is None else pd.Series([args.postal_code])
+        (lat, lon), = geo.resolve(pd.Series([args.address]), cp)
+        print(f"{lat:.6f}, {lon:.6f}" if not np.isnan(lat) else "introuvable", f"({geo.summary()})")
+
+
+if __name__ == "__main__":
+    main()
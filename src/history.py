@@ -0,0 +1,221 @@
+# src/history.py
+"""
+Historique des annonces dans une base SQLite embarquée (data/history.sqlite).
+
+Chaque passage du cleaner y charge comme instantané du jour les annonces listées
+dans les pages de recherche ce jour-là (relevé `seen/` du store, cf. store.py), en
+une seule transaction ; une annonce absente des recherches garde son last_seen :
+
+    listings      une ligne par ID : attributs courants, first_seen, last_seen
+    observations  (ID, snapshot) : prix/surface à la date où ils ont été vus pour la
+                  première fois ou ont changé, avec le prix précédent (prev_price_eur)
+
+Les instantanés se chargent dans l'ordre chronologique (un nouveau passage le même
+jour remplace celui du matin). Limites de la collecte :
+
+    last_seen      le spider s'arrête dès son quota d'annonces nouvelles atteint : `seen/`
+                   ne couvre que les pages de recherche parcourues jusque-là, une annonce
+                   listée plus loin garde son last_seen jusqu'à un passage qui l'atteint
+    price_changes  un prix ne change que si le spider re-demande la fiche d'une annonce
+                   connue (REVISIT_KNOWN de spider.py, actif dès que cette base existe) ;
+                   les revisites passent après les fiches nouvelles, celles encore en
+                   attente à l'arrêt du spider sont faites à un passage suivant
+
+Les questions usuelles sont des lectures indexées :
+
+    python src/history.py drops 75011 --since 2026-10-01   # baisses de prix du mois
+    python src/history.py load --date 2026-10-17           # relevé du jour, attributs de data/cleaned_parquet
+"""
+import argparse
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+HISTORY_DB = Path("data/history.sqlite")
+COLUMNS    = ["ID", "url", "postal_code", "property_type", "rooms", "title", "address",
+              "price_eur", "surface_m2", "price_per_m2"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    id            TEXT PRIMARY KEY,
+    url           TEXT,
+    postal_code   TEXT,
+    property_type TEXT,
+    rooms         INTEGER,
+    title         TEXT,
+    address       TEXT,
+    price_eur     REAL,
+    surface_m2    REAL,
+    first_seen    TEXT NOT NULL,
+    last_seen     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    id             TEXT NOT NULL,
+    snapshot       TEXT NOT NULL,
+    price_eur      REAL,
+    surface_m2     REAL,
+    price_per_m2   REAL,
+    prev_price_eur REAL,          -- NULL à la première observation
+    PRIMARY KEY (id, snapshot)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS listings_postal_seen ON listings (postal_code, last_seen);
+CREATE INDEX IF NOT EXISTS listings_first_seen  ON listings (first_seen);
+-- Index partiel : seulement les changements (les premières observations en sont exclues)
+CREATE INDEX IF NOT EXISTS observations_changes ON observations (snapshot) WHERE prev_price_eur IS NOT NULL;
+"""
+
+
+def connect(path: Path = HISTORY_DB) -> sqlite3.Connection:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.executescript(SCHEMA)
+    return con
+
+
+# ----------------- Chargement -----------------
+def _rows(df: pd.DataFrame):
+    """Tuples (dans l'ordre de COLUMNS) avec None pour les valeurs manquantes."""
+    df = df.reindex(columns=COLUMNS)
+    df["ID"] = df["ID"].astype("string")
+    df["rooms"] = pd.to_numeric(df["rooms"], errors="coerce").astype("Int64")
+    df = df[df["ID"].notna()].astype(object)
+    return df.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def load_snapshot(df: pd.DataFrame, day: Optional[str] = None, path: Path = HISTORY_DB) -> Dict[str, int]:
+    """Charge les annonces de `df` comme instantané du jour `day` (AAAA-MM-JJ,
+    aujourd'hui par défaut). Renvoie les compteurs nouvelles / prix modifiés / total."""
+    day = day or date.today().isoformat()
+    con = connect(path)
+    try:
+        with con:   # une seule transaction (annulée en cas d'erreur)
+            con.execute("DROP TABLE IF EXISTS temp.snap")
+            con.execute("""CREATE TEMP TABLE snap (
+                id TEXT PRIMARY KEY, url TEXT, postal_code TEXT, property_type TEXT, rooms INTEGER,
+                title TEXT, address TEXT, price_eur REAL, surface_m2 REAL, price_per_m2 REAL)""")
+            con.executemany("INSERT OR REPLACE INTO snap VALUES (?,?,?,?,?,?,?,?,?,?)", _rows(df))
+            new = con.execute("SELECT COUNT(*) FROM snap WHERE id NOT IN "
+                              "(SELECT id FROM listings WHERE first_seen < :day)", {"day": day}).fetchone()[0]
+
+            # Observation : première apparition, ou prix/surface différents de la dernière observation antérieure
+            con.execute("DELETE FROM observations WHERE snapshot = :day AND id IN (SELECT id FROM snap)",
+                        {"day": day})
+            cur = con.execute("""
+                INSERT INTO observations (id, snapshot, price_eur, surface_m2, price_per_m2, prev_price_eur)
+                SELECT s.id, :day, s.price_eur, s.surface_m2, s.price_per_m2, p.price_eur
+                FROM snap s
+                LEFT JOIN observations p ON p.id = s.id AND p.snapshot =
+                    (SELECT MAX(snapshot) FROM observations o WHERE o.id = s.id AND o.snapshot < :day)
+                WHERE p.id IS NULL OR p.price_eur IS NOT s.price_eur OR p.surface_m2 IS NOT s.surface_m2
+            """, {"day": day})
+            observed = cur.rowcount
+
+            con.execute("""
+                INSERT INTO listings (id, url, postal_code, property_type, rooms, title, address,
+                                      price_eur, surface_m2, first_seen, last_seen)
+                SELECT id, url, postal_code, property_type, rooms, title, address,
+                       price_eur, surface_m2, :day, :day
+                FROM snap WHERE true
+                ON CONFLICT (id) DO UPDATE SET
+                    url = excluded.url, postal_code = excluded.postal_code,
+                    property_type = excluded.property_type, rooms = excluded.rooms,
+                    title = excluded.title, address = excluded.address,
+                    price_eur = excluded.price_eur, surface_m2 = excluded.surface_m2,
+                    first_seen = MIN(first_seen, excluded.first_seen),
+                    last_seen = MAX(last_seen, excluded.last_seen)
+            """, {"day": day})
+            total = con.execute("SELECT COUNT(*) FROM snap").fetchone()[0]
+            con.execute("DROP TABLE temp.snap")
+    finally:
+        con.close()
+    return {"new": new, "changed": observed - new, "total": total}
+
+
+def last_snapshot(path: Path = HISTORY_DB) -> Optional[str]:
+    """Date du dernier instantané chargé (None si l'historique est vide)."""
+    con = connect(path)
+    try:
+        return con.execute("SELECT MAX(last_seen) FROM listings").fetchone()[0]
+    finally:
+        con.close()
+
+
+def load_seen(df: pd.DataFrame, store, days: Optional[List[str]] = None,
+              path: Path = HISTORY_DB) -> Dict[str, Dict[str, int]]:
+    """Charge un instantané par jour de relevé du store (`store.seen_days()`) : les
+    lignes de `df` dont l'ID a été listé ce jour-là. Par défaut, les jours depuis le
+    dernier instantané, celui-ci compris (relevé complété par un passage ultérieur)."""
+    if days is None:
+        last = last_snapshot(path)
+        days = [d for d in store.seen_days() if last is None or d >= last]
+    ids = pd.to_numeric(df["ID"], errors="coerce")
+    return {day: load_snapshot(df[ids.isin(store.seen_ids(day))], day, path) for day in sorted(days)}
+
+
+# ----------------- Requêtes -----------------
+def price_changes(postal_code: Optional[str] = None, since: Optional[str] = None,
+                  drops_only: bool = True, path: Path = HISTORY_DB) -> pd.DataFrame:
+    """Changements de prix depuis `since` (AAAA-MM-JJ), éventuellement dans un code postal."""
+    sql = """
+        SELECT o.snapshot, l.id AS ID, l.postal_code, l.title, l.url,
+               o.prev_price_eur, o.price_eur, o.price_eur - o.prev_price_eur AS delta_eur
+        FROM observations o JOIN listings l ON l.id = o.id
+        WHERE o.prev_price_eur IS NOT NULL AND o.snapshot >= :since
+    """
+    if drops_only:
+        sql += " AND o.price_eur < o.prev_price_eur"
+    if postal_code:
+        sql += " AND l.postal_code = :postal_code"
+    sql += " ORDER BY o.snapshot DESC, delta_eur"
+    con = connect(path)
+    try:
+        return pd.read_sql_query(sql, con, params={"since": since or "", "postal_code": postal_code})
+    finally:
+        con.close()
+
+
+def listings_seen(since: str, until: Optional[str] = None, path: Path = HISTORY_DB) -> pd.DataFrame:
+    """Annonces apparues entre `since` et `until` (inclus)."""
+    con = connect(path)
+    try:
+        return pd.read_sql_query(
+            "SELECT * FROM listings WHERE first_seen BETWEEN :since AND :until ORDER BY first_seen",
+            con, params={"since": since, "until": until or "9999-12-31"})
+    finally:
+        con.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(
+        description="Historique des annonces (SQLite)",
+        epilog="last_seen avance seulement pour les annonces des pages de recherche parcourues avant "
+               "le quota du spider ; les changements de prix viennent des fiches connues re-demandées "
+               "(REVISIT_KNOWN de spider.py, actif dès que l'historique existe).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ld = sub.add_parser("load", help="charger les relevés de recherche comme instantanés")
+    ld.add_argument("--date", default=None, help="jour du relevé (AAAA-MM-JJ, défaut : jours non chargés)")
+    ld.add_argument("--store", type=Path, default=Path("data/raw"), help="store du spider (relevés seen/)")
+    dr = sub.add_parser("drops", help="baisses de prix (fiches connues re-demandées par le spider)")
+    dr.add_argument("postal_code", nargs="?")
+    dr.add_argument("--since", default=date.today().replace(day=1).isoformat())
+    args = ap.parse_args()
+
+    if args.cmd == "load":
+        from dataset import PARQUET_DIR, read_dataset
+        from store import ItemStore
+        days = [args.date] if args.date else None
+        for day, res in load_seen(read_dataset(PARQUET_DIR, columns=COLUMNS), ItemStore(args.store), days).items():
+            print(f"✔ {HISTORY_DB} {day} : {res['new']} nouvelles, {res['changed']} modifiées, {res['total']} vues")
+    else:
+        with pd.option_context("display.width", 200, "display.max_colwidth", 40):
+            print(price_changes(args.postal_code, args.since).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
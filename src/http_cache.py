@@ -0,0 +1,42 @@
+# src/http_cache.py
+"""
+Politique de cache HTTP du spider : re-visite par type de page + requêtes conditionnelles.
+
+Utilisée avec le HttpCacheMiddleware de Scrapy (stockage disque). Chaque requête
+porte `meta["page_type"]` ("search" / "detail") ; `HTTPCACHE_REVISIT` donne, par
+type, la durée (en secondes) pendant laquelle la copie en cache est servie sans
+réseau. Au-delà, la requête part avec If-None-Match / If-Modified-Since et un 304
+renvoie la copie en cache (flag "cached" → page inchangée).
+"""
+from time import time
+
+from scrapy.extensions.httpcache import RFC2616Policy
+from scrapy.utils.httpobj import urlparse_cached
+
+DEFAULT_PAGE_TYPE = "detail"
+
+
+class RevisitPolicy(RFC2616Policy):
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.revisit = {k: float(v) for k, v in settings.getdict("HTTPCACHE_REVISIT").items()}
+
+    def should_cache_request(self, request):
+        return request.method == "GET" and urlparse_cached(request).scheme not in self.ignore_schemes
+
+    def should_cache_response(self, response, request):
+        # On garde toute page complète, même sans en-tête d'expiration :
+        # c'est la politique de re-visite qui décide de sa fraîcheur
+        return response.status == 200
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        page_type = request.meta.get("page_type", DEFAULT_PAGE_TYPE)
+        stored_at = request.meta.get("cache_timestamp") or 0
+        if time() - stored_at < self.revisit.get(page_type, 0):
+            return True
+        self._set_conditional_validators(request, cachedresponse)
+        return False
+
+    def is_cached_response_valid(self, cachedresponse, response, request):
+        # 304 → inchangé ; erreur serveur → on se rabat sur la dernière copie
+        return response.status == 304 or response.status >= 500
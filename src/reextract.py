@@ -0,0 +1,96 @@
+# src/reextract.py
+"""
+Ré-extraction hors ligne des fiches archivées (aucun accès réseau).
+
+Rejoue `spider.extract_detail` sur la dernière capture de chaque annonce de
+l'archive HTML, en parallèle sur tous les cœurs, et reconstruit un store brut :
+
+    python src/reextract.py                  # → data/raw_reextract
+    python src/reextract.py --replace        # remplace data/raw (annonces non archivées conservées)
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+
+from scrapy.http import HtmlResponse
+
+import spider
+from archive import ARCHIVE_DIR, HtmlArchive
+from store import ItemStore
+
+OUT_DIR   = Path("data/raw_reextract")
+CHUNKSIZE = 16
+
+_archive = None
+
+
+def _init_worker(root: str) -> None:
+    global _archive
+    _archive = HtmlArchive(Path(root))
+
+
+def extract_entry(entry: Dict) -> Optional[Dict]:
+    """Entrée du manifeste → item, ou None si la page n'est plus exploitable."""
+    try:
+        body = _archive.get(entry["sha256"])
+        response = HtmlResponse(entry["url"], body=body, encoding=entry.get("encoding") or "utf-8")
+        id_val = entry.get("ID") or spider.listing_id_from_url(entry["url"])
+        if id_val is None:
+            return None
+        return spider.extract_detail(response, id_val)
+    except Exception:
+        return None
+
+
+def reextract(archive_root: Path = ARCHIVE_DIR, out_dir: Path = OUT_DIR,
+              workers: Optional[int] = None, base: Optional[ItemStore] = None) -> Dict[str, int]:
+    """Écrit dans `out_dir` les items ré-extraits, puis (si `base`) les items de `base`
+    dont l'ID n'est pas archivé."""
+    entries = list(HtmlArchive(archive_root).latest().values())
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out = ItemStore(out_dir)
+    done, failed = set(), 0
+    with mp.Pool(processes=workers or os.cpu_count(), initializer=_init_worker,
+                 initargs=(str(archive_root),)) as pool:
+        for item in pool.imap_unordered(extract_entry, entries, chunksize=CHUNKSIZE):
+            if item is None:
+                failed += 1
+                continue
+            out.append(item)
+            done.add(item["ID"])
+    kept = 0
+    if base is not None:
+        for rec in base.iter_records():
+            try: id_val = int(rec.get("ID"))
+            except Exception: continue
+            if id_val not in done:
+                out.append(rec)
+                kept += 1
+    out.close()
+    return {"pages": len(entries), "reextracted": len(done), "failed": failed, "kept": kept}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Ré-extraction hors ligne depuis l'archive HTML")
+    ap.add_argument("--archive", type=Path, default=ARCHIVE_DIR)
+    ap.add_argument("--out", type=Path, default=OUT_DIR)
+    ap.add_argument("--workers", type=int, default=None, help="défaut : tous les cœurs")
+    ap.add_argument("--replace", action="store_true", help=f"remplacer {spider.STORE_DIR} par le résultat")
+    args = ap.parse_args()
+
+    base = spider.open_main_store(logging.getLogger(__name__)) if args.replace else None
+    res = reextract(args.archive, args.out, args.workers, base)
+    print(f"✔ {res['reextracted']} fiches ré-extraites sur {res['pages']} "
+          f"({res['failed']} échecs, {res['kept']} annonces non archivées conservées)")
+    if args.replace:
+        base.replace_with(args.out)   # génération suivante, relevés seen/ conservés
+        print(f"✔ {spider.STORE_DIR} reconstruit")
+
+
+if __name__ == "__main__":
+    main()
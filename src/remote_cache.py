@@ -0,0 +1,212 @@
+# src/remote_cache.py
+"""
+Cache disque des ressources distantes du tableau de bord (CSV GitHub raw, API des
+commits), partagé par tous les processus Streamlit d'une même machine.
+
+Une entrée par URL (+ paramètres) : en-tête JSON (ETag, Last-Modified) puis le corps.
+Pendant MAX_AGE secondes après la dernière validation, la copie est servie sans
+réseau ; ensuite la requête part avec If-None-Match / If-Modified-Since et un 304
+ne coûte qu'un aller-retour. Si l'origine est injoignable (ou répond 5xx, 403 de
+quota...), la dernière copie est servie telle quelle ("stale") et l'origine n'est
+plus interrogée pendant RETRY_AFTER secondes (un rerun n'attend pas un nouveau timeout).
+
+    from remote_cache import fetch, prefetch
+    res = fetch(url)                          # res.content, res.status
+    prefetch([{"url": csv_url}, {"url": api, "params": {...}}])   # en parallèle, sans lire les corps
+
+    python src/remote_cache.py URL            # télécharge / revalide, affiche l'état
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import requests
+
+try:
+    import fcntl
+except ImportError:          # Windows : pas de verrou, au pire deux téléchargements simultanés
+    fcntl = None
+
+CACHE_DIR   = Path(os.getenv("IMMO_HTTP_CACHE", "data/http_cache"))
+MAX_AGE     = 600           # secondes pendant lesquelles une copie validée est servie sans réseau
+RETRY_AFTER = 60            # après un échec de l'origine, copie servie "stale" sans réseau pendant ce délai
+TIMEOUT     = 30
+USER_AGENT  = "immo-dashboard"
+
+
+class Fetched(NamedTuple):
+    content: bytes            # vide avec body=False
+    status: str               # "fresh" (sans réseau), "not_modified" (304), "fetched" (200), "stale" (origine en échec)
+    etag: Optional[str]
+    last_modified: Optional[str]
+    validated_at: float       # dernière confirmation par l'origine (timestamp)
+
+
+# ----------------- Entrées -----------------
+def _entry(cache_dir: Path, url: str, params: Optional[Dict]) -> Path:
+    key = json.dumps([url, sorted((params or {}).items())], default=str)
+    return Path(cache_dir) / (hashlib.sha256(key.encode()).hexdigest()[:32] + ".bin")
+
+
+def _read_header(path: Path) -> Optional[Dict]:
+    try:
+        with path.open("rb") as f:
+            return json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+
+
+def _read(path: Path, header: Dict, status: str, body: bool) -> Fetched:
+    content = b""
+    if body:
+        with path.open("rb") as f:
+            f.readline()
+            content = f.read()
+    # La date de validation est la date de modification du fichier (un 304 ne fait que la repousser)
+    return Fetched(content, status, header.get("etag"), header.get("last_modified"), path.stat().st_mtime)
+
+
+def _write(path: Path, url: str, resp: requests.Response) -> Dict:
+    header = {"url": url, "etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"_{path.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        f.write(json.dumps(header).encode() + b"\n")
+        f.write(resp.content)
+    os.replace(tmp, path)     # les lecteurs voient l'ancienne ou la nouvelle copie, jamais un mélange
+    return header
+
+
+def _failed_recently(path: Path, retry_after: float) -> bool:
+    """Dernier échec de l'origine (date du témoin `.fail`) il y a moins de `retry_after` s."""
+    try:
+        return time.time() - path.with_suffix(".fail").stat().st_mtime < retry_after
+    except OSError:
+        return False
+
+
+def _mark_failed(path: Path, failed: bool) -> None:
+    # Témoin séparé : la date du fichier d'entrée reste celle de la dernière validation
+    fail = path.with_suffix(".fail")
+    if failed:
+        fail.touch()
+    else:
+        fail.unlink(missing_ok=True)
+
+
+@contextmanager
+def _locked(path: Path):
+    """Verrou exclusif par entrée : un seul processus revalide, les autres relisent sa copie."""
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.with_suffix(".lock").open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ----------------- Requêtes -----------------
+def fetch(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, max_age: float = MAX_AGE,
+          timeout: float = TIMEOUT, cache_dir: Path = CACHE_DIR, body: bool = True,
+          retry_after: float = RETRY_AFTER) -> Fetched:
+    """GET conditionnel servi depuis le cache disque. Lève l'erreur réseau / HTTP
+    seulement s'il n'existe encore aucune copie."""
+    path = _entry(cache_dir, url, params)
+
+    def cached() -> Optional[Fetched]:
+        header = _read_header(path)
+        if header is None:
+            return None
+        if time.time() - path.stat().st_mtime < max_age:
+            return _read(path, header, "fresh", body)
+        if _failed_recently(path, retry_after):
+            return _read(path, header, "stale", body)
+        return None
+
+    res = cached()
+    if res is not None:
+        return res
+    with _locked(path):
+        res = cached()        # un autre processus vient peut-être de revalider (ou d'échouer)
+        if res is not None:
+            return res
+        header = _read_header(path)
+        req_headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        if header and header.get("etag"):
+            req_headers["If-None-Match"] = header["etag"]
+        if header and header.get("last_modified"):
+            req_headers["If-Modified-Since"] = header["last_modified"]
+        try:
+            resp = requests.get(url, params=params, headers=req_headers, timeout=timeout)
+        except requests.RequestException:
+            if header is None:
+                raise
+            _mark_failed(path, True)
+            return _read(path, header, "stale", body)
+        if resp.status_code == 304 and header is not None:
+            os.utime(path)
+            _mark_failed(path, False)
+            return _read(path, header, "not_modified", body)
+        if resp.status_code == 200:
+            header = _write(path, url, resp)
+            _mark_failed(path, False)
+            return Fetched(resp.content if body else b"", "fetched", header["etag"], header["last_modified"],
+                           path.stat().st_mtime)
+        if header is None:
+            resp.raise_for_status()
+            raise requests.HTTPError(f"{resp.status_code} inattendu pour {url}", response=resp)
+        _mark_failed(path, True)
+        return _read(path, header, "stale", body)
+
+
+def prefetch(specs: Iterable[Dict], max_age: float = MAX_AGE, cache_dir: Path = CACHE_DIR) -> List[Optional[Fetched]]:
+    """Revalide plusieurs entrées en parallèle (specs : arguments de `fetch`, sans
+    lire les corps). Renvoie l'état de chacune, None si aucune copie n'a pu être obtenue."""
+    specs = list(specs)
+
+    def one(spec: Dict) -> Optional[Fetched]:
+        try:
+            return fetch(**{"max_age": max_age, "cache_dir": cache_dir, **spec}, body=False)
+        except requests.RequestException:
+            return None
+
+    if len(specs) <= 1:
+        return [one(s) for s in specs]
+    with ThreadPoolExecutor(max_workers=len(specs)) as pool:
+        return list(pool.map(one, specs))
+
+
+def expire(cache_dir: Path = CACHE_DIR) -> int:
+    """Force la revalidation de toutes les entrées au prochain accès (copies gardées,
+    délais après échec levés)."""
+    n = 0
+    for path in Path(cache_dir).glob("*.bin"):
+        os.utime(path, (0, 0))
+        path.with_suffix(".fail").unlink(missing_ok=True)
+        n += 1
+    return n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Cache disque des ressources distantes du tableau de bord")
+    ap.add_argument("url")
+    ap.add_argument("--max-age", type=float, default=MAX_AGE)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    res = fetch(args.url, max_age=args.max_age)
+    print(f"{res.status} : {len(res.content):,} octets en {time.perf_counter() - t0:.3f} s "
+          f"(ETag {res.etag}, Last-Modified {res.last_modified})".replace(",", " "))
+
+
+if __name__ == "__main__":
+    main()
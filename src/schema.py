@@ -0,0 +1,122 @@
+# src/schema.py
+"""
+Profil de schéma compact des annonces nettoyées (cleaner, dataset Parquet, tableau de bord).
+
+- champs énumérés (code postal, lettres DPE/GES, type de bien) → `category` ;
+- entiers bornés (pièces, étage, année) → `Int16` nullable, toujours : le type vient de
+  bornes déclarées (`NARROW_BOUNDS`), pas des valeurs d'un lot, et tous les fichiers d'un
+  dataset écrit par lots ont le même schéma ; une valeur hors bornes (erreur d'extraction) → NA ;
+- `description` (l'essentiel des octets) n'est chargée qu'à la demande.
+
+    df = compact_schema(df)
+    print(bytes_per_row(df))
+
+Relecture du CSV du cleaner aux mêmes types (`CSV_DTYPES`), par le lecteur CSV
+d'Arrow, sans recopier le texte :
+
+    df = read_cleaned_csv("data/cleaned_data.csv", exclude=[DESCRIPTION_COL])
+"""
+import csv
+import io
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# Types de sortie de cleaner.coerce_types / add_price_per_m2 (et de la relecture du CSV)
+FLOAT_COLS: List[str] = ["price_eur", "surface_m2"]
+INT_COLS: List[str] = ["rooms", "floor", "year_built"]
+STR_COLS: List[str] = ["url", "title", "address", "postal_code", "description", "dpe_letter", "ges_letter",
+                       "property_type"]
+CSV_DTYPES: Dict[str, str] = {
+    "ID": "Int64",                      # explicite : même type par Arrow et par le repli pandas
+    **{c: "float64" for c in FLOAT_COLS}, "price_per_m2": "Float64",
+    **{c: "Int64" for c in INT_COLS},
+    **{c: "string" for c in STR_COLS},
+    "outlier": "boolean", "outlier_reason": "string",
+    "lat": "float64", "lon": "float64",
+}
+
+CATEGORY_COLS: List[str] = ["postal_code", "dpe_letter", "ges_letter", "property_type"]
+NARROW_DTYPES: Dict[str, str] = {"rooms": "Int16", "floor": "Int16", "year_built": "Int16"}
+NARROW_BOUNDS: Dict[str, Tuple[int, int]] = {"rooms": (0, 1000), "floor": (-10, 1000), "year_built": (1000, 2100)}
+DESCRIPTION_COL = "description"
+
+
+def _narrow(s: pd.Series, col: str) -> pd.Series:
+    """`s` en NARROW_DTYPES[col] ; valeurs hors de NARROW_BOUNDS[col] ou non entières → NA."""
+    lo, hi = NARROW_BOUNDS[col]
+    v = pd.to_numeric(s, errors="coerce").astype("Float64")
+    return v.where((v >= lo) & (v <= hi) & (v == v.round())).astype(NARROW_DTYPES[col])
+
+
+def compact_schema(df: pd.DataFrame, categories: bool = True) -> pd.DataFrame:
+    """Applique le profil compact (catégories optionnelles : les fichiers Parquet
+    gardent du texte, dictionnarisé à l'écriture et relu en catégories)."""
+    df = df.copy()
+    for col in NARROW_DTYPES:
+        if col in df.columns:
+            df[col] = _narrow(df[col], col)
+    if categories:
+        for col in CATEGORY_COLS:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+    return df
+
+
+def bytes_per_row(df: pd.DataFrame) -> float:
+    return float(df.memory_usage(deep=True).sum()) / max(len(df), 1)
+
+
+def describe_gain(before: pd.DataFrame, after: pd.DataFrame) -> str:
+    b, a = bytes_per_row(before), bytes_per_row(after)
+    return f"{b:,.0f} → {a:,.0f} octets/ligne ({(1 - a / b) * 100 if b else 0:.0f} % de moins)".replace(",", " ")
+
+
+# ----------------- Relecture du CSV -----------------
+_BOM = b"\xef\xbb\xbf"
+_ARROW_TYPES = {"float64": pa.float64(), "Float64": pa.float64(), "Int64": pa.int64(),
+                "string": pa.string(), "boolean": pa.bool_()}
+_NULLABLE = {pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype(), pa.string(): pd.StringDtype()}
+
+
+def _data_start(buf: pa.Buffer) -> int:
+    """Début des données : après le BOM et une ligne `sep=;` éventuels."""
+    head = buf.slice(0, min(256, buf.size)).to_pybytes()
+    start = len(_BOM) if head.startswith(_BOM) else 0
+    if head[start:start + 4].lower() == b"sep=":
+        start = head.index(b"\n", start) + 1
+        start += len(_BOM) if head[start:].startswith(_BOM) else 0
+    return start
+
+
+def read_cleaned_csv(source: Union[str, bytes], columns: Optional[Iterable[str]] = None,
+                     exclude: Iterable[str] = ()) -> pd.DataFrame:
+    """CSV écrit par le cleaner (chemin local, mappé en mémoire, ou contenu brut) →
+    DataFrame aux types de `coerce_types`. Seules les colonnes de `columns` (toutes
+    par défaut) hors `exclude` sont converties."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        buf = pa.py_buffer(source)
+    else:
+        buf = pa.memory_map(str(source)).read_buffer()
+    buf = buf.slice(_data_start(buf))                          # vue, sans copie
+    first = buf.slice(0, min(64 * 1024, buf.size)).to_pybytes().split(b"\n", 1)[0].decode("utf-8").rstrip("\r")
+    names = next(csv.reader([first], delimiter=";"))
+    wanted = set(columns) if columns is not None else set(names)
+    keep = [c for c in names if c in wanted and c not in set(exclude)]
+    dtypes = {c: CSV_DTYPES[c] for c in keep if c in CSV_DTYPES}
+    try:
+        # Une annonce = une ligne physique (sanitize_strings) : lecture découpée en blocs parallèles
+        table = pacsv.read_csv(
+            pa.BufferReader(buf),
+            parse_options=pacsv.ParseOptions(delimiter=";"),
+            convert_options=pacsv.ConvertOptions(
+                column_types={c: _ARROW_TYPES[t] for c, t in dtypes.items()},
+                include_columns=keep, strings_can_be_null=True),
+        )
+        df = table.to_pandas(types_mapper=_NULLABLE.get)
+    except pa.ArrowInvalid:
+        # CSV d'une autre origine (retours ligne dans un champ...) : moteur C de pandas
+        df = pd.read_csv(io.BytesIO(buf.to_pybytes()), sep=";", encoding="utf-8", usecols=keep, dtype=dtypes)
+    return df.astype({c: t for c, t in dtypes.items() if str(df[c].dtype) != t})
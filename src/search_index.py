@@ -0,0 +1,158 @@
+# src/search_index.py
+"""
+Index de recherche plein texte du tableau de bord (adresse, titre, description),
+insensible aux accents et à la casse, construit une fois par jeu de données chargé.
+
+- textes normalisés par Arrow (minuscules, NFKD, marques diacritiques retirées),
+  découpés en mots ; chaque texte distinct n'est indexé qu'une fois ;
+- index inversé : vocabulaire trié → textes (par champ) → lignes ;
+- préfixe : recherche dichotomique dans le vocabulaire ; sous-chaîne : index des
+  3-grammes du vocabulaire, candidats vérifiés ("montant" → "menilmontant").
+
+Tous les mots de la requête doivent être trouvés (ET) ; le score favorise le mot
+exact, puis le préfixe, puis la sous-chaîne, et l'adresse, puis le titre :
+
+    idx = SearchIndex(df)
+    pos, score = idx.search("ménilmontant balcon")   # positions triées par pertinence
+"""
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from text_norm import fold, fold_str
+
+FIELD_WEIGHTS = {"address": 3, "title": 2, "description": 1}
+EXACT, PREFIX, SUBSTRING = 3, 2, 1       # score d'un mot selon la façon dont il correspond
+MIN_SUBSTRING = 3                        # en dessous : préfixe seulement
+CHUNK_DOCS    = 50_000                   # textes distincts tokenisés par lot (mémoire bornée)
+
+_SPLIT = r"[^a-z0-9]+"
+
+
+# ----------------- Normalisation -----------------
+def normalize_query(q: str) -> List[str]:
+    """Mots de la requête, normalisés comme les textes indexés (text_norm)."""
+    return [t for t in re.split(_SPLIT, fold_str(q)) if t]
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, n_keys: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Listes `values` groupées par `keys` : (bornes, valeurs triées par clé)."""
+    order = np.argsort(keys, kind="stable")
+    return np.searchsorted(keys[order], np.arange(n_keys + 1)), values[order]
+
+
+def _expand(bounds: np.ndarray, values: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Concaténation des listes de `keys` (sans boucle Python) et longueur de chacune."""
+    lens = bounds[keys + 1] - bounds[keys]
+    starts = np.repeat(bounds[keys] - np.cumsum(lens) + lens, lens)
+    return values[starts + np.arange(lens.sum())], lens
+
+
+def _tokenize(docs: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Mots distincts de chaque texte : (vocabulaire local trié, id de mot, id de texte)."""
+    words, word_ids, doc_ids = [], [], []
+    for lo in range(0, len(docs), CHUNK_DOCS):
+        tokens = pc.split_pattern_regex(fold(pa.array(docs.iloc[lo:lo + CHUNK_DOCS], pa.string())),
+                                        pattern=_SPLIT)
+        flat, parents = pc.list_flatten(tokens), pc.list_parent_indices(tokens)
+        keep = pc.not_equal(flat, "")
+        enc = pc.dictionary_encode(pc.filter(flat, keep))
+        words.append(np.asarray(enc.dictionary.to_pylist(), dtype=object))
+        word_ids.append(enc.indices.to_numpy(zero_copy_only=False).astype(np.int64))
+        doc_ids.append(pc.filter(parents, keep).to_numpy(zero_copy_only=False).astype(np.int64) + lo)
+    if not words:
+        return np.empty(0, dtype=object), np.empty(0, np.int64), np.empty(0, np.int64)
+    # Dictionnaires des lots → vocabulaire commun
+    offsets = np.cumsum([0] + [len(w) for w in words[:-1]])
+    vocab, inverse = np.unique(np.concatenate(words), return_inverse=True)
+    word_ids = inverse[np.concatenate([w + o for w, o in zip(word_ids, offsets)])]
+    doc_ids = np.concatenate(doc_ids)
+    # Un mot compte une fois par texte
+    pairs = np.sort(word_ids * (len(docs) + 1) + doc_ids)
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+    return vocab, pairs // (len(docs) + 1), pairs % (len(docs) + 1)
+
+
+class SearchIndex:
+    def __init__(self, df: pd.DataFrame, fields: Dict[str, int] = FIELD_WEIGHTS):
+        self.n = len(df)
+        fields = {f: w for f, w in fields.items() if f in df.columns}
+        per_field = {}
+        for f in fields:
+            codes, docs = pd.factorize(df[f].astype("string"), use_na_sentinel=True)
+            vocab, word_ids, doc_ids = _tokenize(pd.Series(docs, dtype="string"))
+            per_field[f] = (codes, len(docs), vocab, word_ids, doc_ids)
+
+        # Vocabulaire commun trié (préfixes par dichotomie) + 3-grammes → mots
+        all_words = [v for (_, _, v, _, _) in per_field.values()]
+        self.vocab = np.unique(np.concatenate(all_words)) if all_words else np.empty(0, dtype=object)
+        self._grams = self._trigram_index(self.vocab)
+
+        # Par champ : mot → textes, texte → lignes
+        self._fields = {}
+        for f, (codes, n_docs, vocab, word_ids, doc_ids) in per_field.items():
+            gw = np.searchsorted(self.vocab, vocab)[word_ids] if len(vocab) else word_ids
+            postings = _csr(gw, doc_ids, len(self.vocab))
+            valid = np.flatnonzero(codes >= 0)
+            rows = _csr(codes[valid], valid, n_docs)
+            self._fields[f] = (fields[f], postings, rows)
+
+    @staticmethod
+    def _trigram_index(vocab: np.ndarray) -> Dict[str, np.ndarray]:
+        grams: Dict[str, List[int]] = {}
+        for i, w in enumerate(vocab.tolist()):
+            for g in {w[k:k + 3] for k in range(len(w) - 2)}:
+                grams.setdefault(g, []).append(i)
+        return {g: np.array(ids, dtype=np.int64) for g, ids in grams.items()}
+
+    # ----------------- Requêtes -----------------
+    def _words(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Mots du vocabulaire qui correspondent à `term` et leur score (exact, préfixe, sous-chaîne)."""
+        lo = np.searchsorted(self.vocab, term, side="left")
+        hi = np.searchsorted(self.vocab, term + "\x7f", side="left")
+        ids = np.arange(lo, hi)
+        scores = np.full(len(ids), PREFIX)
+        if len(ids) and self.vocab[lo] == term:
+            scores[0] = EXACT
+        if len(term) >= MIN_SUBSTRING:
+            lists = sorted((self._grams.get(term[k:k + 3], np.empty(0, np.int64))
+                            for k in range(len(term) - 2)), key=len)
+            cand = lists[0]
+            for other in lists[1:]:
+                cand = np.intersect1d(cand, other, assume_unique=True)
+            cand = cand[(cand < lo) | (cand >= hi)]
+            cand = np.array([i for i in cand.tolist() if term in self.vocab[i]], dtype=np.int64)
+            ids = np.concatenate([ids, cand])
+            scores = np.concatenate([scores, np.full(len(cand), SUBSTRING)])
+        return ids, scores
+
+    def _term_scores(self, term: str) -> np.ndarray:
+        """Meilleur score de `term` pour chaque ligne (poids du champ × correspondance, 0 si absent)."""
+        ids, scores = self._words(term)
+        best = np.zeros(self.n, dtype=np.int16)
+        for weight, (bounds, docs), (doc_bounds, doc_rows) in self._fields.values():
+            # Textes d'abord (chaque texte distinct une fois), puis leurs lignes ; scores croissants
+            doc_best = np.zeros(len(doc_bounds) - 1, dtype=np.int16)
+            for cls in (SUBSTRING, PREFIX, EXACT):
+                doc_best[_expand(bounds, docs, ids[scores == cls])[0]] = cls
+            for cls in (SUBSTRING, PREFIX, EXACT):
+                r = _expand(doc_bounds, doc_rows, np.flatnonzero(doc_best == cls))[0]
+                best[r] = np.maximum(best[r], cls * weight)
+        return best
+
+    def search(self, q: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(positions, scores) des lignes contenant tous les mots de `q`, par score
+        décroissant puis position croissante. Requête vide : aucune ligne."""
+        total = None
+        for term in normalize_query(q):
+            s = self._term_scores(term)
+            total = s.astype(np.int32) if total is None else np.where((total > 0) & (s > 0), total + s, 0)
+        if total is None:
+            return np.empty(0, np.int64), np.empty(0, np.int32)
+        rows = np.flatnonzero(total)
+        order = np.argsort(-total[rows], kind="stable")
+        return rows[order], total[rows[order]]
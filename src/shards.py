@@ -0,0 +1,153 @@
+# src/shards.py
+"""
+Crawl shardé : une URL de recherche par shard (ex. un arrondissement), un pool de
+processus qui lancent chacun leur propre crawler, puis une fusion dédoublonnée par ID.
+
+    python src/shards.py                       # 20 arrondissements, quotas par défaut
+    python src/shards.py --urls urls.txt --workers 4 --max-new 20 --budget 1800
+
+La politesse par domaine reste globale : tous les workers réservent leurs créneaux
+de téléchargement dans une horloge partagée (SHARED_DELAY secondes entre deux
+requêtes réseau vers le site, tous shards confondus).
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.defer import deferred_to_future
+
+import spider
+from store import ItemStore
+
+# ----------------- Config -----------------
+SHARDS_DIR      = spider.STORE_DIR / "shards"   # un store par shard avant fusion
+SHARD_URL_TMPL  = "https://www.seloger.com/immobilier/achat/immo-paris-{arr}-75/"
+SHARD_MAX_NEW   = 10        # quota de NOUVELLES annonces par shard
+SHARD_MAX_PAGES = 10        # garde-fou de pagination par shard
+SHARED_DELAY    = 1.0       # secondes entre deux requêtes réseau, tous workers confondus
+WORKERS         = 4
+
+logger = logging.getLogger(__name__)
+
+# Horloge partagée (multiprocessing.Value) injectée dans chaque worker
+_next_slot = None
+
+
+def paris_search_urls() -> List[str]:
+    return [SHARD_URL_TMPL.format(arr="1er" if n == 1 else f"{n}eme") for n in range(1, 21)]
+
+
+class SharedDelayMiddleware:
+    """Downloader middleware : réserve un créneau dans l'horloge partagée avant chaque
+    téléchargement réseau. Placé après HttpCacheMiddleware, les réponses servies par
+    le cache ne consomment pas de créneau."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.getfloat("SHARED_DELAY", SHARED_DELAY))
+
+    async def process_request(self, request, spider=None):
+        if _next_slot is None:
+            return None
+        with _next_slot.get_lock():
+            now = time.time()
+            slot = max(now, _next_slot.value)
+            _next_slot.value = slot + self.delay
+        if slot > now:
+            from twisted.internet import reactor, task   # reactor installé par le CrawlerProcess du worker
+            await deferred_to_future(task.deferLater(reactor, slot - now, lambda: None))
+        return None
+
+
+def _init_worker(next_slot) -> None:
+    global _next_slot
+    _next_slot = next_slot
+
+
+def run_shard(shard: Dict) -> Dict:
+    """Exécute un crawler complet pour un shard (un processus neuf par shard :
+    le reactor Twisted n'est pas redémarrable)."""
+    settings = {
+        "DOWNLOADER_MIDDLEWARES": {SharedDelayMiddleware: 950},
+        "SHARED_DELAY": shard["delay"],
+    }
+    if shard.get("budget"):
+        settings["CLOSESPIDER_TIMEOUT"] = shard["budget"]
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(spider.SeLogerSelectorsTP)
+    process.crawl(crawler, search_url=shard["url"], max_new=shard["max_new"],
+                  max_pages=shard["max_pages"], store_dir=shard["store_dir"])
+    process.start()
+    return {"name": shard["name"], "new": crawler.spider.new_found,
+            "finish_reason": crawler.stats.get_value("finish_reason")}
+
+
+def merge_shards(main: ItemStore, shard_dirs: List[Path]) -> int:
+    """Ajoute au store principal les items des shards, dédoublonnés par ID
+    (contre l'historique et entre shards), puis supprime les stores de shard."""
+    known = main.id_index()
+    added = 0
+    for d in shard_dirs:
+        for rec in ItemStore(d).iter_records():
+            try:
+                id_val = int(rec.get("ID"))
+            except Exception:
+                continue
+            if id_val in known:
+                continue
+            main.append(rec)
+            known.add(id_val)
+            added += 1
+    main.close()
+    for d in shard_dirs:
+        shutil.rmtree(d, ignore_errors=True)
+    return added
+
+
+def run(urls: List[str], workers: int = WORKERS, max_new: int = SHARD_MAX_NEW,
+        max_pages: int = SHARD_MAX_PAGES, delay: float = SHARED_DELAY,
+        budget: Optional[int] = None) -> int:
+    main = spider.open_main_store(logger)   # migration éventuelle avant le fork
+    # Index trié une fois pour toutes avant le fork : les workers ne font que le lire
+    main.id_index(merge_tail=0)
+    shards = [
+        {"name": f"shard-{i:02d}", "url": u, "max_new": max_new, "max_pages": max_pages,
+         "delay": delay, "budget": budget, "store_dir": str(SHARDS_DIR / f"shard-{i:02d}")}
+        for i, u in enumerate(urls, start=1)
+    ]
+    next_slot = mp.Value("d", 0.0)
+    with mp.Pool(processes=min(workers, len(shards)), initializer=_init_worker,
+                 initargs=(next_slot,), maxtasksperchild=1) as pool:
+        for res in pool.imap_unordered(run_shard, shards):
+            print(f"• {res['name']} : {res['new']} nouvelles annonces ({res['finish_reason']})")
+    added = merge_shards(main, sorted(SHARDS_DIR.glob("shard-*")))
+    print(f"✔ Fusion : {added} annonces ajoutées dans {spider.STORE_DIR}")
+    return added
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Crawl shardé multi-processus")
+    ap.add_argument("--urls", type=Path, help="fichier texte : une URL de recherche par ligne")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--max-new", type=int, default=SHARD_MAX_NEW, help="quota de nouvelles annonces par shard")
+    ap.add_argument("--max-pages", type=int, default=SHARD_MAX_PAGES, help="pages de recherche max par shard")
+    ap.add_argument("--delay", type=float, default=SHARED_DELAY, help="délai global entre requêtes (s)")
+    ap.add_argument("--budget", type=int, default=None, help="durée max d'un shard (s)")
+    args = ap.parse_args()
+
+    urls = paris_search_urls()
+    if args.urls:
+        urls = [u.strip() for u in args.urls.read_text(encoding="utf-8").splitlines() if u.strip()]
+    run(urls, args.workers, args.max_new, args.max_pages, args.delay, args.budget)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,42 @@
-import re, json
+import re, json, time
+import asyncio
+from collections import deque
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import cached_property
+from time import perf_counter
 from urllib.parse import urljoin, urlparse
 from pathlib import Path
 import scrapy
 from scrapy.crawler import CrawlerProcess
 from scrapy.exceptions import CloseSpider
+from scrapy.http import HtmlResponse
+
+from archive import HtmlArchive
+from http_cache import RevisitPolicy
+from store import ItemStore
 
 # ----------------- Config -----------------
 SEARCH_URL  = "https://www.seloger.com/immobilier/achat/immo-paris-75/"
-OUTPUT_PATH = Path("data/raw_data.json")
+OUTPUT_PATH = Path("data/raw_data.json")   # ancien format (liste JSON), migré une fois vers STORE_DIR
+STORE_DIR   = Path("data/raw")             # segments JSON Lines + index des IDs
 MAX_NEW     = 10        # combien de NOUVELLES annonces (ID inédits) on veut
 MAX_PAGES   = 25       # garde-fou anti-boucle (facultatif)
 
+# Cache HTTP disque (.scrapy/httpcache) + requêtes conditionnelles ETag/Last-Modified
+HTTP_CACHE    = True
+REVISIT_SECS  = {"search": 0, "detail": 7 * 24 * 3600}   # search : toujours revalider ; détail : tous les 7 j
+REVISIT_KNOWN = None    # re-demander les fiches déjà connues (servies par le cache si < 7 j) pour suivre les prix ;
+                        # None : seulement si l'historique HISTORY_DB existe (sinon price_changes resterait vide)
+HISTORY_DB    = Path("data/history.sqlite")   # historique du cleaner (history.py)
+REPORT_DIR    = Path("data/reports")   # rapport JSON par run : source gagnante par champ + coût des replis
+JSONLD_ALERT  = 0.5     # avertir si moins de 50 % des fiches passent par le JSON-LD (mise en page changée ?)
+PARSE_WORKERS = 0       # >0 : extraction des fiches dans un pool de N processus (hors reactor)
+QUOTA_SCHEDULING = True   # ne lancer que (quota restant) fiches à la fois ; pagination seulement si nécessaire
+DETAIL_PRIORITY  = 10     # les fiches passent avant la pagination dans la file Scrapy
+ARCHIVE_HTML  = False   # archiver chaque fiche (data/archive) pour une ré-extraction hors ligne (reextract.py)
+
 # ----------------- Regex utilitaires (inchangées / abrégées) -----------------
 PARIS_ADDR_RE   = re.compile(r"[A-ZÀ-ÖØ-öø-ÿ][\w’'\- ]+,\s*Paris\s*\d+(?:er|e|ème)?\s*\(\d{5}\)")
 GENERIC_ADDR_RE = re.compile(r"[A-ZÀ-ÖØ-öø-ÿ][\w’'\- ]+,\s*[A-ZÀ-ÖØ-öø-ÿ][\w’'\- ]+\s*\(\d{5}\)")
@@ -26,6 +52,11 @@ DPE_NEAR_RE = re.compile(r"(?:DPE|classe\s+énergie|diagnostic de performance é
 GES_NEAR_RE = re.compile(r"(?:GES|gaz\s+à\s+effet\s+de\s+serre|gaz\s+a\s+effet\s+de\s+serre)[^A-G]{0,40}\b([A-G])\b", re.I)
 YEAR_RE   = re.compile(r"\b(1[0-9]{3}|20[0-9]{2})\b")
 
+def listing_id_from_url(url):
+    """ID numérique d'une annonce d'après son URL (…/235751515.htm), sinon None."""
+    try: return int(url.rsplit('/', 1)[-1].split('?', 1)[0].split('#', 1)[0].split('.', 1)[0])
+    except Exception: return None
+
 def to_float_fr(s):
     if s is None: return None
     if isinstance(s, (int, float)): return float(s)
@@ -54,24 +85,30 @@ def _pick_letter(txt):
     L = txt.replace("\u202f"," ").replace("\u00A0"," ").strip().upper()
     return L if L in "ABCDEFG" else None
 
-def extract_dpe_and_ges_letters(response):
+def extract_dpe_and_ges_letters(response, ctx=None):
+    ctx = ctx or PageContext(response)
+    trace = ctx.trace
     dpe, ges = None, None
-    scales = response.css("[data-testid='cdp-preview-scale']")
-    for sc in scales:
-        letter = _pick_letter(sc.css("[data-testid='cdp-preview-scale-highlighted']::text").get()) \
-              or _pick_letter(sc.css("[aria-hidden='false']::text").get())
-        if not letter: continue
-        label_txt = " ".join(sc.xpath("(preceding::h2|preceding::h3)[1]//text()").getall()).lower()
-        if any(k in label_txt for k in ["ges","gaz à effet de serre","gaz a effet de serre"]):
-            ges = ges or letter
-        elif any(k in label_txt for k in ["dpe","classe énergie","classe energie"]):
-            dpe = dpe or letter
+    with trace.step("dpe_ges.scale"):
+        scales = response.css("[data-testid='cdp-preview-scale']")
+        for sc in scales:
+            letter = _pick_letter(sc.css("[data-testid='cdp-preview-scale-highlighted']::text").get()) \
+                  or _pick_letter(sc.css("[aria-hidden='false']::text").get())
+            if not letter: continue
+            label_txt = " ".join(sc.xpath("(preceding::h2|preceding::h3)[1]//text()").getall()).lower()
+            if any(k in label_txt for k in ["ges","gaz à effet de serre","gaz a effet de serre"]):
+                ges = ges or letter
+            elif any(k in label_txt for k in ["dpe","classe énergie","classe energie"]):
+                dpe = dpe or letter
+    if dpe: trace.won("dpe_letter", "scale")
+    if ges: trace.won("ges_letter", "scale")
     if dpe is None or ges is None:
-        full = " ".join(response.css("body *::text").getall())
-        if dpe is None:
-            m = DPE_NEAR_RE.search(full);  dpe = m.group(1).upper() if m else dpe
-        if ges is None:
-            m = GES_NEAR_RE.search(full);  ges = m.group(1).upper() if m else ges
+        with trace.step("dpe_ges.text"):
+            found = ctx.text_fields("dpe", "ges")
+        if dpe is None and found["dpe"]: trace.won("dpe_letter", "text")
+        if ges is None and found["ges"]: trace.won("ges_letter", "text")
+        dpe = dpe or found["dpe"]
+        ges = ges or found["ges"]
     return dpe, ges
 
 def _to_year_value(s):
@@ -79,7 +116,7 @@ def _to_year_value(s):
     m = YEAR_RE.search(str(s));  y = int(m.group(1)) if m else None
     return y if y and 1000 <= y <= 2100 else None
 
-def extract_year_built(response, ld_obj=None):
+def _year_from_ld(ld_obj):
     if isinstance(ld_obj, dict):
         for k in ("dateBuilt","yearBuilt","constructionYear"):
             y = _to_year_value(ld_obj.get(k));  
@@ -95,123 +132,124 @@ def extract_year_built(response, ld_obj=None):
                         y = _to_year_value(val);  
                         if y: return y
                 except: pass
-    txt = response.css("[data-testid='cdp-energy-features.yearOfConstruction']::text").get()
-    y = _to_year_value(txt);  0
-    if y: return y
-    txt = response.xpath("//*[contains(normalize-space(.), 'Année de construction')]/following::span[1]/text()").get()
-    y = _to_year_value(txt);  0
-    if y: return y
-    scope = " ".join(response.css("[data-testid^='cdp-energy-features'] ::text").getall())
-    y = _to_year_value(scope);  0
-    if y: return y
-    full = " ".join(response.css("body *::text").getall())
-    return _to_year_value(full)
+    return None
 
-class SeLogerSelectorsTP(scrapy.Spider):
-    name = "raw_data.json"
-    allowed_domains = ["www.seloger.com","seloger.com"]
-    custom_settings = {
-        "ROBOTSTXT_OBEY": True,
-        "DOWNLOAD_DELAY": 1.0,
-        "CONCURRENT_REQUESTS": 1,
-        "RETRY_ENABLED": True,
-        "RETRY_TIMES": 1,
-        "USER_AGENT" : 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
-        #"USER_AGENT": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124 Safari/537.36",
-    }
+def extract_year_built(response, ld_obj=None, ctx=None):
+    ctx = ctx or PageContext(response)
+    # Chemins essayés dans l'ordre ; le premier qui donne une année gagne
+    paths = (
+        ("jsonld", lambda: _year_from_ld(ld_obj)),
+        ("css",    lambda: _to_year_value(response.css("[data-testid='cdp-energy-features.yearOfConstruction']::text").get())),
+        ("xpath",  lambda: _to_year_value(response.xpath("//*[contains(normalize-space(.), 'Année de construction')]/following::span[1]/text()").get())),
+        ("energy", lambda: _to_year_value(" ".join(response.css("[data-testid^='cdp-energy-features'] ::text").getall()))),
+        ("text",   lambda: ctx.text_fields("year_built")["year_built"]),
+    )
+    for path, fn in paths:
+        with ctx.trace.step(f"year_built.{path}"):
+            y = fn()
+        if y:
+            ctx.trace.won("year_built", path)
+            return y
+    return None
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Charger ce qui existe déjà
-        self.items = []
-        self.existing_ids = set()
-        if OUTPUT_PATH.exists() and OUTPUT_PATH.stat().st_size > 0:
-            try:
-                data = json.loads(OUTPUT_PATH.read_text(encoding="utf-8"))
-                if isinstance(data, list):
-                    self.items.extend(data)
-                    for it in data:
-                        try: self.existing_ids.add(int(it.get("ID")))
-                        except: pass
-                self.logger.info(f"{len(self.items)} items chargés ({len(self.existing_ids)} IDs connus).")
-            except Exception as e:
-                self.logger.warning(f"Lecture {OUTPUT_PATH} impossible: {e}")
+# ----------------- Contexte de page & passe texte combinée -----------------
+ITEM_FIELDS = ["title", "price_eur", "surface_m2", "rooms", "floor", "address", "postal_code",
+               "description", "dpe_letter", "ges_letter", "year_built", "property_type"]
 
-        # État du run
-        self.run_seen_ids = set(self.existing_ids)   # pour ignorer doublons intra-run
-        self.new_found    = 0
-        self.pages_seen   = 0
+def _first_group(rx):
+    def scan(full):
+        m = rx.search(full);  return m.group(1) if m else None
+    return scan
 
-    # Scrapy 2.13+
-    async def start(self):
-        yield scrapy.Request(SEARCH_URL, callback=self.parse_search, dont_filter=True)
+def _scan_price(full):
+    nums = [to_float_fr(m) for m in EURO_RE.findall(full)]
+    nums = [n for n in nums if n]
+    return max(nums) if nums else None
 
-    def parse_search(self, response):
-        if self.new_found >= MAX_NEW:
-            raise CloseSpider("quota_reached")
+def _scan_surface(full):
+    return to_float_fr(_first_group(SURF_RE)(full))
 
-        self.pages_seen += 1
-        if self.pages_seen > MAX_PAGES:
-            raise CloseSpider("max_pages_guard")
+def _scan_rooms(full):
+    m = ROOMS_RE.search(full) or ROOMS_TRE.search(full)
+    try: return int(m.group(1)) if m else None
+    except: return None
 
-        # Collecter des liens d'annonces
-        candidates = []
-        for href in response.css("a[href*='/annonces/']::attr(href)").getall():
-            url = urljoin(response.url, href.split('#')[0])
-            if "/annonces/achat/" in url and urlparse(url).netloc.endswith("seloger.com"):
-                clean = url.split("?")[0].rstrip("/")
-                candidates.append(clean)
+def _scan_floor(full):
+    if RDC_RE.search(full): return 0
+    m = FLOOR_ONE.search(full) or FLOOR_TWO.search(full)
+    return int(m.group(1)) if m else None
 
-        # Déclencher le parsing détail pour tous les candidats
-        for u in dict.fromkeys(candidates):  # dédupe simple en conservant l'ordre
-            # On ne connaît l'ID qu'après ouverture de la fiche → on tente
-            yield scrapy.Request(u, callback=self.parse_detail, dont_filter=True)
-
-        # Si on n’a pas encore le quota de nouveaux, continuer la pagination
-        if self.new_found < MAX_NEW:
-            next_url = (
-                response.css("a[rel='next']::attr(href)").get() or
-                response.css("a[aria-label*='Suivant' i]::attr(href)").get()
-            )
-            if next_url:
-                yield scrapy.Request(urljoin(response.url, next_url), callback=self.parse_search, dont_filter=True)
-            else:
-                # plus de pages → on laisse le spider se fermer naturellement
-                self.logger.info("Plus de pagination disponible.")
+def _scan_letter(rx):
+    def scan(full):
+        m = rx.search(full);  return m.group(1).upper() if m else None
+    return scan
 
-    def parse_detail(self, response):
-        # Identifier l'ID ; si échec, on ignore
-        try:
-            id_val = int(response.url.rsplit('/', 1)[-1].split('?', 1)[0].split('#', 1)[0].split('.', 1)[0])
-        except Exception:
-            self.logger.debug(f"ID introuvable pour {response.url}")
-            return
+def _scan_property_type(full):
+    page_text = full.lower()
+    if "appartement" in page_text: return "appartement"
+    if "maison" in page_text:      return "maison"
+    return None
 
-        # Déjà connu (dans le fichier ou déjà vu pendant ce run) → on saute
-        if id_val in self.run_seen_ids:
-            return
+# champ -> fonction de scan sur le texte complet de la page
+TEXT_SCANNERS = {
+    "price_eur":     _scan_price,
+    "surface_m2":    _scan_surface,
+    "rooms":         _scan_rooms,
+    "floor":         _scan_floor,
+    "dpe":           _scan_letter(DPE_NEAR_RE),
+    "ges":           _scan_letter(GES_NEAR_RE),
+    "year_built":    _to_year_value,
+    "property_type": _scan_property_type,
+}
 
-        # ---- À partir d’ici, c’est un NOUVEL ID → on extrait et ajoute ----
-        item = {
-            "url": response.url,
-            "ID" : id_val,
-            "title": None,
-            "price_eur": None,
-            "surface_m2": None,
-            "rooms": None,
-            "floor": None,
-            "address": None,
-            "postal_code": None,
-            "description": None,
-            "dpe_letter": None,
-            "ges_letter": None,
-            "year_built": None,
-            "property_type": None,
-        }
+def scan_text_fields(full, fields=None):
+    """Extrait en une passe tous les champs regex demandés depuis le texte de la page.
+
+    Chaque motif compilé n'est exécuté qu'une fois sur la même chaîne partagée ;
+    une alternance fusionnée s'est révélée plus lente (perte des optimisations de
+    préfixe littéral du moteur `re`) et changeait la règle « premier match gagnant ».
+    """
+    return {f: TEXT_SCANNERS[f](full) for f in (fields or TEXT_SCANNERS)}
+
+class ExtractionTrace:
+    """Pour une fiche : chemin qui a produit chaque champ (jsonld, meta, text, css…)
+    et temps cumulé par étape d'extraction (clé « champ.chemin »)."""
+
+    def __init__(self):
+        self.sources = {}
+        self.timings = {}
+
+    @contextmanager
+    def step(self, name):
+        t0 = perf_counter()
+        try: yield
+        finally: self.timings[name] = self.timings.get(name, 0.0) + perf_counter() - t0
+
+    def won(self, field, path):
+        self.sources.setdefault(field, path)
+
+    def claim(self, item, path):
+        """Attribue `path` aux champs de l'item nouvellement renseignés."""
+        for f in ITEM_FIELDS:
+            if item.get(f) is not None: self.won(f, path)
 
-        # 1) JSON-LD
+class PageContext:
+    """Vue d'une fiche partagée par tous les extracteurs : texte DOM, objets JSON-LD
+    et balises <meta> ne sont construits qu'une seule fois par réponse."""
+
+    def __init__(self, response, trace=None):
+        self.response = response
+        self.trace = trace if trace is not None else ExtractionTrace()
+        self._fields = {}
+
+    @cached_property
+    def text(self):
+        return " ".join(self.response.css("body *::text").getall())
+
+    @cached_property
+    def lds(self):
         lds = []
-        for raw in response.xpath("//script[@type='application/ld+json']/text()").getall():
+        for raw in self.response.xpath("//script[@type='application/ld+json']/text()").getall():
             try:
                 obj = json.loads(raw)
                 if isinstance(obj, dict) and "@graph" in obj:
@@ -219,7 +257,59 @@ class SeLogerSelectorsTP(scrapy.Spider):
                 else:
                     lds.append(obj)
             except: pass
-        ld = first_ld_listing(lds)
+        return lds
+
+    @cached_property
+    def ld(self):
+        return first_ld_listing(self.lds)
+
+    @cached_property
+    def metas(self):
+        # (attribut, valeur) -> content ; la première balise rencontrée gagne
+        metas = {}
+        for sel in self.response.xpath("//meta[@content]"):
+            attrs = sel.attrib
+            for key in ("property", "itemprop", "name"):
+                if key in attrs:
+                    metas.setdefault((key, attrs[key]), attrs["content"])
+        return metas
+
+    def meta(self, key, value):
+        return self.metas.get((key, value))
+
+    def text_fields(self, *fields):
+        """Champs regex du texte complet, calculés au plus une fois par page."""
+        todo = [f for f in fields if f not in self._fields]
+        if todo:
+            self._fields.update(scan_text_fields(self.text, todo))
+        return {f: self._fields[f] for f in fields}
+
+def extract_detail(response, id_val, trace=None):
+    """Extraction complète d'une fiche annonce → item (dict). Aucune dépendance à l'état du spider.
+    `trace` (ExtractionTrace) reçoit la source de chaque champ et le coût de chaque repli."""
+    item = {
+        "url": response.url,
+        "ID" : id_val,
+        "title": None,
+        "price_eur": None,
+        "surface_m2": None,
+        "rooms": None,
+        "floor": None,
+        "address": None,
+        "postal_code": None,
+        "description": None,
+        "dpe_letter": None,
+        "ges_letter": None,
+        "year_built": None,
+        "property_type": None,
+    }
+
+    ctx = PageContext(response, trace)
+    trace = ctx.trace
+
+    # 1) JSON-LD
+    with trace.step("jsonld"):
+        ld = ctx.ld
 
         if ld:
             item["title"] = ld.get("name") or ld.get("title")
@@ -245,79 +335,343 @@ class SeLogerSelectorsTP(scrapy.Spider):
                 ld_type = str(ld.get("@type", "")).lower()
                 if "apartment" in ld_type or "appartement" in ld_type: item["property_type"] = "appartement"
                 elif "house" in ld_type or "maison" in ld_type:        item["property_type"] = "maison"
+    trace.claim(item, "jsonld")
 
-        # 2) Fallbacks
-        if item["title"] is None:
-            item["title"] = response.css("meta[property='og:title']::attr(content)").get() \
-                         or response.css("h1::text").get() \
-                         or response.xpath("//h1//text()").get()
-        full = " ".join(response.css("body *::text").getall())
-        if item["price_eur"] is None:
+    # 2) Fallbacks
+    if item["title"] is None:
+        with trace.step("title.meta"):
+            item["title"] = ctx.meta("property", "og:title")
+        trace.claim(item, "meta")
+        if not item["title"]:
+            with trace.step("title.h1"):
+                item["title"] = response.css("h1::text").get() \
+                             or response.xpath("//h1//text()").get()
+            trace.claim(item, "h1")
+    meta_price = None
+    if item["price_eur"] is None:
+        with trace.step("price_eur.meta"):
             meta_price = (
-                response.css("meta[itemprop='price']::attr(content)").get() or
-                response.css("meta[property='product:price:amount']::attr(content)").get() or
-                response.css("meta[name='price']::attr(content)").get()
+                ctx.meta("itemprop", "price") or
+                ctx.meta("property", "product:price:amount") or
+                ctx.meta("name", "price")
             )
             if meta_price: item["price_eur"] = to_float_fr(meta_price)
-            else:
-                nums = [to_float_fr(m) for m in EURO_RE.findall(full)]
-                nums = [n for n in nums if n]
-                if nums: item["price_eur"] = max(nums)
-        if item["surface_m2"] is None:
-            m = SURF_RE.search(full);  item["surface_m2"] = to_float_fr(m.group(1)) if m else None
-        if item["rooms"] is None:
-            m = ROOMS_RE.search(full) or ROOMS_TRE.search(full)
-            if m:
-                try: item["rooms"] = int(m.group(1))
-                except: pass
-        if item["floor"] is None:
-            if RDC_RE.search(full): item["floor"] = 0
-            else:
-                m = FLOOR_ONE.search(full) or FLOOR_TWO.search(full)
-                if m: item["floor"] = int(m.group(1))
-        if item.get("address") is None:
+        trace.claim(item, "meta")
+
+    # Une seule passe regex sur le texte complet pour tous les champs encore manquants
+    wanted = [f for f in ("surface_m2", "rooms", "floor") if item[f] is None]
+    if item["price_eur"] is None and not meta_price: wanted.append("price_eur")
+    if not item.get("property_type"): wanted.append("property_type")
+    if wanted:
+        with trace.step("text.build"):
+            ctx.text
+        for f in wanted:
+            with trace.step(f"{f}.text"):
+                item[f] = ctx.text_fields(f)[f]
+        trace.claim(item, "text")
+
+    if item.get("address") is None:
+        with trace.step("address.css"):
+            spans = response.css("span::text")
             addr = response.css("span.css-1d82754::text").get() \
-                or response.css("span::text").re_first(PARIS_ADDR_RE) \
-                or response.css("span::text").re_first(GENERIC_ADDR_RE)
+                or spans.re_first(PARIS_ADDR_RE) \
+                or spans.re_first(GENERIC_ADDR_RE)
             item["address"] = clean_address(addr)
-        if item.get("address") and not item.get("postal_code"):
-            m = CP_RE.search(item["address"]);  item["postal_code"] = m.group(1) if m else None
-        if item["description"] is None:
+        trace.claim(item, "css")
+    if item.get("address") and not item.get("postal_code"):
+        m = CP_RE.search(item["address"]);  item["postal_code"] = m.group(1) if m else None
+        trace.claim(item, "address")
+    if item["description"] is None:
+        with trace.step("description.css"):
             item["description"] = response.css("div.css-z0zigl.DescriptionTexts::text").get()
-            if item["description"] is None:
+        trace.claim(item, "css")
+        if item["description"] is None:
+            with trace.step("description.paragraphs"):
                 paras = [p.strip() for p in response.css("p::text").getall()]
                 paras = [p for p in paras if len(p) > 80 and "Calculer un temps de trajet" not in p]
                 if paras: item["description"] = max(paras, key=len)
-        dpe, ges = extract_dpe_and_ges_letters(response)
-        item["dpe_letter"] = item["dpe_letter"] or dpe
-        item["ges_letter"] = item["ges_letter"] or ges
-        if item["year_built"] is None:
-            item["year_built"] = extract_year_built(response, ld_obj=ld)
-        if not item.get("property_type"):
-            page_text = full.lower()
-            if "appartement" in page_text: item["property_type"] = "appartement"
-            elif "maison" in page_text:     item["property_type"] = "maison"
-
-        # Ajout et comptage
-        self.items.append(item)
-        self.run_seen_ids.add(id_val)
+            trace.claim(item, "paragraphs")
+    dpe, ges = extract_dpe_and_ges_letters(response, ctx=ctx)
+    item["dpe_letter"] = item["dpe_letter"] or dpe
+    item["ges_letter"] = item["ges_letter"] or ges
+    if item["year_built"] is None:
+        item["year_built"] = extract_year_built(response, ld_obj=ld, ctx=ctx)
+    return item
+
+def extract_from_body(url, body, encoding, id_val):
+    """Variante pure (picklable) d'extract_detail pour un pool de processus :
+    reconstruit la réponse depuis le corps brut → (item, trace)."""
+    trace = ExtractionTrace()
+    response = HtmlResponse(url, body=body, encoding=encoding)
+    return extract_detail(response, id_val, trace), trace
+
+def open_main_store(logger):
+    """Store principal ; l'ancien raw_data.json y est migré une fois s'il est seul présent."""
+    store = ItemStore(STORE_DIR)
+    if not store.exists() and OUTPUT_PATH.exists() and OUTPUT_PATH.stat().st_size > 0:
+        try:
+            n = store.import_json(OUTPUT_PATH)
+            logger.info(f"{n} items migrés de {OUTPUT_PATH} vers {STORE_DIR}.")
+        except Exception as e:
+            logger.warning(f"Migration {OUTPUT_PATH} impossible: {e}")
+    return store
+
+class SeLogerSelectorsTP(scrapy.Spider):
+    name = "raw_data.json"
+    allowed_domains = ["www.seloger.com","seloger.com"]
+    custom_settings = {
+        "ROBOTSTXT_OBEY": True,
+        "DOWNLOAD_DELAY": 1.0,
+        "CONCURRENT_REQUESTS": 1,
+        "RETRY_ENABLED": True,
+        "RETRY_TIMES": 1,
+        "HTTPCACHE_ENABLED": HTTP_CACHE,
+        "HTTPCACHE_POLICY": RevisitPolicy,
+        "HTTPCACHE_STORAGE": "scrapy.extensions.httpcache.FilesystemCacheStorage",
+        "HTTPCACHE_DIR": "httpcache",
+        "HTTPCACHE_GZIP": True,
+        "HTTPCACHE_REVISIT": REVISIT_SECS,
+        "USER_AGENT" : 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+        #"USER_AGENT": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124 Safari/537.36",
+    }
+
+    def __init__(self, *args, search_url=SEARCH_URL, max_new=MAX_NEW, max_pages=MAX_PAGES,
+                 store_dir=None, archive=ARCHIVE_HTML, parse_workers=PARSE_WORKERS, revisit=REVISIT_KNOWN,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        # Paramètres surchargeables par shard (arguments -a de Scrapy ou shards.py)
+        self.search_url = search_url
+        self.max_new    = int(max_new)
+        self.max_pages  = int(max_pages)
+
+        # Seul l'index compact des IDs est chargé ; les items restent sur disque
+        main_store = open_main_store(self.logger)
+        # Relevé des annonces listées chaque jour (toujours dans le store principal, shards compris)
+        self.sightings = main_store
+        # Index persistant (tableau trié mappé en mémoire) ; sert aussi aux doublons intra-run
+        self.known = main_store.id_index()
+        # Un shard écrit dans son propre store (fusionné ensuite par shards.py)
+        self.store = ItemStore(store_dir) if store_dir else main_store
+        if store_dir:
+            for id_val in self.store.known_ids():
+                self.known.add(id_val)
+        self.logger.info(f"{len(self.known)} IDs connus ({self.store.root}).")
+
+        self.archive = HtmlArchive() if str(archive).lower() in ("1", "true", "yes") else None
+        # Fiches connues re-demandées : nouveaux prix pour l'historique (price_changes)
+        if revisit is None:
+            self.revisit_known = HISTORY_DB.exists()
+        else:
+            self.revisit_known = str(revisit).lower() in ("1", "true", "yes")
+
+        # Pool de processus pour l'extraction des fiches (0 = dans le thread du reactor)
+        self.pool = None
+        if int(parse_workers) > 0:
+            self.pool = ProcessPoolExecutor(int(parse_workers), mp_context=mp.get_context("spawn"))
+        self.detail_callback = self.parse_detail_pooled if self.pool else self.parse_detail
+
+        # État du run
+        self.requested_ids = set()   # IDs déjà demandés pendant ce run
+        self.backlog      = deque()  # fiches candidates pas encore demandées
+        self.in_flight    = 0        # fiches demandées (comptées dans le quota) non terminées
+        self.next_page    = None     # page de recherche suivante, demandée à la demande
+        self.new_found    = 0
+        self.pages_seen   = 0
+
+    # Scrapy 2.13+
+    async def start(self):
+        yield scrapy.Request(self.search_url, callback=self.parse_search, dont_filter=True,
+                             meta={"page_type": "search"})
+
+    def parse_search(self, response):
+        if self.new_found >= self.max_new:
+            raise CloseSpider("quota_reached")
+
+        self.pages_seen += 1
+        if self.pages_seen > self.max_pages:
+            raise CloseSpider("max_pages_guard")
+
+        # Collecter des liens d'annonces
+        candidates = []
+        for href in response.css("a[href*='/annonces/']::attr(href)").getall():
+            url = urljoin(response.url, href.split('#')[0])
+            if "/annonces/achat/" in url and urlparse(url).netloc.endswith("seloger.com"):
+                clean = url.split("?")[0].rstrip("/")
+                candidates.append(clean)
+
+        # Toutes les annonces listées sont encore en ligne aujourd'hui (last_seen de l'historique)
+        self.sightings.record_seen(i for i in map(listing_id_from_url, candidates) if i is not None)
+
+        # Déclencher le parsing détail pour les seuls candidats inconnus
+        stats = self.crawler.stats
+        for u in dict.fromkeys(candidates):  # dédupe simple en conservant l'ordre
+            id_val = listing_id_from_url(u)
+            if id_val is not None:
+                if id_val in self.requested_ids:
+                    continue
+                if id_val in self.known:
+                    if self.revisit_known:
+                        self.requested_ids.add(id_val)
+                        stats.inc_value("seloger/detail_revisit")
+                        yield scrapy.Request(u, callback=self.detail_callback, dont_filter=True, priority=-1,
+                                             meta={"page_type": "detail", "revisit": True})
+                    else:
+                        stats.inc_value("seloger/detail_skipped_known")   # fetch économisé
+                    continue
+                self.requested_ids.add(id_val)
+            # ID illisible dans l'URL → on tente, parse_detail tranchera
+            self.backlog.append(u)
+
+        # Pagination : page suivante mémorisée, demandée par _schedule selon le quota restant
+        next_url = (
+            response.css("a[rel='next']::attr(href)").get() or
+            response.css("a[aria-label*='Suivant' i]::attr(href)").get()
+        )
+        self.next_page = urljoin(response.url, next_url) if next_url else None
+        if not next_url:
+            # plus de pages → on laisse le spider se fermer naturellement
+            self.logger.info("Plus de pagination disponible.")
+        yield from self._schedule()
+
+    def _schedule(self):
+        """Émet les requêtes détail dans la limite du quota restant, puis la page de
+        recherche suivante seulement si les candidats en cours ne peuvent pas le remplir.
+        Sans QUOTA_SCHEDULING : toutes les fiches puis la page suivante, sans limite."""
+        remaining = self.max_new - self.new_found - self.in_flight
+        while self.backlog and (remaining > 0 or not QUOTA_SCHEDULING):
+            u = self.backlog.popleft()
+            self.in_flight += 1
+            remaining -= 1
+            yield scrapy.Request(u, callback=self.detail_callback, errback=self.detail_failed,
+                                 dont_filter=True, priority=DETAIL_PRIORITY,
+                                 meta={"page_type": "detail", "quota_slot": True})
+        if self.next_page and not self.backlog and (remaining > 0 or not QUOTA_SCHEDULING):
+            url, self.next_page = self.next_page, None
+            yield scrapy.Request(url, callback=self.parse_search, dont_filter=True,
+                                 meta={"page_type": "search"})
+
+    def _detail_done(self, response):
+        # Une fiche comptée dans le quota est terminée (nouvelle ou non) → on relance l'ordonnancement
+        if response.meta.get("quota_slot"):
+            self.in_flight -= 1
+            yield from self._schedule()
+
+    def detail_failed(self, failure):
+        self.logger.debug(f"Échec {failure.request.url} : {failure.value!r}")
+        yield from self._detail_done(failure.request)
+
+    def _detail_id(self, response):
+        """ID de la fiche si elle doit être extraite, sinon None."""
+        # Identifier l'ID ; si échec, on ignore
+        id_val = listing_id_from_url(response.url)
+        if id_val is None:
+            self.logger.debug(f"ID introuvable pour {response.url}")
+            return None
+
+        # Annonce connue revisitée (suivi des prix) : une copie servie par le cache = inchangée
+        revisit = response.meta.get("revisit", False)
+        if revisit and "cached" in response.flags:
+            self.crawler.stats.inc_value("seloger/revisit_unchanged")
+            return None
+
+        # Déjà connu (dans le store ou déjà vu pendant ce run, ex. après redirection) → on saute
+        if id_val in self.known and not revisit:
+            return None
+
+        if self.archive is not None:
+            self.archive.put(response.url, response.body, id_val, response.encoding)
+        return id_val
+
+    def parse_detail(self, response):
+        # finally : une extraction en échec libère aussi sa place dans le quota (l'erreur
+        # remonte ensuite à Scrapy, qui la journalise)
+        try:
+            id_val = self._detail_id(response)
+            if id_val is not None:
+                trace = ExtractionTrace()
+                item = extract_detail(response, id_val, trace)
+                self._keep_item(response, item, trace)
+        finally:
+            yield from self._detail_done(response)
+
+    async def parse_detail_pooled(self, response):
+        # Extraction CPU dans le pool de processus : le reactor continue les téléchargements
+        try:
+            id_val = self._detail_id(response)
+            if id_val is not None:
+                item, trace = await asyncio.wrap_future(
+                    self.pool.submit(extract_from_body, response.url, response.body, response.encoding, id_val))
+                self._keep_item(response, item, trace)
+        finally:
+            for request in self._detail_done(response):
+                yield request
+
+    def _keep_item(self, response, item, trace):
+        self.record_trace(trace)
+
+        if response.meta.get("revisit", False):
+            # Version à jour d'une annonce connue : ajoutée au store (la compaction garde la dernière)
+            self.store.append(item)
+            self.crawler.stats.inc_value("seloger/revisit_changed")
+            return
+
+        # Ajout (écrit immédiatement dans le segment courant) et comptage
+        self.store.append(item)
+        self.sightings.record_seen([item["ID"]])   # y compris si l'URL listée n'avait pas d'ID lisible
+        self.known.add(item["ID"])
         self.new_found += 1
 
         # Si on a atteint le quota, on arrête net le spider
-        if self.new_found >= MAX_NEW:
+        if self.new_found >= self.max_new:
             self.crawler.engine.close_spider(self, "quota_reached")
 
+    def record_trace(self, trace):
+        stats = self.crawler.stats
+        stats.inc_value("extract/pages")
+        if "jsonld" in trace.sources.values():
+            stats.inc_value("extract/jsonld_hit")
+        for f in ITEM_FIELDS:
+            stats.inc_value(f"extract/source/{f}/{trace.sources.get(f, 'missing')}")
+        for step, secs in trace.timings.items():
+            stats.inc_value(f"extract/ms/{step}", secs * 1e3, start=0.0)
+
+    def write_extraction_report(self, reason):
+        stats = self.crawler.stats.get_stats()
+        pages = stats.get("extract/pages", 0)
+        if not pages:
+            return
+        sources, timings = {}, {}
+        for k, v in stats.items():
+            if k.startswith("extract/source/"):
+                field, path = k[len("extract/source/"):].split("/", 1)
+                sources.setdefault(field, {})[path] = v
+            elif k.startswith("extract/ms/"):
+                timings[k[len("extract/ms/"):]] = {"total_ms": round(v, 3), "ms_per_page": round(v / pages, 4)}
+        jsonld_rate = stats.get("extract/jsonld_hit", 0) / pages
+        report = {
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "reason": reason,
+            "pages": pages,
+            "jsonld_rate": round(jsonld_rate, 4),
+            "sources": {f: sources.get(f, {}) for f in ITEM_FIELDS},
+            "timings": dict(sorted(timings.items(), key=lambda kv: -kv[1]["total_ms"])),
+        }
+        REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        path = REPORT_DIR / f"extraction_{time.strftime('%Y%m%d-%H%M%S')}_{self.store.root.name}.json"
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        self.logger.info(f"Rapport d'extraction écrit : {path}")
+        if pages >= 10 and jsonld_rate < JSONLD_ALERT:
+            self.logger.warning(f"JSON-LD trouvé sur {jsonld_rate:.0%} des fiches seulement : mise en page modifiée ?")
+
     def closed(self, reason):
-        # Fusion/écriture dédupliquée par ID
-        Path("data").mkdir(exist_ok=True)
-        unique = {}
-        for it in self.items:
-            try: unique[int(it.get("ID"))] = it
-            except: pass
-        data = list(unique.values())
-        with OUTPUT_PATH.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        self.logger.info(f"{len(data)} items écrits dans {OUTPUT_PATH} (fermeture: {reason})")
+        self.write_extraction_report(reason)
+        # Les items sont déjà sur disque : on ne fait que synchroniser le segment courant
+        self.store.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        self.logger.info(f"{self.new_found} items ajoutés dans {self.store.root} (fermeture: {reason})")
 
 if __name__ == "__main__":
     Path("data").mkdir(exist_ok=True)
@@ -0,0 +1,396 @@
+# src/store.py
+"""
+Stockage append-only des annonces brutes.
+
+Les items sont ajoutés au fil de l'eau dans des segments JSON Lines
+(`segment-00001.jsonl`, ...) ; un index compact des IDs (`ids.bin`, entiers
+64 bits) est la source de l'index des IDs connus (`IdIndex`) : un tableau trié
+(`ids.sorted`) mappé en mémoire, interrogé par recherche binaire. La compaction
+(dédoublonnage par ID, dernier gagnant) est une étape séparée :
+
+    python src/store.py compact [data/raw]
+
+Le spider y note aussi, jour par jour, les IDs listés dans les pages de recherche
+(`seen/AAAA-MM-JJ.ids`, connus ou non) : ce sont les annonces encore en ligne ce
+jour-là, que l'historique (history.py) compte comme vues.
+"""
+import json
+import os
+import re
+import shutil
+import sys
+from array import array
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+SEGMENT_GLOB  = "segment-*.jsonl"
+INDEX_NAME    = "ids.bin"
+SORTED_NAME   = "ids.sorted"       # en-tête int64 (octets de ids.bin couverts) + IDs uniques triés
+MERGE_TAIL    = 100_000            # au-delà, la queue non triée de ids.bin est refondue dans ids.sorted
+GEN_NAME      = "generation"       # incrémenté à chaque compaction (invalide les positions de lecture)
+SEGMENT_BYTES = 64 * 1024 * 1024   # rotation d'un segment au-delà de cette taille
+FSYNC_EVERY   = 50                 # fsync périodique (nombre d'items)
+SEEN_DIR      = "seen"             # IDs vus dans les pages de recherche, un fichier int64 par jour (AAAA-MM-JJ.ids)
+
+
+def _segment_name(n: int) -> str:
+    return f"segment-{n:05d}.jsonl"
+
+
+def _record_id(rec: Dict) -> Optional[int]:
+    try:
+        return int(rec.get("ID"))
+    except Exception:
+        return None
+
+
+def _salvage(line: str) -> Optional[Dict]:
+    """Ligne d'un ancien store où un item a été écrit à la suite d'une ligne tronquée
+    (`{"ID": 2, "a": "tru{"ID": 3}`) : l'item complet en fin de ligne, s'il y en a un."""
+    for m in re.finditer(r'\{"', line[1:]):
+        try:
+            obj = json.loads(line[m.start() + 1:])
+        except json.JSONDecodeError:
+            continue
+        return obj if isinstance(obj, dict) else None
+    return None
+
+
+def iter_segment(path: Path) -> Iterator[Dict]:
+    """Lit un segment ligne à ligne. Une dernière ligne tronquée (crash en cours
+    d'écriture) est ignorée ; une ligne tronquée suivie d'un item (ancien store
+    réouvert sans réparation) donne cet item ; toute autre ligne invalide lève ValueError."""
+    with path.open("r", encoding="utf-8") as f:
+        pending = None
+        for i, line in enumerate(f, start=1):
+            if pending is not None:
+                raise ValueError(f"{path.name} ligne {pending}: impossible de parser en JSON.")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                obj = _salvage(line)
+                if obj is None:
+                    pending = i
+                    continue
+            if isinstance(obj, dict):
+                yield obj
+
+
+class IdIndex:
+    """IDs connus : tableau trié mappé en mémoire + petite queue récente en set.
+
+    Seuls les IDs ajoutés à `ids.bin` depuis le dernier tri sont chargés en
+    Python ; le reste est consulté via `np.searchsorted` sur le mmap, ce qui
+    garde le démarrage et la mémoire indépendants de la taille de l'historique.
+    """
+
+    def __init__(self, root: Path, merge_tail: int = MERGE_TAIL):
+        self.root = Path(root)
+        src, dst = self.root / INDEX_NAME, self.root / SORTED_NAME
+        size = src.stat().st_size if src.exists() else 0
+        covered = 0
+        if dst.exists() and dst.stat().st_size >= 8:
+            covered = int(np.fromfile(dst, dtype="<i8", count=1)[0])
+        size -= size % 8                                   # écriture interrompue : mot partiel ignoré
+        tail = np.fromfile(src, dtype="<i8", count=(size - covered) // 8, offset=covered) \
+            if size > covered else np.empty(0, "<i8")
+        if covered > size or len(tail) > merge_tail:
+            self._rebuild(src, dst)
+            covered, tail = size, np.empty(0, "<i8")
+        n = (dst.stat().st_size - 8) // 8 if dst.exists() else 0
+        self._sorted = np.memmap(dst, dtype="<i8", mode="r", offset=8, shape=(n,)) if n else np.empty(0, "<i8")
+        if n and len(tail):                                # revisites : IDs déjà dans le tableau trié
+            i = np.minimum(np.searchsorted(self._sorted, tail), n - 1)
+            tail = tail[self._sorted[i] != tail]
+        self._recent = set(tail.tolist())
+
+    @staticmethod
+    def _rebuild(src: Path, dst: Path) -> None:
+        count = src.stat().st_size // 8 if src.exists() else 0
+        ids = np.fromfile(src, dtype="<i8", count=count) if count else np.empty(0, "<i8")
+        tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")   # plusieurs processus peuvent reconstruire
+        with tmp.open("wb") as f:
+            np.array([ids.nbytes], dtype="<i8").tofile(f)
+            np.unique(ids).astype("<i8").tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, dst)
+
+    def _in_sorted(self, id_val: int) -> bool:
+        i = int(np.searchsorted(self._sorted, id_val))
+        return i < len(self._sorted) and int(self._sorted[i]) == id_val
+
+    def __contains__(self, id_val: int) -> bool:
+        return id_val in self._recent or self._in_sorted(id_val)
+
+    def add(self, id_val: int) -> None:
+        # La queue ne garde que les IDs absents du tableau trié : len() sans double compte
+        if not self._in_sorted(id_val):
+            self._recent.add(id_val)
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+
+class ItemStore:
+    def __init__(self, root: Path, segment_bytes: int = SEGMENT_BYTES, fsync_every: int = FSYNC_EVERY):
+        self.root = Path(root)
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self._seg = None
+        self._idx = None
+        self._pending: List[int] = []    # IDs écrits dans ids.bin seulement après le fsync du segment
+        self._unsynced = 0
+
+    # ---------- Lecture ----------
+    def segments(self) -> List[Path]:
+        return sorted(self.root.glob(SEGMENT_GLOB))
+
+    def exists(self) -> bool:
+        return bool(self.segments())
+
+    def known_ids(self) -> array:
+        """IDs présents dans l'index sidecar (pas de lecture des segments)."""
+        ids = array("q")
+        path = self.root / INDEX_NAME
+        if path.exists():
+            data = path.read_bytes()
+            ids.frombytes(data[: len(data) - len(data) % ids.itemsize])
+        return ids
+
+    def id_index(self, merge_tail: int = MERGE_TAIL) -> IdIndex:
+        return IdIndex(self.root, merge_tail)
+
+    def iter_records(self) -> Iterator[Dict]:
+        for seg in self.segments():
+            yield from iter_segment(seg)
+
+    def iter_latest(self) -> Iterator[Dict]:
+        """Dernière version de chaque annonce (une revisite ajoute une version), dans l'ordre
+        du store comme après compact(). Deux lectures : la première ne garde que le rang de
+        la dernière version de chaque ID, pas les items."""
+        last: Dict[int, int] = {}
+        for i, rec in enumerate(self.iter_records()):
+            id_val = _record_id(rec)
+            if id_val is not None:
+                last[id_val] = i
+        for i, rec in enumerate(self.iter_records()):
+            id_val = _record_id(rec)
+            if id_val is None or last.get(id_val) == i:
+                yield rec
+
+    def generation(self) -> int:
+        path = self.root / GEN_NAME
+        return int(path.read_text().strip() or 0) if path.exists() else 0
+
+    def iter_records_from(self, offsets: Dict[str, int]) -> Iterator[Dict]:
+        """Lit seulement ce qui a été ajouté depuis `offsets` (segment → octets déjà lus).
+        `offsets` est mis à jour au fil de la lecture (lignes complètes uniquement)."""
+        names = set()
+        for seg in self.segments():
+            names.add(seg.name)
+            start = offsets.get(seg.name, 0)
+            if start > seg.stat().st_size:
+                start = 0
+            with seg.open("rb") as f:
+                f.seek(start)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break          # ligne en cours d'écriture : relue au prochain passage
+                    start += len(raw)
+                    offsets[seg.name] = start
+                    line = raw.strip()
+                    if not line:
+                        continue
+                    try:
+                        obj = json.loads(line)
+                    except json.JSONDecodeError:
+                        obj = _salvage(line.decode("utf-8"))
+                        if obj is None:
+                            raise ValueError(f"{seg.name} octet {start - len(raw)}: impossible de parser en JSON.")
+                    if isinstance(obj, dict):
+                        yield obj
+            offsets[seg.name] = start
+        for name in list(offsets):
+            if name not in names:
+                del offsets[name]
+
+    def seen_days(self) -> List[str]:
+        """Jours (AAAA-MM-JJ) pour lesquels des relevés de recherche existent."""
+        return sorted(p.stem for p in (self.root / SEEN_DIR).glob("*.ids"))
+
+    def seen_ids(self, day: str) -> np.ndarray:
+        """IDs uniques vus dans les pages de recherche le jour `day`."""
+        path = self.root / SEEN_DIR / f"{day}.ids"
+        if not path.exists():
+            return np.empty(0, dtype=np.int64)
+        data = path.read_bytes()
+        return np.unique(np.frombuffer(data[: len(data) - len(data) % 8], dtype=np.int64))
+
+    # ---------- Écriture ----------
+    def record_seen(self, ids: Iterable[int], day: Optional[str] = None) -> None:
+        """Ajoute des IDs au relevé du jour (toutes les annonces listées, connues ou non).
+        Un seul write en O_APPEND : les shards peuvent écrire dans le même fichier."""
+        data = array("q", ids).tobytes()
+        if not data:
+            return
+        path = self.root / SEEN_DIR / f"{day or date.today().isoformat()}.ids"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def _repair(self) -> None:
+        """Après un crash en cours d'écriture : dernier segment ramené à sa dernière fin
+        de ligne (la ligne tronquée est perdue, son ID n'a jamais été indexé) et
+        ids.bin à un nombre entier d'IDs."""
+        segs = self.segments()
+        if segs:
+            with segs[-1].open("rb+") as f:
+                size = f.seek(0, os.SEEK_END)
+                keep, block = size, 64 * 1024
+                while keep > 0:
+                    f.seek(max(0, keep - block))
+                    chunk = f.read(keep - max(0, keep - block))
+                    nl = chunk.rfind(b"\n")
+                    if nl >= 0:
+                        keep = max(0, keep - block) + nl + 1
+                        break
+                    keep = max(0, keep - block)
+                if keep < size:
+                    f.truncate(keep)
+        idx = self.root / INDEX_NAME
+        if idx.exists() and idx.stat().st_size % 8:
+            with idx.open("rb+") as f:
+                f.truncate(idx.stat().st_size - idx.stat().st_size % 8)
+
+    def _open(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._repair()
+        segs = self.segments()
+        n = int(segs[-1].stem.split("-")[-1]) if segs else 1
+        if segs and segs[-1].stat().st_size >= self.segment_bytes:
+            n += 1
+        self._seg = (self.root / _segment_name(n)).open("a", encoding="utf-8")
+        self._idx = (self.root / INDEX_NAME).open("ab")
+
+    def _rotate(self) -> None:
+        self._sync()
+        self._seg.close()
+        n = int(Path(self._seg.name).stem.split("-")[-1]) + 1
+        self._seg = (self.root / _segment_name(n)).open("a", encoding="utf-8")
+
+    def _sync(self) -> None:
+        # Segment d'abord : un ID de ids.bin a toujours sa ligne complète sur disque
+        self._seg.flush()
+        os.fsync(self._seg.fileno())
+        if self._pending:
+            self._idx.write(array("q", self._pending).tobytes())
+            self._pending = []
+        self._idx.flush()
+        os.fsync(self._idx.fileno())
+        self._unsynced = 0
+
+    def append(self, item: Dict) -> None:
+        if self._seg is None:
+            self._open()
+        elif self._seg.tell() >= self.segment_bytes:
+            self._rotate()
+        self._seg.write(json.dumps(item, ensure_ascii=False) + "\n")
+        id_val = _record_id(item)
+        if id_val is not None:
+            self._pending.append(id_val)
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self._sync()
+
+    def extend(self, items: Iterable[Dict]) -> int:
+        n = 0
+        for it in items:
+            self.append(it)
+            n += 1
+        return n
+
+    def close(self) -> None:
+        if self._seg is None:
+            return
+        self._sync()
+        self._seg.close()
+        self._idx.close()
+        self._seg = self._idx = None
+
+    # ---------- Maintenance ----------
+    def import_json(self, path: Path) -> int:
+        """Migration unique d'un ancien `raw_data.json` (liste JSON) vers le store."""
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if not isinstance(data, list):
+            raise ValueError("Le JSON n'est pas une liste d'objets.")
+        n = self.extend(it for it in data if isinstance(it, dict))
+        self.close()
+        return n
+
+    def compact(self) -> int:
+        """Réécrit le store dédoublonné par ID (dernier gagnant) et reconstruit l'index."""
+        self.close()
+        unique: Dict[int, Dict] = {}
+        for rec in self.iter_records():
+            id_val = _record_id(rec)
+            if id_val is not None:
+                unique.pop(id_val, None)
+                unique[id_val] = rec
+        old = self.segments()
+        shutil.rmtree(self.root / ".compact", ignore_errors=True)    # reste d'une compaction interrompue
+        tmp = ItemStore(self.root / ".compact", self.segment_bytes, self.fsync_every)
+        tmp.extend(unique.values())
+        tmp.close()
+        if not tmp.root.exists():                                  # aucun item avec un ID
+            for f in old + [self.root / INDEX_NAME, self.root / SORTED_NAME]:
+                f.unlink(missing_ok=True)
+            return 0
+        # Nouveaux fichiers en place d'abord, numérotés après les anciens : interrompue ici,
+        # la compaction laisse au pire des doublons (les versions récentes restent en dernier)
+        first = int(old[-1].stem.split("-")[-1]) + 1 if old else 1
+        for k, seg in enumerate(tmp.segments()):
+            os.replace(seg, self.root / _segment_name(first + k))
+        (self.root / SORTED_NAME).unlink(missing_ok=True)        # reconstruit à la prochaine ouverture
+        os.replace(tmp.root / INDEX_NAME, self.root / INDEX_NAME)
+        shutil.rmtree(tmp.root)
+        # Puis seulement les anciens segments
+        for f in old:
+            f.unlink()
+        (self.root / GEN_NAME).write_text(str(self.generation() + 1))
+        return len(unique)
+
+    def replace_with(self, new_root: Path) -> None:
+        """Remplace ce store par celui de `new_root` (store reconstruit, ex. reextract.py).
+        Le nouveau store prend la génération suivante (les positions de lecture du cleaner
+        ne valent plus) et reprend les relevés `seen/` de l'ancien."""
+        self.close()
+        new_root = Path(new_root)
+        if (self.root / SEEN_DIR).exists():
+            shutil.rmtree(new_root / SEEN_DIR, ignore_errors=True)
+            os.replace(self.root / SEEN_DIR, new_root / SEEN_DIR)
+        (new_root / GEN_NAME).write_text(str(self.generation() + 1))
+        old = self.root.with_name(self.root.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if self.root.exists():
+            os.replace(self.root, old)
+        os.replace(new_root, self.root)
+        shutil.rmtree(old, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] != "compact":
+        raise SystemExit("usage : python src/store.py compact [dossier]")
+    root = Path(args[1]) if len(args) > 1 else Path("data/raw")
+    n = ItemStore(root).compact()
+    print(f"✔ Store compacté : {root} ({n} annonces)")
@@ -0,0 +1,21 @@
+# src/text_norm.py
+"""
+Normalisation des textes partagée par la recherche du tableau de bord (search_index.py)
+et le géocodage (geocode.py) : minuscules, décomposition NFKD, marques diacritiques
+retirées ("Ménilmontant" → "menilmontant").
+"""
+import unicodedata
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def fold(texts: pa.Array) -> pa.Array:
+    """Minuscules sans accents, en Arrow (valeurs nulles conservées)."""
+    texts = pc.utf8_normalize(pc.utf8_lower(texts), form="NFKD")
+    return pc.replace_substring_regex(texts, pattern=r"[^\x00-\x7f]", replacement="")
+
+
+def fold_str(text: str) -> str:
+    """Même règle que fold, pour une seule chaîne (requête de recherche)."""
+    return unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
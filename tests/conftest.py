@@ -0,0 +1,6 @@
+# tests/conftest.py
+# Les modules de src/ sont des scripts à plat (import cleaner, import store...)
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,50 @@
+# tests/test_aggregates.py
+import numpy as np
+import pandas as pd
+
+from aggregates import merge, summarize
+
+
+def _listings(rows):
+    return pd.DataFrame(rows, columns=["postal_code", "property_type", "dpe_letter", "rooms",
+                                       "price_eur", "price_per_m2", "outlier"])
+
+
+BASE = _listings([
+    ("75011", "appartement", "D", 2, 420_000.0, 10_500.0, False),
+    ("75011", "appartement", "D", 2, 380_000.0, 9_500.0, False),
+    ("75020", "maison", None, 5, 1_450_000.0, 12_083.0, False),
+    ("75014", "appartement", "C", None, None, None, False),
+])
+# Nouveau groupe, groupe existant, clé manquante et annonce aberrante (comptée dans n seulement)
+DELTA = _listings([
+    ("75011", "appartement", "D", 2, 399_000.0, 9_975.0, False),
+    ("75018", "appartement", "F", 1, 189_000.0, 10_500.0, False),
+    ("75020", "maison", None, 5, 1.0, 0.01, True),
+])
+
+
+def _sorted(df):
+    return df.sort_values(list(df.columns[:4]) + [c for c in ("metric", "bin") if c in df.columns],
+                          na_position="last").reset_index(drop=True)
+
+
+def test_merge_then_subtract_delta_restores_summary():
+    base, delta = summarize(BASE), summarize(DELTA)
+    merged = merge(base, delta)
+    back = merge(merged, delta, sign=-1)
+    for got, want in zip(back, base):
+        pd.testing.assert_frame_equal(_sorted(got), _sorted(want), check_dtype=False)
+
+
+def test_merged_counts_and_sums_match_full_summary():
+    merged = merge(summarize(BASE), summarize(DELTA))
+    full = summarize(pd.concat([BASE, DELTA], ignore_index=True))
+    stats = merged[0]
+    assert stats["n"].sum() == len(BASE) + len(DELTA)
+    assert stats["price_eur_n"].sum() == 5                  # sans prix ni aberrante
+    assert np.isclose(stats["price_eur_sum"].sum(), BASE["price_eur"].sum() + 399_000 + 189_000)
+    assert (merged[1].groupby("metric")["count"].sum() == stats[["price_eur_n", "price_per_m2_n"]].sum()
+            .rename(lambda c: c[:-2])).all()
+    for got, want in zip(merged, full):
+        pd.testing.assert_frame_equal(_sorted(got), _sorted(want), check_dtype=False)
@@ -0,0 +1,10 @@
+# tests/test_archive.py
+from archive import HtmlArchive
+
+
+def test_manifest_entry_on_disk_before_close(tmp_path):
+    arch = HtmlArchive(tmp_path)
+    digest = arch.put("https://www.seloger.com/annonces/achat/1.htm", b"<html>1</html>", 1)
+    # Sans close() (crash du crawl) : l'entrée est déjà lisible
+    assert [e["sha256"] for e in HtmlArchive(tmp_path).entries()] == [digest]
+    assert HtmlArchive(tmp_path).get(digest) == b"<html>1</html>"
@@ -0,0 +1,81 @@
+# tests/test_cleaner.py
+import re
+
+import numpy as np
+import pandas as pd
+
+from cleaner import (add_price_per_m2, apply_outliers, clean_streaming, flag_outliers, read_json_records,
+                     sanitize_strings)
+from store import ItemStore
+
+
+def test_flag_outliers_single_flagged_row():
+    df = add_price_per_m2(pd.DataFrame({"price_eur": [1.0], "surface_m2": [50.0]}))
+    reason = flag_outliers(df)
+    assert reason.dtype == "string"
+    assert reason.tolist() == ["price_eur<min,price_per_m2<min"]
+
+
+def test_flag_outliers_single_clean_row():
+    df = add_price_per_m2(pd.DataFrame({"price_eur": [400_000.0], "surface_m2": [40.0]}))
+    assert flag_outliers(df).isna().all()
+
+
+def test_apply_outliers_flag_and_drop():
+    df = add_price_per_m2(pd.DataFrame({"price_eur": [1.0, 400_000.0], "surface_m2": [50.0, 40.0]}))
+    flagged = apply_outliers(df.copy(), "flag")
+    assert flagged["outlier"].tolist() == [True, False]
+    assert len(apply_outliers(df.copy(), "drop")) == 1
+
+
+def _revisited_store(root):
+    """Store où l'annonce 1 a été revisitée : deux versions, la seconde avec un nouveau prix."""
+    store = ItemStore(root)
+    store.extend([{"ID": 1, "price_eur": 300_000}, {"ID": 2, "price_eur": 500_000},
+                  {"ID": 1, "price_eur": 280_000}])
+    store.close()
+    return root
+
+
+def test_full_clean_keeps_latest_version_per_id(tmp_path):
+    records = read_json_records(_revisited_store(tmp_path / "raw"))
+    assert [(r["ID"], r["price_eur"]) for r in records] == [(2, 500_000), (1, 280_000)]
+
+
+def test_streaming_clean_keeps_latest_version_per_id(tmp_path):
+    raw = _revisited_store(tmp_path / "raw")
+    res = clean_streaming(raw, tmp_path / "cleaned.csv", tmp_path / "parquet", chunk_rows=1, outliers="off")
+    out = pd.read_csv(tmp_path / "cleaned.csv", sep=";", encoding="utf-8-sig")
+    assert res["rows"] == 2
+    assert out.set_index("ID")["price_eur"].to_dict() == {2: 500_000, 1: 280_000}
+
+
+def _sanitize_map(df, sep=";"):
+    """Ancienne version cellule par cellule (référence, cf. bench/bench_sanitize.py)."""
+    def clean(x):
+        if pd.isna(x):
+            return x
+        s = str(x)
+        s = s.replace("\r\n", " ").replace("\n", " ").replace("\r", " ").replace("\t", " ")
+        s = re.sub(r"\s+", " ", s).strip()
+        return s.replace(sep, ",") if sep in s else s
+
+    for c in df.select_dtypes(include=["string", "object"]).columns:
+        df[c] = df[c].map(clean)
+    return df
+
+
+def test_sanitize_strings_matches_cell_by_cell_version():
+    df = pd.DataFrame({
+        "title": pd.array(["Bel\r\nappartement\xa0 T3 ", None, "  prix ;  négociable\t", "\u202fcalme\x0b"],
+                          dtype="string"),
+        "address": pd.array(["Paris\n14ème ;(75014)", "Paris 11ème (75011)", pd.NA, ""], dtype="string"),
+        "floor_raw": pd.Series([" 3 ", 2, "RDC\r\n", np.nan], dtype=object),
+        "empty": pd.Series([None] * 4, dtype=object),
+        "surface_m2": [40.0, 55.5, np.nan, 12.0],
+    })
+    out = sanitize_strings(df.copy())
+    pd.testing.assert_frame_equal(out, _sanitize_map(df.copy()))
+    assert out["title"].tolist()[::2] == ["Bel appartement T3", "prix , négociable"]
+    assert out["address"][0] == "Paris 14ème ,(75014)" and out["address"].isna()[2]
+    assert out["floor_raw"].tolist()[:3] == ["3", "2", "RDC"]
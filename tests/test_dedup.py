@@ -0,0 +1,50 @@
+# tests/test_dedup.py
+import pandas as pd
+
+from dedup import near_duplicates
+
+DESC = ("Au cœur du quartier Oberkampf, bel appartement traversant de deux pièces au troisième étage "
+        "d'un immeuble ancien bien entretenu : entrée, séjour lumineux exposé sud avec parquet "
+        "d'origine et moulures, cuisine équipée séparée, chambre sur cour calme, salle d'eau avec "
+        "fenêtre, WC indépendants. Cave. Proche métro Parmentier et commerces, idéal premier achat.")
+OTHER = ("Dans une résidence récente avec gardien, studio optimisé vendu meublé avec balcon filant, "
+         "coin nuit, kitchenette ouverte et salle de bains ; charges modérées, chauffage collectif, "
+         "parking possible en sus, à deux pas du canal Saint-Martin et de la place de la République.")
+
+
+def _listing(id_val, postal_code, title, description, surface, rooms, price):
+    return {"ID": str(id_val), "postal_code": postal_code, "title": title, "description": description,
+            "surface_m2": surface, "rooms": rooms, "price_eur": price}
+
+
+LISTINGS = pd.DataFrame([
+    _listing(1, "75011", "Appartement 2 pièces 45 m²", DESC, 45.0, 2, 420_000.0),
+    # Même bien republié : accents, ponctuation et un mot changés, prix baissé, pièces manquantes
+    _listing(2, "75011", "APPARTEMENT 2 PIECES 45 M2",
+             DESC.replace("cœur", "coeur").replace("éta", "eta").replace(" : ", ", ").replace("idéal", "parfait"),
+             45.5, None, 399_000.0),
+    # Même code postal, autre bien aux mêmes surface et prix
+    _listing(3, "75011", "Appartement 2 pièces 45 m²", OTHER, 45.0, 2, 420_000.0),
+    # Même texte (annonce modèle d'un programme) mais autre surface
+    _listing(4, "75011", "Appartement 2 pièces 45 m²", DESC, 62.0, 2, 420_000.0),
+    # Même texte dans un autre code postal
+    _listing(5, "75020", "Appartement 2 pièces 45 m²", DESC, 45.0, 2, 420_000.0),
+])
+
+
+def test_republished_listing_is_clustered_with_canonical():
+    dups = near_duplicates(LISTINGS).set_index("ID")
+    assert dups.loc["2", "dup_cluster"] == "1" and not dups.loc["2", "is_canonical"]
+    assert dups.loc["1", "is_canonical"]                      # la plus complète
+
+
+def test_distinct_listings_stay_apart():
+    dups = near_duplicates(LISTINGS).set_index("ID")
+    for id_val in ("3", "4", "5"):
+        assert dups.loc[id_val, "dup_cluster"] == id_val and dups.loc[id_val, "is_canonical"]
+    assert (dups["dup_cluster"] == "1").sum() == 2
+
+
+def test_empty_texts_are_never_duplicates():
+    blank = LISTINGS.assign(title=None, description=None)
+    assert near_duplicates(blank)["is_canonical"].all()
@@ -0,0 +1,192 @@
+# tests/test_extract.py
+# Extraction des fiches par PageContext (texte, JSON-LD et <meta> construits une fois)
+# comparée à l'extraction d'avant, qui relisait la page pour chaque repli
+import json
+from pathlib import Path
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+
+from spider import (CP_RE, DPE_NEAR_RE, EURO_RE, FLOOR_ONE, FLOOR_TWO, GENERIC_ADDR_RE, GES_NEAR_RE,
+                    PARIS_ADDR_RE, RDC_RE, ROOMS_RE, ROOMS_TRE, SURF_RE, _pick_letter, _to_year_value,
+                    clean_address, extract_detail, first_ld_listing, to_float_fr)
+
+CORPUS = Path(__file__).resolve().parents[1] / "bench" / "corpus" / "detail"
+
+
+# ----------------- Extraction d'avant PageContext (référence figée) -----------------
+def legacy_dpe_ges(response):
+    dpe, ges = None, None
+    for sc in response.css("[data-testid='cdp-preview-scale']"):
+        letter = _pick_letter(sc.css("[data-testid='cdp-preview-scale-highlighted']::text").get()) \
+              or _pick_letter(sc.css("[aria-hidden='false']::text").get())
+        if not letter: continue
+        label_txt = " ".join(sc.xpath("(preceding::h2|preceding::h3)[1]//text()").getall()).lower()
+        if any(k in label_txt for k in ["ges","gaz à effet de serre","gaz a effet de serre"]):
+            ges = ges or letter
+        elif any(k in label_txt for k in ["dpe","classe énergie","classe energie"]):
+            dpe = dpe or letter
+    if dpe is None or ges is None:
+        full = " ".join(response.css("body *::text").getall())
+        if dpe is None:
+            m = DPE_NEAR_RE.search(full);  dpe = m.group(1).upper() if m else dpe
+        if ges is None:
+            m = GES_NEAR_RE.search(full);  ges = m.group(1).upper() if m else ges
+    return dpe, ges
+
+
+def legacy_year_built(response, ld_obj=None):
+    if isinstance(ld_obj, dict):
+        for k in ("dateBuilt","yearBuilt","constructionYear"):
+            y = _to_year_value(ld_obj.get(k))
+            if y: return y
+        ap = ld_obj.get("additionalProperty")
+        if isinstance(ap, dict): ap = [ap]
+        if isinstance(ap, list):
+            for p in ap:
+                try:
+                    name = (p.get("name") or p.get("propertyID") or "").lower()
+                    val  = p.get("value") or p.get("valueReference")
+                    if any(w in name for w in ("construction","année","annee","year")):
+                        y = _to_year_value(val)
+                        if y: return y
+                except: pass
+    y = _to_year_value(response.css("[data-testid='cdp-energy-features.yearOfConstruction']::text").get())
+    if y: return y
+    y = _to_year_value(response.xpath(
+        "//*[contains(normalize-space(.), 'Année de construction')]/following::span[1]/text()").get())
+    if y: return y
+    y = _to_year_value(" ".join(response.css("[data-testid^='cdp-energy-features'] ::text").getall()))
+    if y: return y
+    return _to_year_value(" ".join(response.css("body *::text").getall()))
+
+
+def legacy_extract(response, id_val):
+    item = {"url": response.url, "ID": id_val, "title": None, "price_eur": None, "surface_m2": None,
+            "rooms": None, "floor": None, "address": None, "postal_code": None, "description": None,
+            "dpe_letter": None, "ges_letter": None, "year_built": None, "property_type": None}
+
+    lds = []
+    for raw in response.xpath("//script[@type='application/ld+json']/text()").getall():
+        try:
+            obj = json.loads(raw)
+            if isinstance(obj, dict) and "@graph" in obj:
+                lds.extend(obj["@graph"])
+            else:
+                lds.append(obj)
+        except: pass
+    ld = first_ld_listing(lds)
+
+    if ld:
+        item["title"] = ld.get("name") or ld.get("title")
+        offers = ld.get("offers")
+        if isinstance(offers, list) and offers: offers = offers[0]
+        if isinstance(offers, dict): item["price_eur"] = to_float_fr(offers.get("price"))
+        floorSize = ld.get("floorSize")
+        if isinstance(floorSize, dict): item["surface_m2"] = to_float_fr(floorSize.get("value"))
+        rooms = ld.get("numberOfRooms") or ld.get("numberOfRoomsTotal")
+        if isinstance(rooms, (int,float,str)):
+            try: item["rooms"] = int(float(rooms))
+            except: pass
+        addr = ld.get("address") or {}
+        if isinstance(addr, dict):
+            parts = [addr.get("streetAddress"), addr.get("postalCode"), addr.get("addressLocality")]
+            item["address"] = clean_address(", ".join([p for p in parts if p]))
+            m = CP_RE.search(addr.get("postalCode") or "");  item["postal_code"] = m.group(1) if m else None
+        item["floor"] = ld.get("floorLevel") or ld.get("floor")
+        item["description"] = ld.get("description")
+        if "/appartement/" in response.url.lower(): item["property_type"] = "appartement"
+        elif "/maison/" in response.url.lower():   item["property_type"] = "maison"
+        if not item.get("property_type"):
+            ld_type = str(ld.get("@type", "")).lower()
+            if "apartment" in ld_type or "appartement" in ld_type: item["property_type"] = "appartement"
+            elif "house" in ld_type or "maison" in ld_type:        item["property_type"] = "maison"
+
+    if item["title"] is None:
+        item["title"] = response.css("meta[property='og:title']::attr(content)").get() \
+                     or response.css("h1::text").get() \
+                     or response.xpath("//h1//text()").get()
+    full = " ".join(response.css("body *::text").getall())
+    if item["price_eur"] is None:
+        meta_price = (
+            response.css("meta[itemprop='price']::attr(content)").get() or
+            response.css("meta[property='product:price:amount']::attr(content)").get() or
+            response.css("meta[name='price']::attr(content)").get()
+        )
+        if meta_price: item["price_eur"] = to_float_fr(meta_price)
+        else:
+            nums = [n for n in (to_float_fr(m) for m in EURO_RE.findall(full)) if n]
+            if nums: item["price_eur"] = max(nums)
+    if item["surface_m2"] is None:
+        m = SURF_RE.search(full);  item["surface_m2"] = to_float_fr(m.group(1)) if m else None
+    if item["rooms"] is None:
+        m = ROOMS_RE.search(full) or ROOMS_TRE.search(full)
+        if m:
+            try: item["rooms"] = int(m.group(1))
+            except: pass
+    if item["floor"] is None:
+        if RDC_RE.search(full): item["floor"] = 0
+        else:
+            m = FLOOR_ONE.search(full) or FLOOR_TWO.search(full)
+            if m: item["floor"] = int(m.group(1))
+    if item.get("address") is None:
+        addr = response.css("span.css-1d82754::text").get() \
+            or response.css("span::text").re_first(PARIS_ADDR_RE) \
+            or response.css("span::text").re_first(GENERIC_ADDR_RE)
+        item["address"] = clean_address(addr)
+    if item.get("address") and not item.get("postal_code"):
+        m = CP_RE.search(item["address"]);  item["postal_code"] = m.group(1) if m else None
+    if item["description"] is None:
+        item["description"] = response.css("div.css-z0zigl.DescriptionTexts::text").get()
+        if item["description"] is None:
+            paras = [p.strip() for p in response.css("p::text").getall()]
+            paras = [p for p in paras if len(p) > 80 and "Calculer un temps de trajet" not in p]
+            if paras: item["description"] = max(paras, key=len)
+    dpe, ges = legacy_dpe_ges(response)
+    item["dpe_letter"] = item["dpe_letter"] or dpe
+    item["ges_letter"] = item["ges_letter"] or ges
+    if item["year_built"] is None:
+        item["year_built"] = legacy_year_built(response, ld_obj=ld)
+    if not item.get("property_type"):
+        page_text = full.lower()
+        if "appartement" in page_text: item["property_type"] = "appartement"
+        elif "maison" in page_text:     item["property_type"] = "maison"
+    return item
+
+
+# ----------------- Pages -----------------
+# En plus du corpus : @graph, échelles DPE/GES, rez-de-chaussée, T3, prix en <meta name>
+EXTRA = {
+    "https://www.seloger.com/annonces/achat/appartement/paris-18eme-75/101.htm": """
+<html><head><script type="application/ld+json">{"@graph": [{"@type": "BreadcrumbList"},
+  {"@type": "Apartment", "name": "Studio rez-de-chaussée", "address": {"streetAddress": "Rue Myrha",
+   "postalCode": "75018", "addressLocality": "Paris"},
+   "additionalProperty": [{"name": "Année de construction", "value": "1910"}]}]}</script></head>
+<body><h2>Classe énergie (DPE)</h2><div data-testid="cdp-preview-scale"><span>A</span>
+<span data-testid="cdp-preview-scale-highlighted">F</span></div>
+<h3>Gaz à effet de serre</h3><div data-testid="cdp-preview-scale"><span aria-hidden="false">d</span></div>
+<p>Studio de 18 m2 en rez-de-chaussée sur cour, vendu 189 000 € ; idéal investissement locatif.</p></body></html>""",
+    "https://www.seloger.com/annonces/achat/bien/paris-15eme-75/102.htm": """
+<html><head><meta property="og:title" content="T3 lumineux"><meta name="price" content="612 500">
+</head><body><h1>Ignoré</h1><span>Rue de Vaugirard, Paris 15e (75015)</span>
+<div data-testid="cdp-energy-features.yearOfConstruction">Construit en 1972</div>
+<p>Bel appartement T3 de 64,5 m² au 4e étage avec ascenseur, double séjour, deux chambres, proche métro.</p>
+</body></html>""",
+}
+
+
+def _pages():
+    for html in sorted(CORPUS.glob("*.html")):
+        url = json.loads(html.with_suffix(".json").read_text(encoding="utf-8"))["url"]
+        yield pytest.param(url, html.read_bytes(), id=html.stem)
+    for url, body in EXTRA.items():
+        yield pytest.param(url, body.encode("utf-8"), id=url.rsplit("/", 1)[-1])
+
+
+@pytest.mark.parametrize("url, body", list(_pages()))
+def test_page_context_extraction_matches_legacy(url, body):
+    response = HtmlResponse(url, body=body, encoding="utf-8", request=Request(url))
+    id_val = int(url.rsplit("/", 1)[-1].split(".")[0])
+    item = extract_detail(response, id_val)
+    assert item == legacy_extract(response, id_val)
+    assert sum(v is not None for v in item.values()) >= 10     # la page exerce bien les extracteurs
@@ -0,0 +1,82 @@
+# tests/test_filter_index.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterIndex
+
+
+@pytest.fixture(scope="module")
+def listings():
+    rng = np.random.default_rng(7)
+    n = 500
+    price = rng.uniform(100_000, 2_000_000, n).round(-3)
+    price[rng.random(n) < 0.1] = np.nan
+    price[:3] = 450_000.0                                  # valeurs égales aux bornes
+    surface = pd.array(rng.integers(9, 200, n), dtype="Int64")
+    surface[rng.random(n) < 0.1] = pd.NA
+    city = pd.Series(rng.choice(["Paris 11e", "Paris 14e", "Paris 20e", None], n), dtype="string")
+    outlier = pd.Series(rng.random(n) < 0.05, dtype="boolean")
+    outlier[rng.random(n) < 0.05] = pd.NA
+    return pd.DataFrame({"price_eur": price, "surface_m2": surface, "city": city, "outlier": outlier})
+
+
+def _mask(df, price, surface, cities, hide_outliers):
+    """Ancien filtre du tableau de bord (between / isin, recalculé à chaque rerun)."""
+    mask = df["price_eur"].between(*price) & df["surface_m2"].between(*surface).fillna(False)
+    if cities:
+        mask &= df["city"].isin(cities).fillna(False)
+    if hide_outliers:
+        mask &= ~df["outlier"].fillna(False).astype(bool)
+    return np.flatnonzero(mask.to_numpy(dtype=bool))
+
+
+def _query(idx, price, surface, cities, hide_outliers):
+    return idx.query(ranges={"price_eur": price, "surface_m2": surface}, sets={"city": cities},
+                     exclude=["outlier"] if hide_outliers else [])
+
+
+def test_query_matches_pandas_mask(listings):
+    idx = FilterIndex(listings, flags={"outlier": listings["outlier"]})
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        price = tuple(np.sort(rng.uniform(50_000, 2_100_000, 2)))
+        surface = tuple(np.sort(rng.integers(0, 210, 2)))
+        cities = list(rng.choice(["Paris 11e", "Paris 14e", "Paris 20e", "Lyon"], rng.integers(0, 4), replace=False))
+        hide = bool(rng.random() < 0.5)
+        assert np.array_equal(_query(idx, price, surface, cities, hide), _mask(listings, price, surface, cities, hide))
+
+
+def test_full_range_keeps_non_null_rows_only(listings):
+    idx = FilterIndex(listings)
+    price, surface = idx.bounds("price_eur"), idx.bounds("surface_m2")
+    assert price == (listings["price_eur"].min(), listings["price_eur"].max())
+    got = _query(idx, price, surface, [], False)
+    assert np.array_equal(got, _mask(listings, price, surface, [], False))
+    assert len(got) == (listings["price_eur"].notna() & listings["surface_m2"].notna()).sum() < len(listings)
+    # Sans valeur manquante, l'intervalle complet ne filtre rien
+    full = listings.dropna(subset=["price_eur"]).reset_index(drop=True)
+    assert np.array_equal(FilterIndex(full).query(ranges={"price_eur": (0, np.inf)}), np.arange(len(full)))
+
+
+@pytest.mark.parametrize("price, cities, empty", [
+    ((450_000, 450_000), [], False),                       # bornes égales : valeurs exactes seulement
+    ((600_000, 500_000), [], True),                        # intervalle vide
+    ((3_000_000, 4_000_000), [], True),                    # au-delà du maximum
+    ((0, 5_000_000), ["Lyon"], True),                      # valeur absente de l'index
+])
+def test_edge_selections_match_pandas_mask(listings, price, cities, empty):
+    idx = FilterIndex(listings, flags={"outlier": listings["outlier"]})
+    surface = (0, 1_000)
+    got = _query(idx, price, surface, cities, False)
+    assert np.array_equal(got, _mask(listings, price, surface, cities, False))
+    assert (len(got) == 0) == empty
+    assert (listings["price_eur"].take(got) == 450_000).all() or empty
+
+
+def test_empty_frame():
+    df = pd.DataFrame({"price_eur": pd.Series(dtype="float64"), "surface_m2": pd.Series(dtype="float64"),
+                       "city": pd.Series(dtype="string")})
+    idx = FilterIndex(df)
+    assert idx.bounds("price_eur") is None and idx.values("city") == []
+    assert len(idx.query(ranges={"price_eur": (0, 1)}, sets={"city": ["Paris 11e"]})) == 0
@@ -0,0 +1,63 @@
+# tests/test_geocode.py
+import pandas as pd
+import pytest
+
+import geocode
+from dataset import read_dataset, write_dataset
+
+
+class CountingRemote(geocode.RemoteGeocoder):
+    name = "test"
+    min_interval = 0.0
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def query(self, label, postal_code):
+        self.calls += 1
+        return 48.86, 2.33
+
+
+ADDRESSES = pd.Series(["Vendôme, Paris 1er (75001)", "Rue de Rivoli, Paris 4e (75004)"])
+
+
+def test_remote_geocoder_requires_query():
+    with pytest.raises(TypeError):
+        geocode.RemoteGeocoder()
+
+
+def test_no_cache_created_without_remote(tmp_path):
+    geo = geocode.Geocoder(gazetteer=None, cache=tmp_path / "geocode.sqlite")
+    assert pd.isna(geo.resolve(ADDRESSES)).all()
+    assert not (tmp_path / "geocode.sqlite").exists()
+    assert geo.stats["missing"] == 2
+
+
+def test_remote_results_are_served_from_cache_next_time(tmp_path):
+    remote = CountingRemote()
+    first = geocode.Geocoder(gazetteer=None, cache=tmp_path / "geocode.sqlite", remote=remote).resolve(ADDRESSES)
+    again = geocode.Geocoder(gazetteer=None, cache=tmp_path / "geocode.sqlite", remote=remote)
+    assert (again.resolve(ADDRESSES) == first).all()
+    assert remote.calls == 2 and again.stats["cache"] == 2
+
+
+class PostalRemote(geocode.RemoteGeocoder):
+    """Coordonnées propres à chaque code postal : une ligne mal reportée se voit."""
+    name = "test"
+    min_interval = 0.0
+
+    def query(self, label, postal_code):
+        return 48.8 + int(postal_code[-2:]) / 100, 2.3
+
+
+def test_backfill_reports_coordinates_by_id(tmp_path):
+    df = pd.DataFrame({"ID": ["3", "1", "2", "4"], "postal_code": ["75020", "75004", "75001", "75004"],
+                       "address": ["Rue A, Paris 20e (75020)", "Rue B, Paris 4e (75004)",
+                                   "Rue C, Paris 1er (75001)", "Rue D, Paris 4e (75004)"],
+                       "lat": [None, None, 48.81, None], "lon": [None, None, 2.3, None]})
+    write_dataset(df, tmp_path / "parquet")
+    geo = geocode.Geocoder(gazetteer=None, cache=tmp_path / "geocode.sqlite", remote=PostalRemote())
+    assert geocode.backfill(geo, tmp_path / "parquet") == 3
+    out = read_dataset(tmp_path / "parquet", columns=["ID", "lat"]).set_index("ID")["lat"].astype(float)
+    assert out.round(2).to_dict() == {"1": 48.84, "2": 48.81, "3": 49.0, "4": 48.84}
@@ -0,0 +1,49 @@
+# tests/test_history.py
+import sqlite3
+
+import pandas as pd
+
+import history
+from store import ItemStore
+
+
+def _frame(prices):
+    return pd.DataFrame({"ID": [str(i) for i in prices], "postal_code": "75011",
+                         "price_eur": list(prices.values()), "surface_m2": 50.0})
+
+
+def _listings(db):
+    con = sqlite3.connect(db)
+    try:
+        return {r[0]: r[1:] for r in con.execute("SELECT id, first_seen, last_seen FROM listings")}
+    finally:
+        con.close()
+
+
+def test_only_listings_seen_that_day_advance_last_seen(tmp_path):
+    store, db = ItemStore(tmp_path / "raw"), tmp_path / "history.sqlite"
+    df = _frame({1: 100_000.0, 2: 200_000.0, 3: 300_000.0})
+    store.record_seen([1, 2], day="2026-10-01")
+    store.record_seen([2, 3, 2], day="2026-10-02")
+
+    res = history.load_seen(df, store, path=db)
+
+    assert [r["total"] for r in res.values()] == [2, 2]
+    assert _listings(db) == {"1": ("2026-10-01", "2026-10-01"),     # disparue le 2
+                             "2": ("2026-10-01", "2026-10-02"),
+                             "3": ("2026-10-02", "2026-10-02")}
+
+
+def test_load_seen_resumes_from_last_snapshot(tmp_path):
+    store, db = ItemStore(tmp_path / "raw"), tmp_path / "history.sqlite"
+    store.record_seen([1], day="2026-10-01")
+    store.record_seen([1], day="2026-10-02")
+    history.load_seen(_frame({1: 100_000.0}), store, path=db)
+
+    store.record_seen([2], day="2026-10-02")        # second passage le même jour
+    store.record_seen([1], day="2026-10-03")
+    res = history.load_seen(_frame({1: 90_000.0, 2: 200_000.0}), store, path=db)
+
+    assert list(res) == ["2026-10-02", "2026-10-03"]
+    drops = history.price_changes("75011", path=db)
+    assert drops[["ID", "prev_price_eur", "price_eur"]].values.tolist() == [["1", 100_000.0, 90_000.0]]
@@ -0,0 +1,52 @@
+# tests/test_http_cache.py
+from time import time
+
+from scrapy.http import Request, Response
+from scrapy.settings import Settings
+
+from http_cache import RevisitPolicy
+
+REVISIT = {"search": 0, "detail": 7 * 24 * 3600}
+
+
+def _policy():
+    return RevisitPolicy(Settings({"HTTPCACHE_REVISIT": REVISIT}))
+
+
+def _request(page_type, age):
+    return Request("https://www.seloger.com/annonces/achat/appartement/paris-11eme-75/1.htm",
+                   meta={"page_type": page_type, "cache_timestamp": time() - age})
+
+
+def _cached():
+    return Response("https://www.seloger.com/", status=200,
+                    headers={"ETag": '"v1"', "Last-Modified": "Mon, 12 Oct 2026 08:00:00 GMT"})
+
+
+def test_detail_served_from_cache_within_revisit_delay():
+    request = _request("detail", age=3600)
+    assert _policy().is_cached_response_fresh(_cached(), request)
+    assert b"If-None-Match" not in request.headers
+
+
+def test_search_and_expired_detail_are_revalidated():
+    for page_type, age in (("search", 1), ("detail", 8 * 24 * 3600)):
+        request = _request(page_type, age)
+        assert not _policy().is_cached_response_fresh(_cached(), request)
+        assert request.headers[b"If-None-Match"] == b'"v1"'
+        assert request.headers[b"If-Modified-Since"] == b"Mon, 12 Oct 2026 08:00:00 GMT"
+
+
+def test_cached_copy_kept_on_304_and_server_errors():
+    policy, request = _policy(), _request("detail", 0)
+    valid = {status: policy.is_cached_response_valid(_cached(), Response(request.url, status=status), request)
+             for status in (200, 304, 404, 503)}
+    assert valid == {200: False, 304: True, 404: False, 503: True}
+
+
+def test_only_complete_get_pages_are_stored():
+    policy, request = _policy(), _request("detail", 0)
+    assert policy.should_cache_request(request)
+    assert not policy.should_cache_request(request.replace(method="POST"))
+    assert policy.should_cache_response(Response(request.url, status=200), request)
+    assert not policy.should_cache_response(Response(request.url, status=404), request)
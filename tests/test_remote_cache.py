@@ -0,0 +1,85 @@
+# tests/test_remote_cache.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import remote_cache
+
+
+class Origin(BaseHTTPRequestHandler):
+    """Origine locale : ETag fixe, 304 sur If-None-Match, 503 quand `down`."""
+    body, etag, down, hits = b"ID;price_eur\n1;100\n", '"v1"', False, 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        if self.down:
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin():
+    handler = type("Handler", (Origin,), {})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{server.server_address[1]}/cleaned_data.csv"
+    server.shutdown()
+    server.server_close()
+
+
+def test_first_fetch_then_fresh_then_304(origin, tmp_path):
+    handler, url = origin
+    res = remote_cache.fetch(url, cache_dir=tmp_path)
+    assert (res.status, res.content, res.etag) == ("fetched", Origin.body, '"v1"')
+
+    assert remote_cache.fetch(url, cache_dir=tmp_path).status == "fresh"
+    assert handler.hits == 1
+
+    res = remote_cache.fetch(url, cache_dir=tmp_path, max_age=0)
+    assert (res.status, res.content) == ("not_modified", Origin.body)
+    assert handler.hits == 2
+
+
+def test_origin_down_serves_stale_copy_and_backs_off(origin, tmp_path):
+    handler, url = origin
+    remote_cache.fetch(url, cache_dir=tmp_path)
+    handler.down = True
+
+    res = remote_cache.fetch(url, cache_dir=tmp_path, max_age=0)
+    assert (res.status, res.content) == ("stale", Origin.body)
+    assert remote_cache.fetch(url, cache_dir=tmp_path, max_age=0).status == "stale"
+    assert handler.hits == 2                            # pas de nouvel essai pendant RETRY_AFTER
+
+    handler.down = False
+    remote_cache.expire(tmp_path)                       # « Recharger » lève le délai
+    assert remote_cache.fetch(url, cache_dir=tmp_path, max_age=0).status == "not_modified"
+    assert handler.hits == 3
+
+
+def test_first_fetch_error_raises(origin, tmp_path):
+    handler, url = origin
+    handler.down = True
+    with pytest.raises(requests.HTTPError):
+        remote_cache.fetch(url, cache_dir=tmp_path)
+    assert remote_cache.prefetch([{"url": url}], cache_dir=tmp_path) == [None]
+
+
+def test_unreachable_origin_without_copy_raises(tmp_path):
+    with pytest.raises(requests.ConnectionError):
+        remote_cache.fetch("http://127.0.0.1:9/cleaned_data.csv", cache_dir=tmp_path, timeout=2)
@@ -0,0 +1,87 @@
+# tests/test_schema.py
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from cleaner import clean_records, write_csv
+from dataset import DatasetWriter, read_dataset
+from schema import CSV_DTYPES, NARROW_DTYPES, compact_schema, read_cleaned_csv
+
+
+def test_narrow_dtypes_do_not_depend_on_batch_values():
+    small = compact_schema(pd.DataFrame({"rooms": [3, 4], "floor": [0, 2], "year_built": [1930, 2001]}))
+    odd = compact_schema(pd.DataFrame({"rooms": [None, 70_000], "floor": [1.5, None], "year_built": [None, 9999]}))
+    assert dict(small.dtypes) == dict(odd.dtypes) == {c: pd.Int16Dtype() for c in NARROW_DTYPES}
+    assert odd.isna().all().all()                       # hors bornes / non entier → NA
+
+
+def test_streamed_batches_share_one_schema(tmp_path):
+    writer = DatasetWriter(tmp_path / "parquet")
+    for rooms in ([2, 3], [None, None], [40_000, 5]):
+        batch = pd.DataFrame({"ID": ["1", "2"], "postal_code": "75011", "rooms": rooms})
+        writer.write(compact_schema(batch, categories=False))
+    writer.close()
+
+    files = sorted((tmp_path / "parquet").glob("*/*.parquet"))
+    assert len(files) == 3
+    assert len({pq.read_schema(f).field("rooms").type for f in files}) == 1
+    rooms = read_dataset(tmp_path / "parquet", columns=["rooms"])["rooms"]
+    assert rooms.isna().tolist() == [False, False, True, True, True, False]
+    assert rooms.dropna().tolist() == [2, 3, 5]
+
+
+RECORDS = [
+    {"url": "https://www.seloger.com/annonces/achat/appartement/paris-11eme-75/1.htm", "ID": 1,
+     "title": "T2 ; lumineux", "price_eur": 420000, "surface_m2": 40.5, "rooms": 2, "floor": 3,
+     "address": "Rue Oberkampf, Paris 11e (75011)", "postal_code": "75011", "dpe_letter": "D",
+     "year_built": 1930, "property_type": "appartement", "description": "Séjour\nsur rue, parquet."},
+    {"url": "https://www.seloger.com/annonces/achat/maison/paris-20eme-75/2.htm", "ID": 2,
+     "title": None, "price_eur": 1.0, "surface_m2": None, "rooms": None, "floor": 0,
+     "address": None, "postal_code": "75020", "dpe_letter": None, "year_built": None,
+     "property_type": "maison", "description": ""},
+]
+
+
+def _reference(data: bytes) -> pd.DataFrame:
+    """Lecture pandas de référence, aux types de CSV_DTYPES."""
+    text = data.decode("utf-8-sig")
+    if text.lower().startswith("sep="):
+        text = text.split("\n", 1)[1].lstrip("\ufeff")
+    header = text.split("\n", 1)[0].split(";")
+    return pd.read_csv(io.StringIO(text), sep=";", dtype={c: t for c, t in CSV_DTYPES.items() if c in header})
+
+
+@pytest.fixture
+def cleaned_csv(tmp_path):
+    path = tmp_path / "cleaned_data.csv"
+    write_csv(clean_records(RECORDS), path)
+    return path
+
+
+def test_read_cleaned_csv_matches_reference_read(cleaned_csv):
+    data = cleaned_csv.read_bytes()
+    assert data.startswith(b"\xef\xbb\xbf")                     # BOM écrit par le cleaner
+    ref = _reference(data)
+    pd.testing.assert_frame_equal(read_cleaned_csv(cleaned_csv), ref)
+    pd.testing.assert_frame_equal(read_cleaned_csv(data), ref)
+    assert {c: str(t) for c, t in ref.dtypes.items()} == {c: CSV_DTYPES.get(c, "object") for c in ref.columns}
+
+
+def test_read_cleaned_csv_skips_excel_sep_line(cleaned_csv):
+    data = cleaned_csv.read_bytes()
+    excel = b"\xef\xbb\xbfsep=;\r\n" + data[3:]
+    pd.testing.assert_frame_equal(read_cleaned_csv(excel), _reference(data))
+
+
+def test_read_cleaned_csv_falls_back_to_pandas(tmp_path):
+    # CSV d'une autre origine : entiers écrits en flottants ("2.0"), refusés par Arrow en int64
+    df = clean_records(RECORDS)
+    df["rooms"] = df["rooms"].astype("Float64")
+    write_csv(df, tmp_path / "other.csv")
+    data = (tmp_path / "other.csv").read_bytes()
+    assert b";2.0;" in data
+    got = read_cleaned_csv(data)
+    pd.testing.assert_frame_equal(got, _reference(data))
+    pd.testing.assert_frame_equal(got, read_cleaned_csv(data.replace(b";2.0;", b";2;")))
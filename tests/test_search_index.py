@@ -0,0 +1,56 @@
+# tests/test_search_index.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from search_index import EXACT, FIELD_WEIGHTS, PREFIX, SUBSTRING, SearchIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    df = pd.DataFrame({
+        "address": ["Rue de Ménilmontant, Paris 20e (75020)", "Boulevard de Belleville, Paris 20e (75020)",
+                    "Rue Oberkampf, Paris 11e (75011)", None, "Place Vendôme, Paris 1er (75001)"],
+        "title": ["Appartement 3 pièces", "Studio MÉNILMONTANT", "T2 avec balcon", None, "Duplex montant rare"],
+        "description": [None, "Proche métro.", "Vue sur Ménilmontant, balcon sud.", "Ménilmontant", ""],
+    })
+    return SearchIndex(df.astype("string"))
+
+
+def _rows(index, q):
+    return index.search(q)[0].tolist()
+
+
+def test_accents_and_case_are_folded(index):
+    assert _rows(index, "MENILMONTANT") == _rows(index, "ménilmontant") == _rows(index, "Ménilmontant")
+    assert sorted(_rows(index, "vendome")) == [4]
+
+
+def test_substring_and_prefix_matches(index):
+    assert sorted(_rows(index, "montant")) == [0, 1, 2, 3, 4]     # "montant" dans "ménilmontant"
+    assert sorted(_rows(index, "menil")) == [0, 1, 2, 3]          # préfixe
+    assert _rows(index, "mo") == [4]                               # trop court : préfixe de "montant" seulement
+
+
+def test_all_words_required(index):
+    assert _rows(index, "ménilmontant balcon") == [2]
+    assert _rows(index, "ménilmontant vendôme") == []
+    assert _rows(index, "paris 20e") == [0, 1]
+
+
+def test_scores_rank_exact_then_prefix_then_substring_and_field_weight(index):
+    rows, scores = index.search("montant")
+    # Mot exact dans le titre, puis sous-chaîne dans l'adresse, le titre, la description
+    w = FIELD_WEIGHTS
+    assert rows.tolist() == [4, 0, 1, 2, 3]
+    assert scores.tolist() == [EXACT * w["title"], SUBSTRING * w["address"], SUBSTRING * w["title"],
+                               SUBSTRING * w["description"], SUBSTRING * w["description"]]
+    rows, scores = index.search("menil")
+    assert rows.tolist() == [0, 1, 2, 3] and scores[0] == PREFIX * w["address"]
+    assert (np.diff(index.search("paris balcon")[1]) <= 0).all()
+
+
+@pytest.mark.parametrize("q", ["", "   ", " ;!? "])
+def test_empty_query_returns_nothing(index, q):
+    rows, scores = index.search(q)
+    assert len(rows) == len(scores) == 0
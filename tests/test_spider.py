@@ -0,0 +1,77 @@
+# tests/test_spider.py
+import asyncio
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+
+import spider
+
+SEARCH = "https://www.seloger.com/immobilier/achat/immo-paris-75/?page=2"
+
+
+def _spider(backlog, in_flight=0, new_found=0, max_new=2):
+    """Spider sans crawler ni store : seul l'état d'ordonnancement est renseigné."""
+    sp = spider.SeLogerSelectorsTP.__new__(spider.SeLogerSelectorsTP)
+    sp.max_new, sp.new_found, sp.in_flight = max_new, new_found, in_flight
+    sp.backlog, sp.next_page = deque(backlog), SEARCH
+    sp.detail_callback = sp.parse_detail
+    return sp
+
+
+def _kinds(requests):
+    return ["search" if r.callback.__name__ == "parse_search" else "detail" for r in requests]
+
+
+def test_quota_limits_details_and_defers_pagination(monkeypatch):
+    monkeypatch.setattr(spider, "QUOTA_SCHEDULING", True)
+    sp = _spider([f"https://www.seloger.com/annonces/achat/{i}.htm" for i in range(3)])
+    assert _kinds(sp._schedule()) == ["detail", "detail"]
+    assert len(sp.backlog) == 1 and sp.next_page == SEARCH
+
+
+@pytest.mark.parametrize("in_flight, new_found", [(0, 0), (5, 0), (0, 2)])
+def test_without_quota_scheduling_pagination_is_never_blocked(monkeypatch, in_flight, new_found):
+    monkeypatch.setattr(spider, "QUOTA_SCHEDULING", False)
+    sp = _spider([f"https://www.seloger.com/annonces/achat/{i}.htm" for i in range(3)], in_flight, new_found)
+    assert _kinds(sp._schedule()) == ["detail"] * 3 + ["search"]
+    assert not sp.backlog and sp.next_page is None
+
+
+def _failing_detail(monkeypatch):
+    """Spider avec une fiche en cours (place de quota prise) dont l'extraction échoue."""
+    monkeypatch.setattr(spider, "QUOTA_SCHEDULING", True)
+    sp = _spider([], in_flight=1)
+    sp._detail_id = lambda response: 1
+    url = "https://www.seloger.com/annonces/achat/1.htm"
+    return sp, HtmlResponse(url, body=b"<html></html>", request=Request(url, meta={"quota_slot": True}))
+
+
+def test_failed_extraction_releases_quota_slot(monkeypatch):
+    sp, response = _failing_detail(monkeypatch)
+    monkeypatch.setattr(spider, "extract_detail", lambda *a: 1 / 0)
+    requests = []
+    with pytest.raises(ZeroDivisionError):
+        for r in sp.parse_detail(response):
+            requests.append(r)
+    assert sp.in_flight == 0 and _kinds(requests) == ["search"]
+
+
+def test_broken_pool_releases_quota_slot(monkeypatch):
+    sp, response = _failing_detail(monkeypatch)
+
+    class BrokenPool:
+        def submit(self, *args):
+            raise BrokenProcessPool("worker mort")
+
+    sp.pool = BrokenPool()
+    requests = []
+
+    async def crawl():
+        async for r in sp.parse_detail_pooled(response):
+            requests.append(r)
+
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(crawl())
+    assert sp.in_flight == 0 and _kinds(requests) == ["search"]
@@ -0,0 +1,111 @@
+# tests/test_store.py
+import numpy as np
+
+from store import INDEX_NAME, ItemStore, iter_segment
+
+
+def _crash(root, items):
+    """Écrit `items` puis simule un crash : une ligne tronquée en fin de segment,
+    un mot partiel en fin de ids.bin."""
+    store = ItemStore(root)
+    store.extend(items)
+    store.close()
+    seg = store.segments()[-1]
+    with seg.open("a", encoding="utf-8") as f:
+        f.write('{"ID": 2, "a": "tru')
+    with (root / INDEX_NAME).open("ab") as f:
+        f.write(b"\x02\x00\x00")
+
+
+def test_reopen_after_crash_truncates_partial_line(tmp_path):
+    _crash(tmp_path, [{"ID": 1, "a": "ok"}])
+    store = ItemStore(tmp_path)
+    store.append({"ID": 3, "a": "next"})
+    store.close()
+    assert [r["ID"] for r in store.iter_records()] == [1, 3]
+    assert list(store.known_ids()) == [1, 3]
+    assert 2 not in store.id_index()               # ligne perdue : l'annonce sera re-scrapée
+    assert [r["ID"] for r in store.iter_records_from({})] == [1, 3]
+
+
+def test_index_written_after_segment(tmp_path):
+    store = ItemStore(tmp_path, fsync_every=1000)
+    store.append({"ID": 7})
+    assert (tmp_path / INDEX_NAME).stat().st_size == 0    # pas encore synchronisé
+    store.close()
+    assert list(store.known_ids()) == [7]
+
+
+def test_glued_line_from_old_store_is_salvaged(tmp_path):
+    seg = tmp_path / "segment-00001.jsonl"
+    seg.write_text('{"ID": 1}\n{"ID": 2, "a": "tru{"ID": 3, "a": "x"}\n{"ID": 4}\n', encoding="utf-8")
+    assert [r["ID"] for r in iter_segment(seg)] == [1, 3, 4]
+
+
+def test_compact_keeps_latest_and_rebuilds_index(tmp_path):
+    store = ItemStore(tmp_path, segment_bytes=64)
+    store.extend([{"ID": i % 5, "v": i} for i in range(20)])
+    store.close()
+    assert store.compact() == 5
+    recs = {r["ID"]: r["v"] for r in store.iter_records()}
+    assert recs == {i: 15 + i for i in range(5)}
+    assert sorted(store.known_ids()) == list(range(5))
+    assert store.generation() == 1
+    assert not (tmp_path / ".compact").exists()
+    idx = store.id_index()
+    assert len(idx) == 5 and all(i in idx for i in range(5))
+
+
+def test_compact_segments_numbered_after_old_ones(tmp_path):
+    store = ItemStore(tmp_path, segment_bytes=64)
+    store.extend([{"ID": i} for i in range(10)])
+    store.close()
+    last_old = int(store.segments()[-1].stem.split("-")[-1])
+    store.compact()
+    assert int(store.segments()[0].stem.split("-")[-1]) > last_old
+    assert np.array_equal(np.sort(np.array(store.known_ids())), np.arange(10))
+
+
+def test_id_index_len_counts_each_id_once(tmp_path):
+    store = ItemStore(tmp_path)
+    store.extend({"ID": i} for i in (1, 2, 3))
+    store.close()
+    store.id_index(merge_tail=0)                        # 1, 2, 3 dans ids.sorted
+    store.extend({"ID": i} for i in (2, 4))             # revisite de 2 + nouvel ID dans la queue
+    store.close()
+    idx = store.id_index()
+    idx.add(3)
+    idx.add(5)
+    assert len(idx) == 5
+    assert all(i in idx for i in (1, 2, 3, 4, 5)) and 6 not in idx
+
+
+def test_rebuilt_index_leaves_no_tmp_file(tmp_path):
+    store = ItemStore(tmp_path)
+    store.extend({"ID": i} for i in (3, 1, 2))
+    store.close()
+    assert len(store.id_index(merge_tail=0)) == 3
+    assert sorted(p.name for p in tmp_path.iterdir() if "sorted" in p.name) == ["ids.sorted"]
+
+
+def test_replaced_store_is_reread_by_incremental_clean(tmp_path):
+    import cleaner
+
+    raw, out = tmp_path / "raw", tmp_path / "out"
+    out.mkdir()
+    store = ItemStore(raw)
+    store.extend({"ID": i, "title": "T2", "price_eur": 100_000 + i} for i in (1, 2))
+    store.close()
+    store.record_seen([1, 2], day="2026-10-01")
+    cleaner.clean_incremental(raw, out / "cleaned.csv", out / "state.json")
+
+    new = ItemStore(tmp_path / "raw_reextract")      # autres lignes, mêmes noms de segments
+    new.extend({"ID": i, "title": "Appartement T2 lumineux", "price_eur": 200_000 + i} for i in (2, 1, 3))
+    new.close()
+    ItemStore(raw).replace_with(new.root)
+    assert ItemStore(raw).generation() == 1 and ItemStore(raw).seen_days() == ["2026-10-01"]
+
+    cleaner.clean_incremental(raw, out / "cleaned.csv", out / "state.json")
+    csv = cleaner.pd.read_csv(out / "cleaned.csv", sep=";", encoding="utf-8-sig").sort_values("ID")
+    assert csv["ID"].tolist() == [1, 2, 3]
+    assert csv["price_eur"].tolist() == [200_001, 200_002, 200_003]